@@ -0,0 +1,68 @@
+import random
+import sys
+import time
+
+from huffman_arpeggio.core import MERGE_ENGINES, build_huffman_tree
+
+
+def generate_sorted_counts(num_targets: int, max_count: int):
+    """
+    Generate a count_dict sorted by descending count, like the output of
+    `count-lines-to-csv`.
+
+    :param num_targets: Number of targets in count_dict.
+    :param max_count: Maximum count value for targets.
+    :return: A dictionary mapping targets to their counts.
+    """
+    counts = sorted(
+        (random.randint(1, max_count) for _ in range(num_targets)),
+        reverse=True,
+    )
+    return {f"t{i}": count for i, count in enumerate(counts)}
+
+
+def time_build(count_dict: dict, symbols: list, engine: str) -> float:
+    """
+    Time a single `build_huffman_tree` call.
+
+    :param count_dict: A dictionary mapping targets to their counts.
+    :param symbols: A list of symbols used in the encoding.
+    :param engine: The merge engine to use.
+    :return: The elapsed wall time in seconds.
+    """
+    start = time.perf_counter()
+    build_huffman_tree(count_dict, symbols, engine=engine)
+    return time.perf_counter() - start
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10**5, 10**6]
+    symbols = ["X", "O", "□", "∆", "⬇️", "⬆️", "⬅️", "➡️"]
+
+    print(f"{'targets':>10} {'order':>9}", end="")
+    for engine in MERGE_ENGINES:
+        print(f" {engine:>10}", end="")
+    print(f" {'speedup':>8}")
+
+    for num_targets in sizes:
+        sorted_counts = generate_sorted_counts(num_targets, 10**9)
+        items = list(sorted_counts.items())
+        random.shuffle(items)
+        shuffled_counts = dict(items)
+
+        for order, count_dict in [
+            ("sorted", sorted_counts),
+            ("shuffled", shuffled_counts),
+        ]:
+            timings = {
+                engine: time_build(count_dict, symbols, engine)
+                for engine in MERGE_ENGINES
+            }
+            print(f"{num_targets:>10} {order:>9}", end="")
+            for engine in MERGE_ENGINES:
+                print(f" {timings[engine]:>9.3f}s", end="")
+            print(f" {timings['heap'] / timings['two_queue']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+import random
+import sys
+import time
+
+from huffman_arpeggio.contexts import build_context_forest
+from huffman_arpeggio.core import build_huffman_tree
+
+
+def generate_context_counts(num_contexts: int, max_targets: int):
+    """
+    Generate n-gram-like counts: many contexts, each with a few targets
+    drawn from a shared vocabulary.
+
+    :param num_contexts: Number of contexts.
+    :param max_targets: Maximum number of targets per context.
+    :return: A dictionary mapping contexts to count dictionaries.
+    """
+    return {
+        f"c{i}": {
+            f"t{random.randint(0, 10 * max_targets)}": random.randint(1, 1000)
+            for _ in range(random.randint(1, max_targets))
+        }
+        for i in range(num_contexts)
+    }
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10**4, 10**5]
+    symbols = ["X", "O", "□", "∆", "⬇️", "⬆️"]
+    workers = os.cpu_count() or 1
+
+    print(
+        f"{'contexts':>10} {'loop':>9} {'serial':>9}"
+        f" {f'{workers} workers':>10} {'speedup':>8}"
+    )
+    for num_contexts in sizes:
+        context_counts = generate_context_counts(num_contexts, 30)
+
+        start = time.perf_counter()
+        for count_dict in context_counts.values():
+            build_huffman_tree(count_dict, symbols)
+        loop = time.perf_counter() - start
+
+        start = time.perf_counter()
+        build_context_forest(context_counts, symbols, workers=1)
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        build_context_forest(context_counts, symbols, workers=workers)
+        parallel = time.perf_counter() - start
+
+        print(
+            f"{num_contexts:>10} {loop:>8.3f}s {serial:>8.3f}s"
+            f" {parallel:>9.3f}s {loop / parallel:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from huffman_arpeggio.layout_cache import build_encoding_map
+from huffman_arpeggio.layout_file import dump_layout
+
+
+def parse_option(name: str, default: str) -> str:
+    for arg in sys.argv[1:]:
+        if arg.startswith(f"{name}="):
+            return arg.split("=", 1)[1]
+    return default
+
+
+async def run_client(
+    socket_path: str,
+    presses: list,
+    rate: float,
+    latencies: list,
+):
+    """
+    Send presses at a fixed rate and record the round trip of each one.
+
+    :param socket_path: Path to the daemon's Unix socket.
+    :param presses: The symbols to press.
+    :param rate: Presses per second for this client.
+    :param latencies: The list to append round trip times to.
+    """
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for i, symbol in enumerate(presses):
+        delay = start + i / rate - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        sent = time.perf_counter()
+        writer.write(f"press {symbol}\n".encode())
+        response = await reader.readline()
+        latencies.append(time.perf_counter() - sent)
+        if response.startswith(b"error"):
+            raise RuntimeError(response.decode())
+    writer.close()
+    await writer.wait_closed()
+
+
+async def generate_load(
+    socket_path: str, codes: list, clients: int, rate: float, duration: float
+) -> list:
+    """
+    Replay random codes from several clients at once.
+
+    :param socket_path: Path to the daemon's Unix socket.
+    :param codes: The codes to sample from.
+    :param clients: The number of concurrent clients.
+    :param rate: Total presses per second over all clients.
+    :param duration: How long to send presses, in seconds.
+    :return: The round trip time of every press.
+    """
+    rng = random.Random(0)
+    per_client = int(rate / clients * duration)
+    streams = []
+    for _ in range(clients):
+        presses = []
+        while len(presses) < per_client:
+            presses.extend(rng.choice(codes))
+        streams.append(presses)
+    latencies: list = []
+    await asyncio.gather(
+        *(
+            run_client(socket_path, presses, rate / clients, latencies)
+            for presses in streams
+        )
+    )
+    return latencies
+
+
+def main():
+    num_targets = int(parse_option("--targets", "10000"))
+    clients = int(parse_option("--clients", "4"))
+    rate = float(parse_option("--rate", "4000"))
+    duration = float(parse_option("--duration", "5"))
+
+    symbols = ["j", "f", "k", "d", "l", "s"]
+    count_dict = {f"t{i}": 10**6 // (i + 1) for i in range(num_targets)}
+    encoding_map = build_encoding_map(count_dict, symbols)
+    # Weight codes by count, like real typing
+    codes = random.Random(1).choices(
+        list(encoding_map),
+        [count for _, count in encoding_map.values()],
+        k=1000,
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        layout_path = os.path.join(directory, "layout.harp")
+        socket_path = os.path.join(directory, "daemon.sock")
+        dump_layout(encoding_map, symbols, layout_path)
+        daemon = subprocess.Popen(
+            [
+                sys.executable,
+                "bin/arpeggio_daemon.py",
+                layout_path,
+                f"--socket={socket_path}",
+            ],
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            while not os.path.exists(socket_path):
+                time.sleep(0.01)
+            start = time.perf_counter()
+            latencies = asyncio.run(
+                generate_load(socket_path, codes, clients, rate, duration)
+            )
+            elapsed = time.perf_counter() - start
+        finally:
+            daemon.terminate()
+            daemon.wait()
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"{'events':>10} {len(latencies):>10}")
+    print(f"{'events/s':>10} {len(latencies) / elapsed:>10.0f}")
+    print(f"{'p50':>10} {quantiles[49] * 1e6:>8.0f}us")
+    print(f"{'p99':>10} {quantiles[98] * 1e6:>8.0f}us")
+    print(f"{'max':>10} {latencies[-1] * 1e6:>8.0f}us")
+
+
+if __name__ == "__main__":
+    main()
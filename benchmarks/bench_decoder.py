@@ -0,0 +1,56 @@
+import random
+import sys
+import time
+
+import numpy as np
+
+from huffman_arpeggio.compact import build_compact_tree
+from huffman_arpeggio.core import generate_encoding_map_with_count
+from huffman_arpeggio.decoder import Decoder
+
+
+def main():
+    num_presses = int(sys.argv[1]) if len(sys.argv) > 1 else 10**6
+    symbols = ["j", "f", "k", "d", "l", "s"]
+    count_dict = {f"t{i}": 10**6 // (i + 1) for i in range(5000)}
+    tree = build_compact_tree(count_dict, symbols)
+    encoding_map = generate_encoding_map_with_count(tree, symbols, count_dict)
+    codes = {target: path for path, (target, _) in encoding_map.items()}
+
+    targets = random.choices(
+        list(count_dict), weights=list(count_dict.values()), k=num_presses
+    )
+    symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+    presses = []
+    for target in targets:
+        presses.extend(symbol_index[symbol] for symbol in codes[target])
+        if len(presses) >= num_presses:
+            break
+    presses = presses[:num_presses]
+
+    start = time.perf_counter()
+    decoded = 0
+    path = []
+    for press in presses:
+        path.append(symbols[press])
+        if tuple(path) in encoding_map:
+            decoded += 1
+            path = []
+    elapsed = time.perf_counter() - start
+    print(f"{'dict lookup':>12} {elapsed:>8.3f}s {decoded:>9} targets")
+
+    decoder = Decoder.from_tree(tree, symbols, count_dict)
+    start = time.perf_counter()
+    decoded = sum(decoder.feed_index(press) is not None for press in presses)
+    elapsed = time.perf_counter() - start
+    print(f"{'feed':>12} {elapsed:>8.3f}s {decoded:>9} targets")
+
+    array = np.array(presses)
+    start = time.perf_counter()
+    decoded = len(decoder.decode_batch(array))
+    elapsed = time.perf_counter() - start
+    print(f"{'batch':>12} {elapsed:>8.3f}s {decoded:>9} targets")
+
+
+if __name__ == "__main__":
+    main()
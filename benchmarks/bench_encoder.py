@@ -0,0 +1,43 @@
+import random
+import sys
+import time
+
+from huffman_arpeggio.core import (
+    build_huffman_tree,
+    generate_encoding_map_with_count,
+)
+from huffman_arpeggio.encoder import Encoder, keyswitch_char_targets
+from huffman_arpeggio.utils import load_count_dict
+
+
+def main():
+    num_chars = int(sys.argv[1]) if len(sys.argv) > 1 else 10**7
+    count_dict = load_count_dict(
+        "tests/data/playstation-qwerty-wikipedia-example-input.csv",
+        "keyswitch",
+        "count",
+    )
+    symbols = ["X", "O", "□", "△"]
+    root = build_huffman_tree(count_dict, symbols)
+    encoding_map = generate_encoding_map_with_count(root, symbols, count_dict)
+    char_targets = keyswitch_char_targets(count_dict)
+    text = "".join(random.choices(list(char_targets), k=num_chars))
+
+    codes = {target: path for path, (target, _) in encoding_map.items()}
+    start = time.perf_counter()
+    presses = []
+    for char in text:
+        for target in char_targets[char]:
+            presses.extend(codes[target])
+    elapsed = time.perf_counter() - start
+    print(f"{'dict lookup':>12} {elapsed:>8.3f}s {len(presses):>10} presses")
+
+    encoder = Encoder(encoding_map, symbols)
+    start = time.perf_counter()
+    presses = encoder.encode(text)
+    elapsed = time.perf_counter() - start
+    print(f"{'encoder':>12} {elapsed:>8.3f}s {len(presses):>10} presses")
+
+
+if __name__ == "__main__":
+    main()
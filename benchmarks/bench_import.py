@@ -0,0 +1,33 @@
+import statistics
+import subprocess
+import sys
+import time
+
+MODULES = [
+    "bin.count_lines_to_csv",
+    "bin.huffmanize_zsh_aliases",
+    "bin.local_harps",
+    "huffman_arpeggio.layout_file",
+]
+
+
+def import_time(statement: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    baseline = import_time("pass", repeat)
+    print(f"{'interpreter':>30} {baseline * 1000:>8.1f}ms")
+    for module in MODULES:
+        elapsed = import_time(f"import {module}", repeat) - baseline
+        print(f"{module:>30} {elapsed * 1000:>+8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import random
+import sys
+import time
+
+from huffman_arpeggio.core import huffman_code_lengths
+from huffman_arpeggio.length_limited import package_merge_code_lengths
+
+
+def zipf_counts(num_targets: int, exponent: float = 1.1):
+    """
+    Generate Zipf-distributed counts in random order.
+
+    :param num_targets: Number of counts to generate.
+    :param exponent: The Zipf exponent.
+    :return: A list of counts.
+    """
+    counts = [
+        int(10**9 / (rank**exponent)) + 1 for rank in range(1, 1 + num_targets)
+    ]
+    random.shuffle(counts)
+    return counts
+
+
+def main():
+    num_targets = int(sys.argv[1]) if len(sys.argv) > 1 else 10**5
+    counts = zipf_counts(num_targets)
+
+    print(
+        f"{'symbols':>7} {'max_length':>10} {'time':>9} {'ns/(n*L)':>9}"
+        f" {'presses/target':>14}"
+    )
+    for num_branches in [4, 8]:
+        start = time.perf_counter()
+        lengths = huffman_code_lengths(counts, num_branches)
+        elapsed = time.perf_counter() - start
+        cost = sum(c * length for c, length in zip(counts, lengths))
+        print(
+            f"{num_branches:>7} {'none':>10} {elapsed:>8.3f}s {'':>9}"
+            f" {cost / sum(counts):>14.4f}"
+        )
+
+        for max_length in range(6, 11):
+            if num_branches**max_length < num_targets:
+                continue
+            start = time.perf_counter()
+            lengths = package_merge_code_lengths(
+                counts, num_branches, max_length
+            )
+            elapsed = time.perf_counter() - start
+            cost = int((lengths * counts).sum())
+            per_item = elapsed * 1e9 / (num_targets * max_length)
+            print(
+                f"{num_branches:>7} {max_length:>10} {elapsed:>8.3f}s"
+                f" {per_item:>9.1f} {cost / sum(counts):>14.4f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
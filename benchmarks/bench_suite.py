@@ -0,0 +1,368 @@
+import gc
+import json
+import math
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from bin.huffmanize_zsh_aliases import filter_commands
+from huffman_arpeggio.core import (
+    Node,
+    build_huffman_tree,
+    calculate_padding,
+    generate_encoding_map_with_count,
+    merge_nodes,
+)
+from huffman_arpeggio.decoder import Decoder
+from huffman_arpeggio.utils import (
+    load_count_dict,
+    save_encoding_map_with_count,
+)
+
+WIKIPEDIA_FREQUENCIES = "resources/Wikipedia_character_frequencies.txt"
+
+DISTRIBUTIONS = ("uniform", "zipf", "wikipedia")
+
+STAGES = (
+    "build_huffman_tree",
+    "merge_nodes",
+    "generate_encoding_map_with_count",
+    "save_encoding_map_with_count",
+    "load_count_dict",
+    "filter_commands",
+    "decode_feed",
+    "decode_batch",
+)
+
+# Alias generation is only benchmarked up to this many targets, since shell
+# histories never get much larger
+MAX_FILTER_TARGETS = 10**5
+
+# Decoding is benchmarked on a stream of this many presses, drawn by count
+NUM_PRESSES = 10**5
+
+
+def uniform_counts(num_targets: int, rng: random.Random) -> List[int]:
+    """
+    Generate counts drawn uniformly at random.
+
+    :param num_targets: Number of counts to generate.
+    :param rng: The random number generator.
+    :return: A list of counts.
+    """
+    return [rng.randint(1, 10**6) for _ in range(num_targets)]
+
+
+def zipf_counts(
+    num_targets: int, rng: random.Random, exponent: float = 1.1
+) -> List[int]:
+    """
+    Generate Zipf-distributed counts in random order.
+
+    :param num_targets: Number of counts to generate.
+    :param rng: The random number generator.
+    :param exponent: The Zipf exponent.
+    :return: A list of counts.
+    """
+    counts = [
+        int(10**9 / (rank**exponent)) + 1 for rank in range(1, 1 + num_targets)
+    ]
+    rng.shuffle(counts)
+    return counts
+
+
+def load_wikipedia_frequencies(path: str = WIKIPEDIA_FREQUENCIES) -> List[int]:
+    """
+    Load the character frequencies of all Wikipedia languages, from lines of
+    `'char'<tab>ord(char)<tab>freq` after a `#` comment header.
+
+    :param path: Path to the frequency file.
+    :return: The frequencies, in descending order.
+    """
+    # The characters include newlines and tabs, so match whole entries
+    # rather than splitting lines, and keep carriage returns as they are
+    with open(path, encoding="utf-8", newline="") as f:
+        text = f.read()
+    frequencies = [
+        int(match.group(1))
+        for match in re.finditer(r"^'.'\t\d+\t(\d+)$", text, re.M | re.S)
+    ]
+    return sorted(frequencies, reverse=True)
+
+
+def wikipedia_counts(num_targets: int, rng: random.Random) -> List[int]:
+    """
+    Generate counts following the rank-frequency curve of the Wikipedia
+    character frequencies, stretched or shrunk to any number of targets by
+    interpolating log-count over rank.
+
+    :param num_targets: Number of counts to generate.
+    :param rng: The random number generator.
+    :return: A list of counts.
+    """
+    profile = load_wikipedia_frequencies()
+    logs = [math.log(count) for count in profile]
+    scale = (len(profile) - 1) / max(num_targets - 1, 1)
+    counts = []
+    for rank in range(num_targets):
+        position = rank * scale
+        low = min(int(position), len(logs) - 2)
+        fraction = position - low
+        log_count = logs[low] + fraction * (logs[low + 1] - logs[low])
+        counts.append(max(int(math.exp(log_count)), 1))
+    rng.shuffle(counts)
+    return counts
+
+
+COUNT_GENERATORS = {
+    "uniform": uniform_counts,
+    "zipf": zipf_counts,
+    "wikipedia": wikipedia_counts,
+}
+
+
+def measure(function: Callable[[], object]) -> Dict[str, float]:
+    """
+    Measure the wall time of a call, and its peak memory in a second call
+    under tracemalloc, which would otherwise distort the timing.
+
+    :param function: The call to measure.
+    :return: The wall time in seconds and the peak traced memory in bytes.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": seconds, "peak_bytes": peak}
+
+
+def run_case(
+    distribution: str,
+    num_targets: int,
+    num_symbols: int,
+    stages: List[str],
+    seed: int,
+) -> List[Dict[str, object]]:
+    """
+    Benchmark every stage on one count table.
+
+    :param distribution: One of `DISTRIBUTIONS`.
+    :param num_targets: The number of targets.
+    :param num_symbols: The alphabet size.
+    :param stages: The stages to run, from `STAGES`.
+    :param seed: The random seed for the counts.
+    :return: One result per stage.
+    """
+    rng = random.Random(seed)
+    counts = COUNT_GENERATORS[distribution](num_targets, rng)
+    # Command-like targets, long enough for a short alias to pay off
+    count_dict = {f"command-{i:07d}": count for i, count in enumerate(counts)}
+    symbols = [f"s{i}" for i in range(num_symbols)]
+    root = build_huffman_tree(count_dict, symbols)
+    encoding_map = generate_encoding_map_with_count(root, symbols, count_dict)
+
+    def merge():
+        _, num_padding = calculate_padding(len(count_dict), num_symbols)
+        nodes = [Node(count, target) for target, count in count_dict.items()]
+        nodes.extend(Node(0, None) for _ in range(num_padding))
+        merge_nodes(nodes, num_symbols)
+
+    # A press stream of targets drawn by count, as a user would type them
+    decoder = Decoder.from_encoding_map(encoding_map, symbols)
+    codes = {target: path for path, (target, _) in encoding_map.items()}
+    symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+    stream: List[str] = []
+    for target in rng.choices(list(count_dict), counts, k=NUM_PRESSES):
+        stream.extend(codes[target])
+        if len(stream) >= NUM_PRESSES:
+            break
+    presses = [symbol_index[symbol] for symbol in stream]
+
+    def feed():
+        decoder.reset()
+        for symbol in stream:
+            decoder.feed(symbol)
+
+    # A stub conflict checker: a fixed set of taken names, as zsh would
+    # report them, without running zsh
+    taken = {
+        "".join(rng.choice(symbols) for _ in range(rng.randint(1, 3)))
+        for _ in range(100)
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "encoding_map.csv")
+        save_encoding_map_with_count(encoding_map, csv_path)
+        calls = {
+            "build_huffman_tree": lambda: build_huffman_tree(
+                count_dict, symbols
+            ),
+            "merge_nodes": merge,
+            "generate_encoding_map_with_count": lambda: (
+                generate_encoding_map_with_count(root, symbols, count_dict)
+            ),
+            "save_encoding_map_with_count": lambda: (
+                save_encoding_map_with_count(encoding_map, csv_path)
+            ),
+            "load_count_dict": lambda: load_count_dict(
+                csv_path, "target", "count"
+            ),
+            "filter_commands": lambda: filter_commands(
+                count_dict, symbols, taken.__contains__
+            ),
+            "decode_feed": feed,
+            "decode_batch": lambda: decoder.decode_batch(presses),
+        }
+        results = []
+        for stage in stages:
+            if stage == "filter_commands" and num_targets > MAX_FILTER_TARGETS:
+                continue
+            results.append(
+                {
+                    "stage": stage,
+                    "distribution": distribution,
+                    "num_targets": num_targets,
+                    "num_symbols": num_symbols,
+                    **measure(calls[stage]),
+                }
+            )
+    return results
+
+
+def git_revision() -> str:
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"],
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip()
+
+
+def compare(results: List[Dict], baseline_path: str, threshold: float) -> int:
+    """
+    Print the time ratio of every result to the same case in a baseline run.
+
+    :param results: The results of this run.
+    :param baseline_path: Path to the JSON output of an earlier run.
+    :param threshold: The ratio above which a case counts as a regression.
+    :return: The number of regressions.
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    def key(result):
+        return (
+            result["stage"],
+            result["distribution"],
+            result["num_targets"],
+            result["num_symbols"],
+        )
+
+    before = {key(result): result for result in baseline["results"]}
+    regressions = 0
+    for result in results:
+        if key(result) not in before:
+            continue
+        ratio = result["seconds"] / max(before[key(result)]["seconds"], 1e-9)
+        flag = ""
+        if ratio > threshold:
+            regressions += 1
+            flag = " REGRESSION"
+        print(
+            f"{result['stage']:>32} {result['distribution']:>9}"
+            f" {result['num_targets']:>8} {result['num_symbols']:>3}"
+            f" {ratio:>6.2f}x{flag}",
+            file=sys.stderr,
+        )
+    return regressions
+
+
+def parse_option(name: str, default: str) -> str:
+    """
+    Parse an option given as `--name=value`.
+
+    :param name: The option name, including the leading dashes.
+    :param default: The value if the option is not given.
+    :return: The option value.
+    """
+    for arg in sys.argv[1:]:
+        if arg.startswith(f"{name}="):
+            return arg.split("=", 1)[1]
+    return default
+
+
+def main():
+    sizes = [
+        int(size)
+        for size in parse_option("--sizes", "10,1000,100000,1000000").split(
+            ","
+        )
+    ]
+    alphabets = [
+        int(size) for size in parse_option("--symbols", "2,6,64").split(",")
+    ]
+    distributions = parse_option(
+        "--distributions", ",".join(DISTRIBUTIONS)
+    ).split(",")
+    stages = parse_option("--stages", ",".join(STAGES)).split(",")
+    output = parse_option("--output", "")
+    baseline = parse_option("--compare", "")
+    threshold = float(parse_option("--threshold", "1.25"))
+
+    for name in distributions:
+        if name not in DISTRIBUTIONS:
+            sys.exit(f"Unknown distribution {name!r}")
+    for name in stages:
+        if name not in STAGES:
+            sys.exit(f"Unknown stage {name!r}")
+
+    results = []
+    for distribution in distributions:
+        for num_targets in sizes:
+            for num_symbols in alphabets:
+                print(
+                    f"{distribution} {num_targets} targets"
+                    f" {num_symbols} symbols",
+                    file=sys.stderr,
+                )
+                results.extend(
+                    run_case(
+                        distribution, num_targets, num_symbols, stages, seed=0
+                    )
+                )
+
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if baseline and compare(results, baseline, threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+import os
+import stat
+import sys
+import tempfile
+
+from huffman_arpeggio.daemon import DecoderServer, remove_stale_socket
+
+SOCKET_NAME = "huffman-arpeggio.sock"
+
+
+def default_socket_path() -> str:
+    """
+    Choose the socket path when none is given: in `XDG_RUNTIME_DIR`, or
+    else in a directory of the temporary directory that only the current
+    user can enter, so that no other user can take the path first and
+    receive the presses.
+
+    :return: The socket path.
+    :raises ValueError: If the per-user directory exists but is not a
+        private directory of the current user.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, SOCKET_NAME)
+
+    directory = os.path.join(
+        tempfile.gettempdir(), f"huffman-arpeggio-{os.getuid()}"
+    )
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    # It may have been created by someone else, so check before trusting it
+    info = os.lstat(directory)
+    if (
+        not stat.S_ISDIR(info.st_mode)
+        or info.st_uid != os.getuid()
+        or info.st_mode & 0o077
+    ):
+        raise ValueError(
+            f"{directory} is not a private directory of the current user,"
+            " pass --socket=PATH"
+        )
+    return os.path.join(directory, SOCKET_NAME)
+
+
+def parse_option(name: str, default=None):
+    """
+    Parse an option given as `--name=value`.
+
+    :param name: The option name, including the leading dashes.
+    :param default: The value if the option is not given.
+    :return: The option value.
+    """
+    for arg in sys.argv[1:]:
+        if arg.startswith(f"{name}="):
+            return arg.split("=", 1)[1]
+    return default
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    logger = logging.getLogger(__name__)
+
+    paths = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if len(paths) != 1:
+        sys.exit(f"Usage: {sys.argv[0]} LAYOUT_FILE [--socket=PATH]")
+
+    server = DecoderServer(paths[0])
+    try:
+        socket_path = parse_option("--socket") or default_socket_path()
+        remove_stale_socket(socket_path)
+    except ValueError as error:
+        sys.exit(str(error))
+    logger.info(f"Serving {paths[0]} on {socket_path}, send SIGHUP to reload")
+    try:
+        asyncio.run(server.serve(socket_path))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
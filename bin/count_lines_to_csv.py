@@ -2,26 +2,99 @@
 
 import sys
 import csv
-from huffman_arpeggio.utils import generate_count_dict
+from typing import List
+
+from huffman_arpeggio import profiling
+from huffman_arpeggio.heavy_hitters import SpaceSaving
+from huffman_arpeggio.utils import count_lines, iter_lines
+
+USAGE = (
+    "Usage: count-lines-to-csv [--top-k=K] [--chunk-size=BYTES]"
+    " [--profile[=FORMAT]] < LINES"
+)
+
+# Options that take a value, given as `--name=value`
+VALUE_OPTIONS = ("--top-k", "--chunk-size")
+
+
+def check_options(argv: List[str]):
+    """
+    Exit with the usage if any argument is not a known option, so that a
+    misspelled option is not silently ignored.
+
+    :param argv: The command line arguments.
+    """
+    for arg in argv[1:]:
+        name, equals, _ = arg.partition("=")
+        if name in VALUE_OPTIONS and equals:
+            continue
+        if name == "--profile":
+            continue
+        if name in VALUE_OPTIONS:
+            sys.exit(f"Option {name} needs a value, as {name}=VALUE\n{USAGE}")
+        sys.exit(f"Unknown argument {arg!r}\n{USAGE}")
+
+
+def parse_int_option(name: str, default=None):
+    """
+    Parse an integer option given as `--name=value`.
+
+    :param name: The option name, including the leading dashes.
+    :param default: The value if the option is not given.
+    :return: The option value.
+    """
+    for arg in sys.argv[1:]:
+        if arg.startswith(f"{name}="):
+            value = arg.split("=", 1)[1]
+            try:
+                return int(value)
+            except ValueError:
+                sys.exit(f"Option {name} needs an integer, not {value!r}")
+    return default
 
 
 def main():
-    # Read lines from stdin
-    input_lines = sys.stdin.read().strip().split("\n")
+    check_options(sys.argv)
+    with profiling.profile_cli(sys.argv):
+        count_lines_to_csv()
+
+
+def count_lines_to_csv():
+    top_k = parse_int_option("--top-k")
+    chunk_size = parse_int_option("--chunk-size", 1 << 20)
+
+    # Stream lines from stdin
+    input_lines = iter_lines(sys.stdin, chunk_size)
+
+    writer = csv.writer(sys.stdout)
+    if top_k is not None:
+        # Approximate top counts in bounded memory, where the true count of
+        # each target lies between count - error and count
+        summary = SpaceSaving(top_k)
+        with profiling.stage("count_lines"):
+            summary.update_all(input_lines)
+        with profiling.stage("output"):
+            writer.writerow(["target", "count", "error"])
+            for target, count, error in summary.top():
+                writer.writerow([target, count, error])
+        return
 
     # Generate the count dictionary
-    count_dict = generate_count_dict(input_lines)
+    with profiling.stage("count_lines"):
+        count_dict = count_lines(input_lines)
+    profiling.count("distinct_lines", len(count_dict))
 
     # Sort the dictionary by descending count
-    sorted_count_list = sorted(
-        count_dict.items(), key=lambda item: item[1], reverse=True
-    )
+    with profiling.stage("sort"):
+        sorted_count_list = sorted(
+            count_dict.items(), key=lambda item: item[1], reverse=True
+        )
 
     # Output CSV to stdout
-    writer = csv.writer(sys.stdout)
-    writer.writerow(["target", "count"])
-    for target, count in sorted_count_list:
-        writer.writerow([target, count])
+    with profiling.stage("output"):
+        writer.writerow(["target", "count"])
+        for target, count in sorted_count_list:
+            writer.writerow([target, count])
 
 
 if __name__ == "__main__":
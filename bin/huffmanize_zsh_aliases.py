@@ -1,40 +1,191 @@
 #!/usr/bin/env python3
 
+import functools
+import hashlib
+import json
 import logging
-import shlex
+import math
+import os
 import subprocess
 import sys
-from typing import Dict, List, Tuple
+import tempfile
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from rich import print
 
-from huffman_arpeggio.core import (
-    build_huffman_tree,
-    generate_encoding_map_with_count,
-)
+from huffman_arpeggio import profiling
+from huffman_arpeggio.constrained import build_constrained_encoding_map
+from huffman_arpeggio.layout_cache import LayoutCache, cached_layout
 from huffman_arpeggio.utils import generate_count_dict
 
+# Every name that zsh would resolve before an alias we define: commands in
+# the PATH, builtins, functions, aliases and reserved words
+ZSH_NAMES_COMMAND = (
+    "print -rl -- ${(k)commands} ${(k)builtins} ${(k)functions}"
+    " ${(k)aliases} ${(k)galiases} ${(k)reswords}"
+)
+
+# Seconds to wait for an interactive Zsh to start and print its names
+ZSH_TIMEOUT = 30
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+    "huffman-arpeggio",
+    "zsh-names.json",
+)
+
+
+def zsh_config_files() -> List[str]:
+    """
+    List the Zsh startup files that can define functions and aliases.
+
+    :return: A list of file paths, which may not exist.
+    """
+    zdotdir = os.environ.get("ZDOTDIR", os.path.expanduser("~"))
+    return [
+        os.path.join(zdotdir, name)
+        for name in (".zshenv", ".zprofile", ".zshrc")
+    ] + ["/etc/zshenv", "/etc/zshrc", "/etc/zsh/zshenv", "/etc/zsh/zshrc"]
+
+
+def shell_names_fingerprint() -> str:
+    """
+    Fingerprint everything the shell names depend on: the PATH directories
+    and their modification times, and the contents of the startup files.
+
+    :return: A hex digest that changes when the shell names may change.
+    """
+    digest = hashlib.sha256()
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            mtime = -1
+        digest.update(f"{directory}\0{mtime}\n".encode())
+    for path in zsh_config_files():
+        try:
+            with open(path, "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+        except OSError:
+            digest.update(b"-")
+    return digest.hexdigest()
+
+
+def dump_shell_names() -> Optional[Set[str]]:
+    """
+    Collect every command, builtin, function, alias and reserved word known
+    to an interactive Zsh, in a single shell invocation.
+
+    :return: The set of names, or None if Zsh is missing, fails, times out
+        or prints no names.
+    """
+    logger = logging.getLogger(__name__)
+
+    profiling.count("subprocess_calls")
+    with profiling.stage("dump_shell_names"):
+        try:
+            result = subprocess.run(
+                ["zsh", "-i", "-c", ZSH_NAMES_COMMAND],
+                capture_output=True,
+                text=True,
+                timeout=ZSH_TIMEOUT,
+            )
+        except (OSError, subprocess.TimeoutExpired) as error:
+            logger.warning(f"Could not run zsh: {error}")
+            return None
+    if result.returncode != 0:
+        logger.warning(
+            f"zsh exited with status {result.returncode}:"
+            f" {result.stderr.strip()}"
+        )
+        return None
+    names = set(result.stdout.split("\n")) - {""}
+    if not names:
+        logger.warning("zsh printed no shell names")
+        return None
+    return names
+
+
+def load_shell_names(
+    cache_path: str = DEFAULT_CACHE_PATH,
+) -> Optional[Set[str]]:
+    """
+    Load the shell names from the disk cache, dumping them from Zsh only if
+    the PATH directories or startup files changed since they were cached.
+
+    :param cache_path: Path to the cache file.
+    :return: The set of names, or None if they could not be dumped, in
+        which case nothing is cached.
+    """
+    logger = logging.getLogger(__name__)
+    fingerprint = shell_names_fingerprint()
+
+    try:
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if cached["fingerprint"] == fingerprint:
+            profiling.count("shell_names_cache_hits")
+            return set(cached["names"])
+    except (OSError, ValueError, KeyError):
+        pass
+
+    profiling.count("shell_names_cache_misses")
+    logger.info("Shell names cache is stale, dumping names from zsh")
+    names = dump_shell_names()
+    if names is None:
+        return None
+    try:
+        cache_dir = os.path.dirname(cache_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(
+                    {"fingerprint": fingerprint, "names": sorted(names)}, f
+                )
+            os.replace(temp_path, cache_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    except OSError as error:
+        logger.warning(f"Could not write shell names cache: {error}")
+    return names
+
+
+@functools.lru_cache(maxsize=None)
+def get_shell_names() -> Optional[Set[str]]:
+    """
+    Get the shell names, loading them at most once per process.
+
+    :return: The set of names, or None if they could not be dumped.
+    """
+    return load_shell_names()
+
 
-def is_alias_conflict(alias: str) -> bool:
+def is_alias_conflict(
+    alias: str, shell_names: Optional[Set[str]] = None
+) -> bool:
     """
     Check if the alias conflicts with an existing command in the PATH, Zsh
     functions, aliases, shell builtins, or keywords.
 
     :param alias: The alias to check.
-    :return: True if there is a conflict, False otherwise.
+    :param shell_names: Optional set of names to check against. Defaults to
+        `get_shell_names`.
+    :return: True if there is a conflict, False otherwise. Without shell
+        names to check against, every alias is assumed to conflict.
     """
     logger = logging.getLogger(__name__)
 
-    result = subprocess.run(
-        ["zsh", "-i", "-c", f"type {shlex.quote(alias)}"],
-        capture_output=True,
-        text=True,
-    )
-
-    if result.stdout.strip().endswith("not found"):
+    profiling.count("conflict_checks")
+    if shell_names is None:
+        shell_names = get_shell_names()
+    if shell_names is None:
+        return True
+    if alias not in shell_names:
         return False
 
-    logger.info(f"Shell conflict: {result.stdout.strip()}")
+    logger.info(f"Shell conflict: {alias}")
     return True
 
 
@@ -53,114 +204,89 @@ def sanitize_input_lines(input_lines: List[str]) -> List[str]:
     return sanitized_lines
 
 
+def alias_max_lengths(count_dict: Dict[str, int]) -> Dict[str, int]:
+    """
+    Compute the longest alias worth defining for each command, which must be
+    shorter than half the command to pay off.
+
+    :param count_dict: A dictionary mapping commands to their counts.
+    :return: A dictionary mapping commands to their maximum alias length.
+    """
+    return {target: math.ceil(len(target) / 2) - 1 for target in count_dict}
+
+
 def filter_commands(
     count_dict: Dict[str, int],
     alphabet: List[str],
+    is_conflict: Callable[[str], bool] = is_alias_conflict,
 ) -> Dict[Tuple[str, ...], Tuple[str, int]]:
+    """
+    Assign aliases to commands, skipping aliases that conflict with shell
+    names and commands whose alias would not pay off.
+
+    :param count_dict: A dictionary mapping commands to their counts.
+    :param alphabet: A list of symbols used in the aliases.
+    :param is_conflict: Check whether an alias conflicts with a shell name.
+    :return: An encoding map with commands and counts, in descending count
+        order.
+    """
     logger = logging.getLogger(__name__)
     logger.debug(f"Initial count_dict: {count_dict}")
 
-    iteration = 0
-    previous_name_conflicts = {}
-    valid_aliases = {}
+    encoding_map = build_constrained_encoding_map(
+        count_dict,
+        alphabet,
+        max_lengths=alias_max_lengths(count_dict),
+        is_forbidden=lambda alias_path: is_conflict("".join(alias_path)),
+    )
+    if not encoding_map:
+        logger.info("No valid commands left, returning empty dictionary")
+        return {}
 
-    while True:
-        iteration += 1
-        logger.info(
-            f"Iteration: {iteration}, count_dict size: {len(count_dict)}"
-        )
+    logger.info(
+        f"Pruned {len(count_dict) - len(encoding_map)} of"
+        f" {len(count_dict)} commands"
+    )
+    encoding_map = dict(
+        sorted(encoding_map.items(), key=lambda item: item[1][1], reverse=True)
+    )
+    logger.debug(f"Final encoding map: {encoding_map}")
+    return encoding_map
 
-        # Build the Huffman tree
-        root = build_huffman_tree(count_dict, alphabet)
 
-        # Generate the encoding map
-        encoding_map = generate_encoding_map_with_count(
-            root, alphabet, count_dict
-        )
+def parse_cache_dir() -> Optional[str]:
+    """
+    Parse the layout cache directory given as `--cache-dir=PATH`.
 
-        logger.debug(f"Encoding map: {encoding_map}")
-
-        # Clone the encoding map to update it without affecting the iteration
-        updated_encoding_map = encoding_map.copy()
-
-        # Check and replace previously invalid entries with valid ones
-        for original_alias, (
-            valid_alias,
-            target,
-            count,
-        ) in valid_aliases.items():
-            if (
-                original_alias in updated_encoding_map
-                and updated_encoding_map[original_alias][0] == target
-            ):
-                logger.info(
-                    f"Substituting {original_alias} with {valid_alias}"
-                    f" in updated encoding map in iteration: {iteration}"
-                )
-                updated_encoding_map[valid_alias] = (target, count)
-                del updated_encoding_map[original_alias]
-
-        # Filter aliases
-        pruned = False
-        new_count_dict = {}
-        for alias_path, (target, count) in encoding_map.items():
-            # Check if replaced by a valid alias
-            if alias_path in valid_aliases:
-                alias_path = valid_aliases[alias_path][0]
-
-            # Check for poor ROI
-            if len(alias_path) >= len(target) / 2:
-                pruned = True
-                logger.info(
-                    f"Pruned alias (poor ROI): {alias_path}, target: {target}"
-                )
+    :return: The directory, or None if layouts should not be cached.
+    """
+    for arg in sys.argv[1:]:
+        if arg.startswith("--cache-dir="):
+            return arg.split("=", 1)[1]
+    return None
 
-            # Check for conflicts
-            elif alias_path in previous_name_conflicts or is_alias_conflict(
-                "".join(alias_path)
-            ):
-                pruned = True
-                previous_name_conflicts[alias_path] = target
-                logger.info(
-                    f"Pruned alias (conflict): {alias_path}, target: {target}"
-                )
 
-                # Augment the alias path to avoid conflict
-                augmented_alias_path = alias_path
-                augment_index = 0
-                while is_alias_conflict("".join(augmented_alias_path)):
-                    augmented_alias_path += (alphabet[augment_index],)
-                    augment_index = (augment_index + 1) % len(alphabet)
-                if len(augmented_alias_path) < len(target) / 2:
-                    new_count_dict[target] = count_dict.get(target, 0)
-                    valid_aliases[alias_path] = (
-                        augmented_alias_path,
-                        target,
-                        count,
-                    )
-
-            # No pruning needed, add to new count_dict
-            else:
-                new_count_dict[target] = count_dict.get(target, 0)
-
-        if not pruned:
-            logger.info("No pruning needed, returning encoding map")
-            updated_encoding_map = dict(
-                sorted(
-                    updated_encoding_map.items(),
-                    key=lambda item: item[1][1],
-                    reverse=True,
-                )
-            )
-            logger.debug(f"Final encoding map: {updated_encoding_map}")
-            return updated_encoding_map
-        elif not new_count_dict:
-            logger.info("No valid commands left, returning empty dictionary")
-            return {}
-        else:
-            count_dict = new_count_dict
+def cached_filter_commands(
+    count_dict: Dict[str, int],
+    alphabet: List[str],
+    cache_dir: Optional[str] = None,
+) -> Dict[Tuple[str, ...], Tuple[str, int]]:
+    """
+    Filter commands with `filter_commands`, caching the result on disk.
 
-            logger.info(f"New count_dict size: {len(count_dict)}")
+    :param count_dict: A dictionary mapping commands to their counts.
+    :param alphabet: A list of symbols used in the aliases.
+    :param cache_dir: Optional layout cache directory.
+    :return: An encoding map with commands and counts.
+    """
+    # Without shell names every alias is a conflict, which must not be
+    # cached as if it were the layout for this shell
+    if cache_dir is None or get_shell_names() is None:
+        return filter_commands(count_dict, alphabet)
+    # Aliases also depend on which shell names they must not shadow
+    return cached_layout(
+        LayoutCache(cache_dir), shell_names=shell_names_fingerprint()
+    )(filter_commands)(count_dict, alphabet)
 
 
 def main():
@@ -178,43 +304,50 @@ def main():
     else:
         logger.setLevel(logging.WARNING)
 
-    # Read lines from stdin
-    input_lines = sys.stdin.read().strip().split("\n")
-    logger.debug(f"Input lines: {input_lines}")
-
-    # Sanitize input lines
-    input_lines = sanitize_input_lines(input_lines)
-    logger.debug(f"Sanitized input lines: {input_lines}")
-
-    # Generate the count dictionary
-    count_dict = generate_count_dict(input_lines)
-
-    # Filter out commands with count < 4
-    count_dict = {
-        cmd: count for cmd, count in count_dict.items() if count >= 4
-    }
-    logger.debug(f"Filtered count_dict: {count_dict}")
-
-    # Define the alphabet for encoding
-    alphabet = [
-        "j",
-        "f",
-        "k",
-        "d",
-        "l",
-        "s",
-    ]
-
-    # Filter commands to get the final encoding map
-    final_encoding_map = filter_commands(count_dict, alphabet)
-
-    if not final_encoding_map:
-        return
-
-    # Generate the final Zsh aliases from the encoding map
-    for alias_path, (target, count) in final_encoding_map.items():
-        alias_name = "".join(alias_path)
-        print(f"alias {alias_name}='{target}'")
+    with profiling.profile_cli(sys.argv):
+        # Read lines from stdin
+        with profiling.stage("read_input"):
+            input_lines = sys.stdin.read().strip().split("\n")
+        logger.debug(f"Input lines: {input_lines}")
+
+        # Sanitize input lines
+        input_lines = sanitize_input_lines(input_lines)
+        logger.debug(f"Sanitized input lines: {input_lines}")
+
+        # Generate the count dictionary
+        with profiling.stage("count_commands"):
+            count_dict = generate_count_dict(input_lines)
+
+        # Filter out commands with count < 4
+        count_dict = {
+            cmd: count for cmd, count in count_dict.items() if count >= 4
+        }
+        logger.debug(f"Filtered count_dict: {count_dict}")
+
+        # Define the alphabet for encoding
+        alphabet = [
+            "j",
+            "f",
+            "k",
+            "d",
+            "l",
+            "s",
+        ]
+
+        # Filter commands to get the final encoding map
+        with profiling.stage("filter_commands"):
+            final_encoding_map = cached_filter_commands(
+                count_dict, alphabet, parse_cache_dir()
+            )
+
+        if not final_encoding_map:
+            return
+
+        # Generate the final Zsh aliases from the encoding map
+        with profiling.stage("output"):
+            for alias_path, (target, count) in final_encoding_map.items():
+                alias_name = "".join(alias_path)
+                print(f"alias {alias_name}='{target}'")
 
 
 if __name__ == "__main__":
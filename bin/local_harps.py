@@ -2,23 +2,31 @@
 
 import os
 import subprocess
+import sys
 
 from rich import print
 
-from bin.huffmanize_zsh_aliases import filter_commands, sanitize_input_lines
+from bin.huffmanize_zsh_aliases import (
+    cached_filter_commands,
+    parse_cache_dir,
+    sanitize_input_lines,
+)
+from huffman_arpeggio import profiling
 from huffman_arpeggio.utils import generate_count_dict
 
 
 def get_history():
-    result = subprocess.run(
-        ["atuin", "history", "list", "--format", "{command}", "--cwd"],
-        capture_output=True,
-        text=True,
-    )
+    profiling.count("subprocess_calls")
+    with profiling.stage("get_history"):
+        result = subprocess.run(
+            ["atuin", "history", "list", "--format", "{command}", "--cwd"],
+            capture_output=True,
+            text=True,
+        )
     return result.stdout.strip().split("\n")
 
 
-def generate_aliases(history, alphabet, min_count=4):
+def generate_aliases(history, alphabet, min_count=4, cache_dir=None):
     count_dict = generate_count_dict(history)
     count_dict = {
         cmd: count for cmd, count in count_dict.items() if count >= min_count
@@ -27,7 +35,9 @@ def generate_aliases(history, alphabet, min_count=4):
     if not count_dict:
         return {}
 
-    final_encoding_map = filter_commands(count_dict, alphabet)
+    final_encoding_map = cached_filter_commands(
+        count_dict, alphabet, cache_dir
+    )
     aliases = {
         "".join(alias_path): target
         for alias_path, (target, _) in final_encoding_map.items()
@@ -42,17 +52,22 @@ def print_aliases(aliases):
 
 
 def main():
-    alphabet = ["j", "f", "k", "d", "l", "s"]
-    history = get_history()
-    sanitized_history = sanitize_input_lines(history)
-    aliases = generate_aliases(sanitized_history, alphabet)
-
-    os.makedirs(".keykapp", exist_ok=True)
-    with open(".keykapp/local_harps.sh", "w") as f:
-        for alias, command in aliases.items():
-            f.write(f"alias {alias}='{command}'\n")
-
-    print_aliases(aliases)
+    with profiling.profile_cli(sys.argv):
+        alphabet = ["j", "f", "k", "d", "l", "s"]
+        history = get_history()
+        sanitized_history = sanitize_input_lines(history)
+        with profiling.stage("generate_aliases"):
+            aliases = generate_aliases(
+                sanitized_history, alphabet, cache_dir=parse_cache_dir()
+            )
+
+        with profiling.stage("output"):
+            os.makedirs(".keykapp", exist_ok=True)
+            with open(".keykapp/local_harps.sh", "w") as f:
+                for alias, command in aliases.items():
+                    f.write(f"alias {alias}='{command}'\n")
+
+            print_aliases(aliases)
 
 
 if __name__ == "__main__":
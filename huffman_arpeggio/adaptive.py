@@ -0,0 +1,427 @@
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from huffman_arpeggio.core import ascending_order, calculate_padding
+
+
+class AdaptiveHuffman:
+    """
+    An n-ary Huffman code that stays optimal while counts change, in the
+    style of the FGK adaptive Huffman algorithm.
+
+    Nodes are kept in a list ordered by nonincreasing weight, with the root
+    first and every parent before its children. The children of each
+    internal node occupy one aligned group of `num_branches` consecutive
+    positions (positions 1..n, n+1..2n, ...), which is the n-ary sibling
+    property and guarantees the tree is a Huffman tree. A node's position
+    within its group selects its symbol, so the heaviest sibling gets the
+    first symbol, as in `generate_encoding_map_with_count`.
+
+    Incrementing a count walks from the leaf to the root, swapping each node
+    with the first node of equal weight before increasing it, so a unit
+    update is O(depth). Zero-weight padding leaves keep the tree full and
+    are reused before any leaf has to be split to make room. Zero-weight
+    leaves are interchangeable, so a target whose count leaves zero first
+    takes the place of the first empty leaf.
+
+    :param symbols: A list of symbols used in the encoding.
+    :param count_dict: Optional initial counts, built statically.
+    :raises ValueError: If symbols are not unique or if inputs are invalid.
+    """
+
+    def __init__(
+        self, symbols: List[str], count_dict: Optional[Dict[str, int]] = None
+    ):
+        if len(symbols) < 2:
+            raise ValueError("symbols must have at least two symbols")
+        if len(symbols) != len(set(symbols)):
+            raise ValueError(
+                "Symbols must be unique to ensure a prefix-free encoding"
+            )
+
+        self.symbols = list(symbols)
+        self.num_branches = len(symbols)
+
+        # Per-node state, indexed by node id
+        self._weight: List[int] = []
+        self._target: List[Optional[str]] = []
+        self._child_group: List[int] = []
+        self._position: List[int] = []
+
+        # Node ids by position, and the parent of each group of siblings
+        self._order: List[int] = []
+        self._group_parent: List[int] = []
+
+        self._leaf: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._block_start: Dict[int, int] = {}
+        self._dirty: Set[int] = set()
+
+        self._build(count_dict or {})
+        self._codes: Dict[str, Tuple[str, ...]] = {
+            target: self.code(target) for target in self._leaf
+        }
+
+    def __len__(self) -> int:
+        return len(self._leaf)
+
+    def __contains__(self, target: str) -> bool:
+        return target in self._leaf
+
+    def _new_node(self, weight: int, target: Optional[str]) -> int:
+        node = len(self._weight)
+        self._weight.append(weight)
+        self._target.append(target)
+        self._child_group.append(-1)
+        self._position.append(-1)
+        if target is not None:
+            self._leaf[target] = node
+        return node
+
+    def _build(self, count_dict: Dict[str, int]):
+        """
+        Build the initial tree with the two-queue merge. Nodes leave the
+        queues in nondecreasing weight order, D siblings at a time, so the
+        reversed removal order already satisfies the sibling property.
+        """
+        targets = list(count_dict)
+        counts = list(count_dict.values())
+        if any(count < 0 for count in counts):
+            raise ValueError("counts must not be negative")
+
+        if not targets:
+            self._free.append(self._new_node(0, None))
+            self._place([self._free[0]])
+            return
+
+        _, num_padding = calculate_padding(len(targets), self.num_branches)
+        leaves = [self._new_node(0, None) for _ in range(num_padding)]
+        self._free.extend(leaves)
+        leaves += [
+            self._new_node(counts[i], targets[i])
+            for i in ascending_order(counts)
+        ]
+
+        removed: List[int] = []
+        parents: List[int] = []
+        merged: List[int] = []
+        leaf_index = merged_index = 0
+        while (len(leaves) - leaf_index) + (len(merged) - merged_index) > 1:
+            children = []
+            for _ in range(self.num_branches):
+                if merged_index == len(merged) or (
+                    leaf_index < len(leaves)
+                    and self._weight[leaves[leaf_index]]
+                    <= self._weight[merged[merged_index]]
+                ):
+                    children.append(leaves[leaf_index])
+                    leaf_index += 1
+                else:
+                    children.append(merged[merged_index])
+                    merged_index += 1
+            parent = self._new_node(
+                sum(self._weight[child] for child in children), None
+            )
+            removed.extend(children)
+            parents.append(parent)
+            merged.append(parent)
+
+        root = merged[-1] if merged else leaves[0]
+        self._place([root] + removed[::-1])
+        for group, parent in enumerate(reversed(parents)):
+            self._group_parent.append(parent)
+            self._child_group[parent] = group
+        self._layout_zeros()
+
+    def _place(self, order: List[int]):
+        self._order = order
+        for position, node in enumerate(order):
+            self._position[node] = position
+            self._block_start.setdefault(self._weight[node], position)
+
+    def _parent(self, node: int) -> int:
+        position = self._position[node]
+        if position == 0:
+            return -1
+        return self._group_parent[(position - 1) // self.num_branches]
+
+    def _children(self, node: int) -> List[int]:
+        group = self._child_group[node]
+        if group < 0:
+            return []
+        start = 1 + group * self.num_branches
+        return self._order[start : start + self.num_branches]
+
+    def _swap(self, a: int, b: int):
+        position_a, position_b = self._position[a], self._position[b]
+        self._order[position_a], self._order[position_b] = b, a
+        self._position[a], self._position[b] = position_b, position_a
+        self._dirty.add(a)
+        self._dirty.add(b)
+
+    def _equal_ancestors(self, node: int) -> List[int]:
+        """
+        Collect the ancestors of a node with the same weight, nearest first.
+        A node's parent only has its weight when all its siblings are empty.
+        """
+        weight = self._weight[node]
+        ancestors = []
+        parent = self._parent(node)
+        while parent >= 0 and self._weight[parent] == weight:
+            ancestors.append(parent)
+            parent = self._parent(parent)
+        return ancestors
+
+    def _relabel(self, a: int, b: int):
+        """
+        Exchange the targets of two zero-weight leaves, which are
+        interchangeable without changing the cost of the code.
+        """
+        target_a, target_b = self._target[a], self._target[b]
+        self._target[a], self._target[b] = target_b, target_a
+        for node, other, target in ((a, b, target_b), (b, a, target_a)):
+            if target is None:
+                self._free[self._free.index(other)] = node
+            else:
+                self._leaf[target] = node
+        self._dirty.add(a)
+        self._dirty.add(b)
+
+    def _layout_zeros(self):
+        """
+        Lay out the zero-weight nodes at the end of the order as a
+        caterpillar: in each group the empty leaves come first and at most
+        one empty internal node takes the last position, with its children
+        in the next group. The first zero-weight position then holds a leaf,
+        or an internal node whose first child is a leaf, so a zero count can
+        always be incremented locally.
+        """
+        if 0 not in self._block_start:
+            return
+        start = self._block_start[0]
+        zeros = self._order[start:]
+        leaves = deque(node for node in zeros if self._child_group[node] < 0)
+        internals = deque(
+            node for node in zeros if self._child_group[node] >= 0
+        )
+
+        position = start
+        # The root is a group of its own, otherwise fill the rest of the
+        # group the zero-weight region starts in
+        group_end = 0 if start == 0 else start + (-start % self.num_branches)
+        while position < len(self._order):
+            while position < group_end or (
+                position == group_end and not internals
+            ):
+                self._order[position] = leaves.popleft()
+                self._position[self._order[position]] = position
+                self._dirty.add(self._order[position])
+                position += 1
+            if position == group_end:
+                internal = internals.popleft()
+                group = position // self.num_branches
+                self._order[position] = internal
+                self._position[internal] = position
+                self._child_group[internal] = group
+                self._group_parent[group] = internal
+                self._dirty.add(internal)
+                position += 1
+            group_end = position + self.num_branches - 1
+
+    def _increment_once(self, node: int):
+        if self._weight[node] == 0:
+            # Move the count to the first empty position, which the zero
+            # layout keeps at or just below the first empty leaf
+            first = self._order[self._block_start[0]]
+            if self._child_group[first] < 0:
+                self._relabel(node, first)
+                node = first
+            else:
+                child = self._children(first)[0]
+                self._relabel(node, child)
+                node = child
+
+        while node >= 0:
+            weight = self._weight[node]
+            leader = self._block_start[weight]
+            ancestors = self._equal_ancestors(node)
+
+            # A node cannot swap with its own ancestor, so when the block
+            # leader is one, first move the node from under it by swapping
+            # with another node of the same weight. Only the last nonzero
+            # node can have such an ancestor, so one swap is enough. A zero
+            # count moved below the first empty internal node stays there
+            # and grows together with it.
+            if self._order[leader] in ancestors:
+                position = leader
+                while self._order[position] == node or (
+                    self._order[position] in ancestors
+                ):
+                    position += 1
+                if (
+                    weight
+                    and position < len(self._order)
+                    and self._weight[self._order[position]] == weight
+                ):
+                    self._swap(node, self._order[position])
+                    ancestors = self._equal_ancestors(node)
+
+            if self._order[leader] not in ancestors:
+                if self._order[leader] != node:
+                    self._swap(node, self._order[leader])
+                members = [node]
+            else:
+                # The node sits right below its ancestors at the start of
+                # the block, so they grow together
+                members = [node] + ancestors
+            for member in members:
+                self._weight[member] += 1
+
+            after = leader + len(members)
+            if (
+                after < len(self._order)
+                and self._weight[self._order[after]] == weight
+            ):
+                self._block_start[weight] = after
+            else:
+                del self._block_start[weight]
+            self._block_start.setdefault(weight + 1, leader)
+
+            node = self._parent(self._order[leader])
+
+    def increment(self, target: str, delta: int = 1):
+        """
+        Increase the count of a target and update the code in place.
+
+        :param target: The target to increment.
+        :param delta: The amount to add, at O(depth) per unit.
+        :raises KeyError: If the target has not been added.
+        :raises ValueError: If delta is negative.
+        """
+        if delta < 0:
+            raise ValueError("delta must not be negative")
+        if target not in self._leaf:
+            raise KeyError(target)
+        for _ in range(delta):
+            # Incrementing a zero count can move the target to another leaf
+            self._increment_once(self._leaf[target])
+
+    def add_target(self, target: str, count: int = 0):
+        """
+        Add a new target, reusing a padding leaf if one is free and
+        otherwise splitting the lightest leaf.
+
+        :param target: The target to add.
+        :param count: The initial count of the target.
+        :raises ValueError: If the target already exists.
+        """
+        if target in self._leaf:
+            raise ValueError(f"Target {target!r} already exists")
+
+        if self._free:
+            node = self._free.pop()
+            self._target[node] = target
+            self._leaf[target] = node
+            self._dirty.add(node)
+        else:
+            # The last node has the lowest weight and, as parents precede
+            # their children, is always a leaf
+            split = self._order[-1]
+            weight = self._weight[split]
+            moved = self._target[split]
+            self._target[split] = None
+            self._child_group[split] = len(self._group_parent)
+            self._group_parent.append(split)
+            self._dirty.add(split)
+
+            children = [self._new_node(weight, moved)]
+            node = self._new_node(0, target)
+            children.append(node)
+            for _ in range(self.num_branches - 2):
+                children.append(self._new_node(0, None))
+                self._free.append(children[-1])
+            for child in children:
+                self._position[child] = len(self._order)
+                self._order.append(child)
+                self._block_start.setdefault(
+                    self._weight[child], self._position[child]
+                )
+
+        self.increment(target, count)
+
+    def code(self, target: str) -> Tuple[str, ...]:
+        """
+        Get the current code of a target.
+
+        :param target: The target to look up.
+        :return: The target's code.
+        :raises KeyError: If the target has not been added.
+        """
+        path = []
+        position = self._position[self._leaf[target]]
+        while position:
+            path.append(self.symbols[(position - 1) % self.num_branches])
+            parent = self._group_parent[(position - 1) // self.num_branches]
+            position = self._position[parent]
+        path.reverse()
+        return tuple(path)
+
+    def iter_encoding_map(self) -> Iterator[Tuple[Tuple[str, ...], str, int]]:
+        """
+        Iterate over the current encoding map depth-first.
+
+        :return: An iterator of (code, target, count) triples.
+        """
+        path: List[str] = []
+        stack = [(self._order[0], 0, None)]
+        while stack:
+            node, depth, symbol = stack.pop()
+            if depth:
+                del path[depth - 1 :]
+                path.append(symbol)
+            target = self._target[node]
+            if target is not None:
+                yield tuple(path), target, self._weight[node]
+            children = self._children(node)
+            for i in reversed(range(len(children))):
+                stack.append((children[i], depth + 1, self.symbols[i]))
+
+    def encoding_map(self) -> Dict[Tuple[str, ...], Tuple[str, int]]:
+        """
+        Get the current encoding map with targets and counts.
+
+        :return: An encoding map with targets and counts.
+        """
+        return {
+            path: (target, count)
+            for path, target, count in self.iter_encoding_map()
+        }
+
+    def pop_code_changes(
+        self,
+    ) -> Dict[str, Tuple[Optional[Tuple[str, ...]], Tuple[str, ...]]]:
+        """
+        Get the targets whose codes changed since the last call.
+
+        Only the subtrees of nodes that moved are revisited, so the cost is
+        proportional to the part of the tree that changed.
+
+        :return: A dictionary mapping each changed target to its (old, new)
+            codes, where old is None for newly added targets.
+        """
+        targets = set()
+        stack = list(self._dirty)
+        self._dirty.clear()
+        while stack:
+            node = stack.pop()
+            if self._target[node] is not None:
+                targets.add(self._target[node])
+            stack.extend(self._children(node))
+
+        changes = {}
+        for target in targets:
+            old, new = self._codes.get(target), self.code(target)
+            if old != new:
+                changes[target] = (old, new)
+                self._codes[target] = new
+        return changes
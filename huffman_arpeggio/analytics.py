@@ -0,0 +1,286 @@
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from huffman_arpeggio.arrow_io import LayoutColumns
+from huffman_arpeggio.canonical import assign_canonical_codes
+from huffman_arpeggio.core import huffman_code_lengths
+from huffman_arpeggio.layout_cache import EncodingMap
+from huffman_arpeggio.length_limited import package_merge_code_lengths
+
+
+@dataclass(frozen=True)
+class LayoutStats:
+    """
+    How well a layout encodes a set of counts.
+
+    :param name: The name of the layout or alphabet.
+    :param symbols: The symbols used in the encoding.
+    :param num_targets: The number of targets.
+    :param expected_presses: The average code length, weighted by count.
+    :param entropy_bound: The entropy of the counts in base
+        `len(symbols)`, a lower bound on `expected_presses` for any
+        prefix-free code.
+    :param efficiency: `entropy_bound / expected_presses`, at most 1.
+    :param max_length: The longest code length.
+    :param length_histogram: The number of targets with each code length,
+        indexed by length.
+    :param symbol_usage: The share of all presses that go to each symbol,
+        in the order of `symbols`.
+    """
+
+    name: str
+    symbols: Tuple[str, ...]
+    num_targets: int
+    expected_presses: float
+    entropy_bound: float
+    efficiency: float
+    max_length: int
+    length_histogram: np.ndarray
+    symbol_usage: np.ndarray
+
+
+def entropy_bits(counts: Sequence[int]) -> float:
+    """
+    Compute the entropy of a count distribution.
+
+    :param counts: A sequence of counts.
+    :return: The entropy in bits.
+    :raises ValueError: If the counts do not have a positive total.
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    total = counts.sum()
+    if total <= 0:
+        raise ValueError("counts must have a positive total")
+    probabilities = counts[counts > 0] / total
+    return float(-(probabilities * np.log2(probabilities)).sum())
+
+
+def canonical_symbol_usage(
+    counts: np.ndarray, lengths: np.ndarray, num_branches: int
+) -> np.ndarray:
+    """
+    Compute the share of presses that go to each symbol in the canonical
+    layout of some code lengths, as built by `canonical_encoding_map`.
+
+    :param counts: The count of each target.
+    :param lengths: The code length of each target.
+    :param num_branches: The number of symbols.
+    :return: The share of presses of each symbol index.
+    """
+    order = np.lexsort((np.arange(len(counts)), -counts, lengths))
+    digits = assign_canonical_codes(lengths[order], num_branches)
+    used = digits >= 0
+    weights = np.broadcast_to(counts[order, None], digits.shape)
+    presses = np.bincount(
+        digits[used], weights=weights[used], minlength=num_branches
+    )
+    total = presses.sum()
+    return presses / total if total else presses
+
+
+def analyze_code_lengths(
+    counts: Sequence[int],
+    code_lengths: np.ndarray,
+    num_branches: Sequence[int],
+    names: Optional[Sequence[str]] = None,
+    symbols: Optional[Sequence[Sequence[str]]] = None,
+) -> List[LayoutStats]:
+    """
+    Analyze a batch of code length vectors for the same counts at once.
+
+    Expected presses, entropy bounds, efficiencies and length histograms
+    are computed for the whole batch in a few array operations. Symbol
+    usage is that of each row's canonical layout.
+
+    :param counts: The count of each target.
+    :param code_lengths: A (layouts, targets) matrix of code lengths, or a
+        single vector of them.
+    :param num_branches: The number of symbols of each layout.
+    :param names: The name of each layout. Defaults to its alphabet size.
+    :param symbols: The symbols of each layout. Defaults to symbol indices.
+    :return: The stats of each layout, in order.
+    :raises ValueError: If the counts do not have a positive total or the
+        shapes do not match.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    code_lengths = np.atleast_2d(np.asarray(code_lengths, dtype=np.int64))
+    num_branches = np.asarray(num_branches, dtype=np.int64).reshape(-1)
+    num_layouts, num_targets = code_lengths.shape
+    if num_targets != len(counts) or len(num_branches) != num_layouts:
+        raise ValueError(
+            "code_lengths must have one row per layout and one column per"
+            " target"
+        )
+    if names is None:
+        names = [f"{size} symbols" for size in num_branches.tolist()]
+    if symbols is None:
+        symbols = [
+            tuple(str(i) for i in range(size))
+            for size in num_branches.tolist()
+        ]
+
+    total = counts.sum()
+    expected = code_lengths @ counts / max(total, 1)
+    bound = entropy_bits(counts) / np.log2(num_branches)
+    efficiency = np.divide(
+        bound, expected, out=np.ones(num_layouts), where=expected > 0
+    )
+    max_lengths = code_lengths.max(axis=1)
+
+    # One histogram per row, by offsetting each row into its own bins
+    num_bins = int(max_lengths.max()) + 1
+    offsets = np.arange(num_layouts)[:, None] * num_bins
+    histograms = np.bincount(
+        (code_lengths + offsets).ravel(), minlength=num_layouts * num_bins
+    ).reshape(num_layouts, num_bins)
+
+    return [
+        LayoutStats(
+            name=names[row],
+            symbols=tuple(symbols[row]),
+            num_targets=num_targets,
+            expected_presses=float(expected[row]),
+            entropy_bound=float(bound[row]),
+            efficiency=float(efficiency[row]),
+            max_length=int(max_lengths[row]),
+            length_histogram=histograms[row, : max_lengths[row] + 1],
+            symbol_usage=canonical_symbol_usage(
+                counts, code_lengths[row], int(num_branches[row])
+            ),
+        )
+        for row in range(num_layouts)
+    ]
+
+
+def analyze_alphabets(
+    count_dict: Dict[str, int],
+    alphabets: Dict[str, Sequence[str]],
+    max_length: Optional[int] = None,
+) -> List[LayoutStats]:
+    """
+    Compare the optimal layouts of the same counts over several alphabets,
+    without building any trees.
+
+    :param count_dict: A dictionary mapping targets to their counts.
+    :param alphabets: A dictionary mapping names to the symbols of each
+        candidate alphabet.
+    :param max_length: Optional maximum code length, see
+        `package_merge_code_lengths`.
+    :return: The stats of each alphabet's optimal layout, in order.
+    :raises ValueError: If count_dict is empty, or the targets do not fit
+        in `max_length` presses of some alphabet.
+    """
+    if not count_dict:
+        raise ValueError("count_dict must not be empty")
+    counts = list(count_dict.values())
+    code_lengths = np.empty((len(alphabets), len(counts)), dtype=np.int64)
+    for row, symbols in enumerate(alphabets.values()):
+        if max_length is None:
+            code_lengths[row] = huffman_code_lengths(counts, len(symbols))
+        else:
+            code_lengths[row] = package_merge_code_lengths(
+                counts, len(symbols), max_length
+            )
+    return analyze_code_lengths(
+        counts,
+        code_lengths,
+        [len(symbols) for symbols in alphabets.values()],
+        names=list(alphabets),
+        symbols=list(alphabets.values()),
+    )
+
+
+def analyze_layout(
+    name: str, encoding_map: EncodingMap, symbols: Sequence[str]
+) -> LayoutStats:
+    """
+    Analyze an existing layout, e.g. a constrained or hand-edited one whose
+    codes are not canonical.
+
+    :param name: The name of the layout.
+    :param encoding_map: An encoding map with targets and counts.
+    :param symbols: The symbols used in the encoding.
+    :return: The stats of the layout, with symbol usage from its own codes.
+    :raises ValueError: If the layout is empty or uses unknown symbols.
+    """
+    if not encoding_map:
+        raise ValueError("encoding_map must not be empty")
+    symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+    try:
+        presses = [
+            symbol_index[symbol] for path in encoding_map for symbol in path
+        ]
+    except KeyError as error:
+        raise ValueError(f"Unknown symbol {error.args[0]!r}") from None
+
+    offsets = np.zeros(len(encoding_map) + 1, dtype=np.int64)
+    np.cumsum([len(path) for path in encoding_map], out=offsets[1:])
+    columns = LayoutColumns(
+        symbols=list(symbols),
+        offsets=offsets,
+        presses=np.array(presses, dtype=np.int64),
+        targets=[target for target, _ in encoding_map.values()],
+        counts=np.array(
+            [count for _, count in encoding_map.values()], dtype=np.int64
+        ),
+    )
+    return analyze_columns(name, columns)
+
+
+def analyze_columns(name: str, columns: LayoutColumns) -> LayoutStats:
+    """
+    Analyze a layout in columns, e.g. as loaded by `load_arrow_columns` or
+    `load_parquet_columns`, without building its encoding map.
+
+    :param name: The name of the layout.
+    :param columns: The layout's columns.
+    :return: The stats of the layout, with symbol usage from its own codes.
+    :raises ValueError: If the layout is empty.
+    """
+    if not len(columns):
+        raise ValueError("columns must not be empty")
+    symbols = columns.symbols
+    lengths = columns.code_lengths
+    stats = analyze_code_lengths(
+        columns.counts,
+        lengths,
+        [len(symbols)],
+        names=[name],
+        symbols=[symbols],
+    )[0]
+
+    presses = np.bincount(
+        columns.presses,
+        weights=np.repeat(columns.counts, lengths),
+        minlength=len(symbols),
+    )
+    total = presses.sum()
+    return replace(stats, symbol_usage=presses / total if total else presses)
+
+
+def format_stats_table(stats: Sequence[LayoutStats]) -> str:
+    """
+    Format layout stats as an aligned table, most efficient first.
+
+    :param stats: Stats from `analyze_code_lengths`, `analyze_alphabets`,
+        `analyze_layout` or `analyze_columns`.
+    :return: The table.
+    """
+    lines = [
+        f"{'layout':<24} {'symbols':>7} {'targets':>8} {'presses':>8}"
+        f" {'bound':>8} {'efficiency':>10} {'max':>4} {'busiest':>14}"
+    ]
+    for layout in sorted(stats, key=lambda layout: -layout.efficiency):
+        busiest = int(np.argmax(layout.symbol_usage))
+        usage = (
+            f"{layout.symbols[busiest]} " f"{layout.symbol_usage[busiest]:.1%}"
+        )
+        lines.append(
+            f"{layout.name:<24} {len(layout.symbols):>7}"
+            f" {layout.num_targets:>8} {layout.expected_presses:>8.4f}"
+            f" {layout.entropy_bound:>8.4f} {layout.efficiency:>10.2%}"
+            f" {layout.max_length:>4} {usage:>14}"
+        )
+    return "\n".join(lines)
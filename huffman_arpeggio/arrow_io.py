@@ -0,0 +1,280 @@
+import json
+from dataclasses import dataclass
+from itertools import islice
+from typing import TYPE_CHECKING, Iterator, List, Sequence
+
+import numpy as np
+
+from huffman_arpeggio.layout_cache import EncodingMap
+from huffman_arpeggio.utils import iter_rows_by_count
+
+# PyArrow is optional, and imported when a file is written or read
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+# Rows per record batch, which bounds the memory used while writing
+BATCH_SIZE = 1 << 16
+
+# Schema metadata holding the symbols in encoding order
+SYMBOLS_KEY = b"huffman_arpeggio.symbols"
+
+
+@dataclass(frozen=True)
+class LayoutColumns:
+    """
+    An encoding map as columns, as read from an Arrow or Parquet file.
+
+    The presses of row `i` are `presses[offsets[i]:offsets[i + 1]]`, each an
+    index into `symbols`.
+
+    :param symbols: The symbols used in the encoding.
+    :param offsets: The start of each row's presses, and one past the last.
+    :param presses: The symbol index of every press, row after row.
+    :param targets: The target of each row.
+    :param counts: The count of each row.
+    """
+
+    symbols: List[str]
+    offsets: np.ndarray
+    presses: np.ndarray
+    targets: List[str]
+    counts: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    @property
+    def code_lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def encoding_map(self) -> EncodingMap:
+        """
+        Build the encoding map.
+
+        :return: An encoding map with targets and counts.
+        """
+        symbols = self.symbols
+        presses = self.presses.tolist()
+        offsets = self.offsets.tolist()
+        return {
+            tuple(symbols[p] for p in presses[start:end]): (target, count)
+            for start, end, target, count in zip(
+                offsets, offsets[1:], self.targets, self.counts.tolist()
+            )
+        }
+
+
+def layout_schema(symbols: Sequence[str], dictionary: bool = True):
+    """
+    The schema of an encoding map table: a `sequence` column of presses, a
+    `target` column and a `count` column, with the symbols in the metadata.
+
+    :param symbols: The symbols used in the encoding.
+    :param dictionary: Whether presses are dictionary-encoded in Arrow, or
+        plain strings, which Parquet dictionary-encodes by itself.
+    :return: The PyArrow schema.
+    """
+    import pyarrow as pa
+
+    press_type = (
+        pa.dictionary(pa.int16(), pa.string()) if dictionary else pa.string()
+    )
+    return pa.schema(
+        [
+            pa.field("sequence", pa.list_(press_type)),
+            pa.field("target", pa.string()),
+            pa.field("count", pa.int64()),
+        ],
+        metadata={SYMBOLS_KEY: json.dumps(list(symbols)).encode()},
+    )
+
+
+def iter_record_batches(
+    encoding_map: EncodingMap,
+    symbols: Sequence[str],
+    dictionary: bool = True,
+    batch_size: int = BATCH_SIZE,
+) -> Iterator["pa.RecordBatch"]:
+    """
+    Convert an encoding map into record batches in descending count order,
+    one batch at a time.
+
+    :param encoding_map: An encoding map with targets and counts.
+    :param symbols: The symbols used in the encoding.
+    :param dictionary: Whether presses are dictionary-encoded, see
+        `layout_schema`.
+    :param batch_size: The number of rows per batch.
+    :return: An iterator of record batches.
+    :raises ValueError: If a sequence uses a symbol not in `symbols`.
+    """
+    import pyarrow as pa
+
+    schema = layout_schema(symbols, dictionary)
+    symbol_array = pa.array(list(symbols), type=pa.string())
+    symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+    rows = iter_rows_by_count(encoding_map)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        offsets = [0]
+        presses: List[int] = []
+        try:
+            for path, _, _ in batch:
+                presses.extend(symbol_index[symbol] for symbol in path)
+                offsets.append(len(presses))
+        except KeyError as error:
+            raise ValueError(f"Unknown symbol {error.args[0]!r}") from None
+
+        indices = pa.array(presses, type=pa.int16())
+        if dictionary:
+            values = pa.DictionaryArray.from_arrays(indices, symbol_array)
+        else:
+            values = symbol_array.take(indices)
+        yield pa.RecordBatch.from_arrays(
+            [
+                pa.ListArray.from_arrays(
+                    pa.array(offsets, type=pa.int32()), values
+                ),
+                pa.array([target for _, target, _ in batch], pa.string()),
+                pa.array([count for _, _, count in batch], pa.int64()),
+            ],
+            schema=schema,
+        )
+
+
+def save_encoding_map_arrow(
+    encoding_map: EncodingMap, symbols: Sequence[str], output_path: str
+):
+    """
+    Save an encoding map as an Arrow IPC file, in descending count order,
+    with presses dictionary-encoded by symbol.
+
+    :param encoding_map: An encoding map with targets and counts.
+    :param symbols: The symbols used in the encoding.
+    :param output_path: Path to the output file.
+    :raises ValueError: If a sequence uses a symbol not in `symbols`.
+    """
+    import pyarrow as pa
+
+    with pa.OSFile(output_path, "wb") as sink:
+        with pa.ipc.new_file(sink, layout_schema(symbols)) as writer:
+            for batch in iter_record_batches(encoding_map, symbols):
+                writer.write_batch(batch)
+
+
+def save_encoding_map_parquet(
+    encoding_map: EncodingMap, symbols: Sequence[str], output_path: str
+):
+    """
+    Save an encoding map as a Parquet file, in descending count order, one
+    row group per batch.
+
+    :param encoding_map: An encoding map with targets and counts.
+    :param symbols: The symbols used in the encoding.
+    :param output_path: Path to the output file.
+    :raises ValueError: If a sequence uses a symbol not in `symbols`.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = layout_schema(symbols, dictionary=False)
+    with pq.ParquetWriter(output_path, schema) as writer:
+        for batch in iter_record_batches(
+            encoding_map, symbols, dictionary=False
+        ):
+            writer.write_table(pa.Table.from_batches([batch]))
+
+
+def table_to_columns(table: "pa.Table") -> LayoutColumns:
+    """
+    Convert an encoding map table into NumPy columns, one batch at a time.
+
+    :param table: A table with the columns of `layout_schema`, with either
+        kind of press column.
+    :return: The columns.
+    :raises ValueError: If a press is not one of the symbols in the schema
+        metadata.
+    """
+    import pyarrow as pa
+
+    metadata = table.schema.metadata or {}
+    symbols = (
+        json.loads(metadata[SYMBOLS_KEY]) if SYMBOLS_KEY in metadata else []
+    )
+    symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+    known = SYMBOLS_KEY in metadata
+
+    offsets = [np.zeros(1, dtype=np.int64)]
+    presses = []
+    targets: List[str] = []
+    counts = []
+    for batch in table.to_batches():
+        sequence = batch.column(batch.schema.get_field_index("sequence"))
+        batch_offsets = sequence.offsets.to_numpy().astype(np.int64)
+        values = sequence.values
+        if not pa.types.is_dictionary(values.type):
+            values = values.dictionary_encode()
+
+        # Map the batch's own dictionary onto the symbol order
+        remap = []
+        for symbol in values.dictionary.to_pylist():
+            if symbol not in symbol_index:
+                if known:
+                    raise ValueError(f"Unknown symbol {symbol!r}")
+                symbol_index[symbol] = len(symbols)
+                symbols.append(symbol)
+            remap.append(symbol_index[symbol])
+        indices = values.indices.to_numpy(zero_copy_only=False)
+        start, end = batch_offsets[0], batch_offsets[-1]
+        presses.append(
+            np.array(remap, dtype=np.int64)[indices[start:end]]
+            if len(remap)
+            else np.zeros(0, dtype=np.int64)
+        )
+        offsets.append(batch_offsets[1:] - start + offsets[-1][-1])
+
+        targets.extend(
+            batch.column(batch.schema.get_field_index("target")).to_pylist()
+        )
+        counts.append(
+            batch.column(batch.schema.get_field_index("count"))
+            .to_numpy(zero_copy_only=False)
+            .astype(np.int64)
+        )
+
+    return LayoutColumns(
+        symbols=symbols,
+        offsets=np.concatenate(offsets),
+        presses=(
+            np.concatenate(presses) if presses else np.zeros(0, np.int64)
+        ),
+        targets=targets,
+        counts=np.concatenate(counts) if counts else np.zeros(0, np.int64),
+    )
+
+
+def load_arrow_columns(path: str) -> LayoutColumns:
+    """
+    Load an Arrow IPC file written by `save_encoding_map_arrow`, reading it
+    through a memory map.
+
+    :param path: Path to the file.
+    :return: The columns.
+    """
+    import pyarrow as pa
+
+    with pa.memory_map(path) as source:
+        return table_to_columns(pa.ipc.open_file(source).read_all())
+
+
+def load_parquet_columns(path: str) -> LayoutColumns:
+    """
+    Load a Parquet file written by `save_encoding_map_parquet`.
+
+    :param path: Path to the file.
+    :return: The columns.
+    """
+    import pyarrow.parquet as pq
+
+    return table_to_columns(pq.read_table(path))
@@ -0,0 +1,138 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from huffman_arpeggio.core import huffman_code_lengths
+from huffman_arpeggio.length_limited import package_merge_code_lengths
+
+# Codeword spaces up to 2 ** INT64_BITS are computed in int64 arithmetic
+INT64_BITS = 62
+
+
+def assign_canonical_codes(
+    lengths: np.ndarray, num_branches: int
+) -> np.ndarray:
+    """
+    Assign canonical codewords to code lengths in nondecreasing order.
+
+    Codeword `i` is the sum of the Kraft weights of all shorter or earlier
+    codewords, scaled to its own length, so every codeword is computed in a
+    single vectorized cumulative sum instead of a sequential increment.
+
+    :param lengths: The code lengths, sorted in nondecreasing order.
+    :param num_branches: The number of branches (symbols) in the code.
+    :return: A (len(lengths), max(lengths)) matrix of digits, where row `i`
+        holds codeword `i` left-aligned and padded with -1.
+    :raises ValueError: If the lengths violate the Kraft inequality.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    if not len(lengths):
+        return np.zeros((0, 0), dtype=np.int64)
+
+    max_length = int(lengths.max())
+    # Fall back to Python integers when the codeword space overflows int64
+    if max_length * np.log2(num_branches) < INT64_BITS:
+        dtype = np.int64
+    else:
+        dtype = object
+
+    base = np.array(num_branches, dtype=dtype)
+    shifts = (max_length - lengths).astype(dtype)
+    weights = base**shifts
+    kraft = np.cumsum(weights)
+    if kraft[-1] > base**max_length:
+        raise ValueError("Code lengths violate the Kraft inequality")
+    codes = (kraft - weights) // weights
+
+    digits = np.full((len(lengths), max_length), -1, dtype=np.int64)
+    for position in range(max_length):
+        shift = lengths - 1 - position
+        used = shift >= 0
+        digits[used, position] = (
+            codes[used] // base ** shift[used].astype(dtype) % num_branches
+        ).astype(np.int64)
+    return digits
+
+
+def canonical_code_lengths(
+    count_dict: Dict[str, int], symbols: List[str]
+) -> Dict[str, int]:
+    """
+    Compute the Huffman code length of each target, i.e. the lengths table
+    that fully determines a canonical layout.
+
+    :param count_dict: A dictionary mapping targets to their counts.
+    :param symbols: A list of symbols used in the encoding.
+    :return: A dictionary mapping targets to their code lengths.
+    """
+    lengths = huffman_code_lengths(list(count_dict.values()), len(symbols))
+    return dict(zip(count_dict, lengths))
+
+
+def canonical_encoding_map(
+    count_dict: Dict[str, int],
+    symbols: List[str],
+    code_lengths: Optional[Dict[str, int]] = None,
+    max_length: Optional[int] = None,
+) -> Dict[Tuple[str, ...], Tuple[str, int]]:
+    """
+    Generate a canonical Huffman encoding map without building a tree.
+
+    Targets are ordered by code length and then by descending count, and
+    codewords are assigned in that order starting from all-first-symbol, so
+    the first symbol goes to the most frequent target, as in
+    `generate_encoding_map_with_count`.
+
+    :param count_dict: A dictionary mapping targets to their counts.
+    :param symbols: A list of symbols used in the encoding.
+    :param code_lengths: Optional precomputed code lengths per target, e.g.
+        from `canonical_code_lengths`. Computed from the counts if omitted.
+    :param max_length: Optional maximum code length used when computing the
+        code lengths, see `package_merge_code_lengths`.
+    :return: An encoding map with targets and counts.
+    :raises ValueError: If symbols are not unique or if inputs are invalid.
+    """
+    if not count_dict:
+        raise ValueError("count_dict must not be empty")
+    if not symbols:
+        raise ValueError("symbols must not be empty")
+    if len(symbols) != len(set(symbols)):
+        raise ValueError(
+            "Symbols must be unique to ensure a prefix-free encoding"
+        )
+
+    targets = list(count_dict)
+    values = list(count_dict.values())
+    counts = np.array(values, dtype=np.int64)
+    if code_lengths is None and max_length is not None:
+        lengths = package_merge_code_lengths(values, len(symbols), max_length)
+    elif code_lengths is None:
+        lengths = np.array(
+            huffman_code_lengths(values, len(symbols)), dtype=np.int64
+        )
+    else:
+        lengths = np.array(
+            [code_lengths[target] for target in targets], dtype=np.int64
+        )
+
+    order = np.lexsort((np.arange(len(targets)), -counts, lengths))
+    sorted_lengths = lengths[order]
+    digits = assign_canonical_codes(sorted_lengths, len(symbols))
+
+    # Map digits to symbols one code length at a time, so each block is a
+    # single vectorized gather
+    symbol_array = np.empty(len(symbols), dtype=object)
+    symbol_array[:] = symbols
+    boundaries = np.flatnonzero(np.diff(sorted_lengths)) + 1
+    codes = []
+    for block in np.split(np.arange(len(order)), boundaries):
+        length = int(sorted_lengths[block[0]])
+        block_digits = digits[block[0] : block[-1] + 1, :length]
+        codes.extend(map(tuple, symbol_array[block_digits].tolist()))
+
+    order = order.tolist()
+    return dict(
+        zip(
+            codes, zip([targets[i] for i in order], [values[i] for i in order])
+        )
+    )
@@ -0,0 +1,218 @@
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from huffman_arpeggio.core import Node, ascending_order, calculate_padding
+
+
+@dataclass(frozen=True)
+class CompactTree:
+    """
+    A Huffman tree stored as flat arrays instead of a `Node` object graph.
+
+    Nodes are laid out in breadth-first order, so the children of an internal
+    node `i` occupy the contiguous range
+    `first_child[i] .. first_child[i] + num_branches - 1`, and a parent
+    always precedes its children. Node 0 is the root.
+
+    :param parent: Index of each node's parent, -1 for the root.
+    :param first_child: Index of each node's first child, -1 for leaves.
+    :param count: The count of each node.
+    :param target_id: Index into `targets` for leaves, -1 for internal and
+        padding nodes.
+    :param edge: Position of each node among its siblings, which selects the
+        symbol on the edge from its parent.
+    :param targets: The target strings referenced by `target_id`.
+    :param num_branches: The number of branches in the Huffman tree.
+    """
+
+    parent: array
+    first_child: array
+    count: array
+    target_id: array
+    edge: array
+    targets: List[str]
+    num_branches: int
+
+    def __len__(self) -> int:
+        return len(self.count)
+
+    @classmethod
+    def from_node(cls, root: Node, num_branches: int) -> "CompactTree":
+        """
+        Convert a `Node` tree into a compact tree.
+
+        :param root: The root of the Huffman tree.
+        :param num_branches: The number of branches in the Huffman tree.
+        :return: The equivalent compact tree.
+        :raises ValueError: If an internal node does not have exactly
+            `num_branches` children.
+        """
+        parent = array("i")
+        first_child = array("i")
+        count = array("q")
+        target_id = array("i")
+        edge = array("H")
+        targets = []
+
+        queue = deque([(root, -1, 0)])
+        while queue:
+            node, parent_index, edge_index = queue.popleft()
+            parent.append(parent_index)
+            count.append(node.count)
+            edge.append(edge_index)
+            if node.target is not None:
+                target_id.append(len(targets))
+                targets.append(node.target)
+            else:
+                target_id.append(-1)
+
+            if not node.children:
+                first_child.append(-1)
+                continue
+            if len(node.children) != num_branches:
+                raise ValueError(
+                    f"Internal node has {len(node.children)} children,"
+                    f" expected {num_branches}"
+                )
+            index = len(count) - 1
+            first_child.append(len(count) + len(queue))
+            for i, child in enumerate(node.children):
+                queue.append((child, index, i))
+
+        return cls(
+            parent, first_child, count, target_id, edge, targets, num_branches
+        )
+
+    def to_node(self) -> Node:
+        """
+        Convert the compact tree back into a `Node` tree, e.g. for the
+        visualization functions.
+
+        :return: The root of the equivalent `Node` tree.
+        """
+        nodes: List[Optional[Node]] = [None] * len(self)
+        for i in reversed(range(len(self))):
+            start = self.first_child[i]
+            children = (
+                nodes[start : start + self.num_branches] if start >= 0 else []
+            )
+            tid = self.target_id[i]
+            target = self.targets[tid] if tid >= 0 else None
+            nodes[i] = Node(self.count[i], target, children)
+        return nodes[0]
+
+    def iter_leaves(
+        self, edge_symbols: List[str]
+    ) -> Iterator[Tuple[Tuple[str, ...], str]]:
+        """
+        Iterate over the target leaves in depth-first order.
+
+        :param edge_symbols: The symbol for each sibling position.
+        :return: An iterator of (path, target) pairs.
+        """
+        path: List[str] = []
+        stack = [(0, 0)]
+        while stack:
+            index, depth = stack.pop()
+            if depth:
+                del path[depth - 1 :]
+                path.append(edge_symbols[self.edge[index]])
+            tid = self.target_id[index]
+            if tid >= 0:
+                yield tuple(path), self.targets[tid]
+            start = self.first_child[index]
+            if start >= 0:
+                for child in reversed(range(start, start + self.num_branches)):
+                    stack.append((child, depth + 1))
+
+
+def build_compact_tree(
+    count_dict: Dict[str, int], symbols: List[str]
+) -> CompactTree:
+    """
+    Build the Huffman tree directly into a compact tree, without creating any
+    `Node` instances, using the two-queue merge.
+
+    :param count_dict: A dictionary mapping targets to their counts.
+    :param symbols: A list of symbols used in the encoding.
+    :return: The Huffman tree as a compact tree.
+    :raises ValueError: If symbols are not unique or if inputs are invalid.
+    """
+    if not count_dict:
+        raise ValueError("count_dict must not be empty")
+    if not symbols:
+        raise ValueError("symbols must not be empty")
+    if len(symbols) != len(set(symbols)):
+        raise ValueError(
+            "Symbols must be unique to ensure a prefix-free encoding"
+        )
+
+    num_branches = len(symbols)
+    targets = list(count_dict)
+    _, num_padding = calculate_padding(len(targets), num_branches)
+
+    # Creation order: padding first, then targets by ascending count, then
+    # merged nodes in the order they are created
+    counts = list(count_dict.values())
+    order = ascending_order(counts)
+
+    node_count = array("q", [0] * num_padding)
+    node_target = array("i", [-1] * num_padding)
+    for i in order:
+        node_count.append(counts[i])
+        node_target.append(i)
+    num_leaves = len(node_count)
+
+    kids = array("i")
+    leaf_index = 0
+    merged_index = num_leaves
+    while (num_leaves - leaf_index) + (len(node_count) - merged_index) > 1:
+        merged_count = 0
+        remaining = (num_leaves - leaf_index) + (
+            len(node_count) - merged_index
+        )
+        for _ in range(min(num_branches, remaining)):
+            if merged_index == len(node_count) or (
+                leaf_index < num_leaves
+                and node_count[leaf_index] <= node_count[merged_index]
+            ):
+                kid = leaf_index
+                leaf_index += 1
+            else:
+                kid = merged_index
+                merged_index += 1
+            merged_count += node_count[kid]
+            kids.append(kid)
+        node_count.append(merged_count)
+        node_target.append(-1)
+
+    # Relayout in breadth-first order
+    size = len(node_count)
+    parent = array("i", [-1]) * size
+    first_child = array("i", [-1]) * size
+    count = array("q", [0]) * size
+    target_id = array("i", [-1]) * size
+    edge = array("H", [0]) * size
+
+    queue = deque([(size - 1, -1, 0)])
+    position = 0
+    next_free = 1
+    while queue:
+        created, parent_index, edge_index = queue.popleft()
+        parent[position] = parent_index
+        count[position] = node_count[created]
+        target_id[position] = node_target[created]
+        edge[position] = edge_index
+        if created >= num_leaves:
+            first_child[position] = next_free
+            next_free += num_branches
+            base = (created - num_leaves) * num_branches
+            for i in range(num_branches):
+                queue.append((kids[base + i], position, i))
+        position += 1
+
+    return CompactTree(
+        parent, first_child, count, target_id, edge, targets, num_branches
+    )
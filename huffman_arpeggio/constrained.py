@@ -0,0 +1,192 @@
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from huffman_arpeggio import profiling
+from huffman_arpeggio.core import huffman_code_lengths
+
+CodeCheck = Callable[[Tuple[str, ...]], bool]
+
+
+def assign_constrained_codes(
+    targets: List[str],
+    code_lengths: List[int],
+    symbols: List[str],
+    max_lengths: Dict[str, int],
+    is_forbidden: CodeCheck,
+    is_forbidden_prefix: CodeCheck,
+) -> Tuple[Dict[str, Tuple[str, ...]], List[str]]:
+    """
+    Assign codewords in canonical order, walking the codeword space once
+    and routing around forbidden codewords.
+
+    A codeword that is forbidden as a whole is turned into a branch point
+    and its first child is tried instead, like the old alias augmentation.
+    A forbidden prefix is skipped together with all its extensions. Targets
+    whose code would exceed their maximum length are left out, without
+    using up any codeword. If skipped codewords use up the space before
+    every target has a code, the last code becomes a branch point for the
+    remaining targets.
+
+    :param targets: The targets, sorted by code length and then by
+        descending count.
+    :param code_lengths: The preferred code length of each target.
+    :param symbols: A list of symbols used in the encoding.
+    :param max_lengths: The maximum code length of each target.
+    :param is_forbidden: Whether a codeword cannot be used as a code.
+    :param is_forbidden_prefix: Whether a codeword cannot be used as a code
+        or as the prefix of one.
+    :return: The code of each assigned target, and the targets left out.
+    """
+    num_branches = len(symbols)
+    codes: Dict[str, Tuple[str, ...]] = {}
+    dropped: List[str] = []
+
+    # The next free codeword, as digits into symbols
+    cursor: List[int] = []
+    exhausted = False
+    last: Optional[Tuple[str, List[int]]] = None
+    queue = deque(zip(targets, code_lengths))
+    while queue:
+        target, length = queue.popleft()
+        if exhausted:
+            # Skipped codewords used up the space the lengths planned for,
+            # so make room below the last code, if it may grow
+            if last is None or len(last[1]) >= max_lengths[last[0]]:
+                dropped.append(target)
+                dropped.extend(target for target, _ in queue)
+                break
+            previous, cursor = last
+            del codes[previous]
+            cursor = cursor + [0]
+            queue.appendleft((target, length))
+            target, length = previous, len(cursor)
+            last = None
+            exhausted = False
+
+        digits = cursor + [0] * (max(length, 1) - len(cursor))
+        while len(digits) <= max_lengths[target]:
+            path = tuple(symbols[digit] for digit in digits)
+            # The walk may resume below a forbidden prefix, so check every
+            # prefix and not only the whole codeword
+            depth = next(
+                (
+                    k
+                    for k in range(1, len(path) + 1)
+                    if is_forbidden_prefix(path[:k])
+                ),
+                None,
+            )
+            if depth is not None:
+                # Skip the whole subtree of the shallowest forbidden prefix
+                del digits[depth:]
+                while digits and digits[-1] == num_branches - 1:
+                    digits.pop()
+                if not digits:
+                    break
+                digits[-1] += 1
+            elif is_forbidden(path):
+                digits.append(0)
+            else:
+                break
+
+        if not digits:
+            exhausted = True
+            queue.appendleft((target, length))
+            continue
+        if len(digits) > max_lengths[target]:
+            dropped.append(target)
+            continue
+
+        codes[target] = tuple(symbols[digit] for digit in digits)
+        last = (target, digits)
+        # Advance to the next free subtree, which may be shallower than the
+        # code if a forbidden codeword made it longer than planned
+        cursor = list(digits)
+        while cursor and cursor[-1] == num_branches - 1:
+            cursor.pop()
+        if cursor:
+            cursor[-1] += 1
+        else:
+            exhausted = True
+
+    return codes, dropped
+
+
+def build_constrained_encoding_map(
+    count_dict: Dict[str, int],
+    symbols: List[str],
+    max_lengths: Optional[Dict[str, int]] = None,
+    is_forbidden: Optional[CodeCheck] = None,
+    is_forbidden_prefix: Optional[CodeCheck] = None,
+    max_passes: int = 8,
+) -> Dict[Tuple[str, ...], Tuple[str, int]]:
+    """
+    Generate a prefix-free encoding map that avoids forbidden codewords and
+    leaves out targets whose code would be longer than is useful.
+
+    Each pass computes Huffman code lengths for the remaining targets and
+    assigns canonical codewords with `assign_constrained_codes`, in a
+    single walk over the codeword space. Targets left out make the others'
+    codes shorter, so passes repeat until no more targets are left out, up
+    to `max_passes`. Every pass yields a valid map, so the result is
+    deterministic and valid even if passes run out.
+
+    :param count_dict: A dictionary mapping targets to their counts.
+    :param symbols: A list of symbols used in the encoding.
+    :param max_lengths: Optional maximum code length per target.
+    :param is_forbidden: Optional check for codewords that cannot be codes,
+        but may be prefixes of codes.
+    :param is_forbidden_prefix: Optional check for codewords that cannot be
+        codes or prefixes of codes.
+    :param max_passes: The maximum number of passes.
+    :return: An encoding map with targets and counts, in canonical order.
+    :raises ValueError: If there are fewer than two symbols, or they are not
+        unique.
+    """
+    if len(symbols) < 2:
+        raise ValueError("symbols must have at least two symbols")
+    if len(symbols) != len(set(symbols)):
+        raise ValueError(
+            "Symbols must be unique to ensure a prefix-free encoding"
+        )
+
+    def never(path: Tuple[str, ...]) -> bool:
+        return False
+
+    is_forbidden = is_forbidden or never
+    is_forbidden_prefix = is_forbidden_prefix or never
+    if max_lengths is None:
+        max_lengths = {}
+    unlimited = float("inf")
+    limits = {
+        target: max_lengths.get(target, unlimited) for target in count_dict
+    }
+
+    remaining = [target for target in count_dict if limits[target] >= 1]
+    codes: Dict[str, Tuple[str, ...]] = {}
+    for _ in range(max_passes):
+        if not remaining:
+            break
+        profiling.count("constrained_passes")
+        counts = [count_dict[target] for target in remaining]
+        with profiling.stage("huffman_code_lengths"):
+            lengths = huffman_code_lengths(counts, len(symbols))
+        order = sorted(
+            range(len(remaining)), key=lambda i: (lengths[i], -counts[i])
+        )
+        with profiling.stage("assign_constrained_codes"):
+            codes, dropped = assign_constrained_codes(
+                [remaining[i] for i in order],
+                [lengths[i] for i in order],
+                symbols,
+                limits,
+                is_forbidden,
+                is_forbidden_prefix,
+            )
+        if not dropped:
+            break
+        remaining = [target for target in remaining if target in codes]
+
+    return {
+        code: (target, count_dict[target]) for target, code in codes.items()
+    }
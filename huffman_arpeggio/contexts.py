@@ -0,0 +1,353 @@
+import math
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from huffman_arpeggio.core import huffman_code_lengths
+
+# Marks a press that does not continue any code, in every context
+INVALID = -(2**31)
+
+# Chunks with fewer codes than this are not worth a round trip to a worker
+MIN_CHUNK_CODES = 1 << 16
+
+
+def num_context_states(num_targets: int, num_branches: int) -> int:
+    """
+    Count the decoding states of one context: the internal nodes of its
+    Huffman tree, which is full once padded.
+
+    :param num_targets: The number of targets in the context.
+    :param num_branches: The number of branches in the Huffman tree.
+    :return: The number of states, at least one for the root.
+    """
+    return max(1, math.ceil((num_targets - 1) / (num_branches - 1)))
+
+
+def build_context_tables(
+    count_lists: Sequence[Sequence[int]],
+    num_branches: int,
+    state_offset: int,
+    code_offset: int,
+) -> bytes:
+    """
+    Build the decode tables of consecutive contexts, numbered as they will
+    be in the whole forest.
+
+    Each context gets canonical codes from its Huffman code lengths, in
+    order of descending count. A single target gets a one-symbol code.
+
+    :param count_lists: The counts of each context's targets.
+    :param num_branches: The number of branches in the Huffman trees.
+    :param state_offset: The forest state of the first context's root.
+    :param code_offset: The forest code id of the first context's first
+        target.
+    :return: The rows of the decode table, as int32 bytes.
+    """
+    num_states = sum(
+        num_context_states(len(counts), num_branches) for counts in count_lists
+    )
+    table = [INVALID] * (num_states * num_branches)
+    next_state = 0
+    for counts in count_lists:
+        # Sorted counts take the linear path of `huffman_code_lengths`, and
+        # give nonincreasing lengths, i.e. canonical order when reversed
+        ascending = sorted(range(len(counts)), key=counts.__getitem__)
+        lengths = huffman_code_lengths(
+            [counts[i] for i in ascending], num_branches
+        )
+        if len(counts) == 1:
+            lengths = [1]
+
+        root = next_state
+        next_state += 1
+        code: List[int] = []
+        for position in range(len(counts) - 1, -1, -1):
+            # The next canonical codeword, extended to this length
+            if code:
+                while code[-1] == num_branches - 1:
+                    code.pop()
+                code[-1] += 1
+            code.extend([0] * (lengths[position] - len(code)))
+
+            state = root
+            for digit in code[:-1]:
+                slot = state * num_branches + digit
+                if table[slot] == INVALID:
+                    table[slot] = state_offset + next_state
+                    next_state += 1
+                state = table[slot] - state_offset
+            table[state * num_branches + code[-1]] = ~(
+                code_offset + ascending[position]
+            )
+
+        code_offset += len(counts)
+        if next_state - root != num_context_states(len(counts), num_branches):
+            raise ValueError("Context tree is not full")
+    return array("i", table).tobytes()
+
+
+@dataclass(frozen=True)
+class ContextForest:
+    """
+    The Huffman trees of many contexts, stored as decode tables in one set
+    of flat arrays.
+
+    Every context owns a contiguous block of states in `table`, which has
+    one row of `num_branches` entries per state as in `Decoder`: an entry
+    `>= 0` is the next state, `INVALID` is a press that continues no code,
+    and any other negative entry emits the code with id `~entry`. Code ids
+    number the (context, target) pairs, so that the targets themselves are
+    stored only once in `targets`. Switching contexts is a lookup of the
+    context's root state.
+
+    :param contexts: The contexts, indexed by context id.
+    :param context_ids: Index into `contexts` of each context.
+    :param targets: The distinct targets of all contexts.
+    :param symbols: A list of symbols used in the encoding.
+    :param table: The flat state x symbol decode table.
+    :param roots: The root state of each context.
+    :param code_offsets: The first code id of each context, and one past the
+        last.
+    :param code_targets: Index into `targets` of each code.
+    :param code_counts: The count of each code.
+    """
+
+    contexts: List[str]
+    context_ids: Dict[str, int]
+    targets: List[str]
+    symbols: List[str]
+    table: array
+    roots: array
+    code_offsets: array
+    code_targets: array
+    code_counts: array
+
+    @property
+    def num_branches(self) -> int:
+        return len(self.symbols)
+
+    @property
+    def num_states(self) -> int:
+        return len(self.table) // self.num_branches
+
+    def __len__(self) -> int:
+        return len(self.contexts)
+
+    def context_id(self, context: str) -> int:
+        """
+        Look up a context.
+
+        :param context: The context.
+        :return: Its index into `contexts`.
+        :raises KeyError: If the context is unknown.
+        """
+        return self.context_ids[context]
+
+    def iter_encoding_map(
+        self, context: str
+    ) -> Iterator[Tuple[Tuple[str, ...], str, int]]:
+        """
+        Iterate over the encoding map of one context.
+
+        :param context: The context.
+        :return: An iterator of (path, target, count) triples.
+        """
+        stack = [(self.roots[self.context_id(context)], ())]
+        while stack:
+            state, path = stack.pop()
+            row = state * self.num_branches
+            children = []
+            for digit in range(self.num_branches):
+                entry = self.table[row + digit]
+                child_path = path + (self.symbols[digit],)
+                if entry >= 0:
+                    children.append((entry, child_path))
+                elif entry != INVALID:
+                    code_id = ~entry
+                    yield (
+                        child_path,
+                        self.targets[self.code_targets[code_id]],
+                        self.code_counts[code_id],
+                    )
+            stack.extend(reversed(children))
+
+    def encoding_map(
+        self, context: str
+    ) -> Dict[Tuple[str, ...], Tuple[str, int]]:
+        """
+        Generate the encoding map of one context.
+
+        :param context: The context.
+        :return: An encoding map with targets and counts.
+        """
+        return {
+            path: (target, count)
+            for path, target, count in self.iter_encoding_map(context)
+        }
+
+
+class ContextDecoder:
+    """
+    A press decoder that switches between the trees of a `ContextForest`.
+
+    :param forest: The forest.
+    :param context: The initial context.
+    """
+
+    def __init__(self, forest: ContextForest, context: str):
+        self.forest = forest
+        self.num_branches = forest.num_branches
+        self._symbol_index = {
+            symbol: i for i, symbol in enumerate(forest.symbols)
+        }
+        self.switch(context)
+
+    def switch(self, context: str):
+        """
+        Switch to another context, discarding any partially entered code.
+
+        :param context: The context.
+        :raises KeyError: If the context is unknown.
+        """
+        self.context = context
+        self._root = self.forest.roots[self.forest.context_id(context)]
+        self._state = self._root
+
+    def reset(self):
+        """
+        Discard any partially entered code.
+        """
+        self._state = self._root
+
+    def feed_index(self, symbol_index: int) -> Optional[str]:
+        """
+        Feed one press, given as an index into `symbols`.
+
+        :param symbol_index: The index of the pressed symbol.
+        :return: The decoded target if the press completed a code, otherwise
+            None.
+        :raises ValueError: If the press does not continue any code, in
+            which case the partial code is discarded.
+        """
+        entry = self.forest.table[
+            self._state * self.num_branches + symbol_index
+        ]
+        if entry >= 0:
+            self._state = entry
+            return None
+        self._state = self._root
+        if entry == INVALID:
+            raise ValueError("Press sequence does not match any code")
+        return self.forest.targets[self.forest.code_targets[~entry]]
+
+    def feed(self, symbol: str) -> Optional[str]:
+        """
+        Feed one press.
+
+        :param symbol: The pressed symbol.
+        :return: The decoded target if the press completed a code, otherwise
+            None.
+        :raises ValueError: If the press does not continue any code, in
+            which case the partial code is discarded.
+        """
+        return self.feed_index(self._symbol_index[symbol])
+
+
+def build_context_forest(
+    context_counts: Dict[str, Dict[str, int]],
+    symbols: List[str],
+    workers: Optional[int] = None,
+) -> ContextForest:
+    """
+    Build the Huffman trees of many contexts at once, e.g. one per previous
+    character or command from n-gram counts.
+
+    The number of states of every tree is known from its number of targets,
+    so each context's block of the forest is laid out up front. Contexts
+    are then split into chunks of similar total size whose tables are built
+    in a process pool, each directly in forest numbering, and concatenated.
+
+    :param context_counts: A dictionary mapping each context to a dictionary
+        mapping targets to their counts.
+    :param symbols: A list of symbols used in the encoding.
+    :param workers: The number of worker processes. Defaults to the number
+        of CPUs, and 1 builds in the current process.
+    :return: The forest.
+    :raises ValueError: If a context has no targets, if there are fewer than
+        two symbols, or if symbols are not unique or workers not positive.
+    """
+    if len(symbols) < 2:
+        raise ValueError("symbols must have at least two symbols")
+    if len(symbols) != len(set(symbols)):
+        raise ValueError(
+            "Symbols must be unique to ensure a prefix-free encoding"
+        )
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be positive")
+    num_branches = len(symbols)
+
+    contexts = list(context_counts)
+    target_ids: Dict[str, int] = {}
+    code_targets = array("i")
+    code_counts = array("q")
+    code_offsets = array("q", [0])
+    roots = array("i")
+    count_lists = []
+    num_states = 0
+    for context in contexts:
+        count_dict = context_counts[context]
+        if not count_dict:
+            raise ValueError(f"Context {context!r} has no targets")
+        for target in count_dict:
+            code_targets.append(target_ids.setdefault(target, len(target_ids)))
+        count_lists.append(list(count_dict.values()))
+        code_counts.extend(count_lists[-1])
+        code_offsets.append(len(code_counts))
+        roots.append(num_states)
+        num_states += num_context_states(len(count_dict), num_branches)
+
+    # Split the contexts into chunks of about the same number of codes
+    num_chunks = min(4 * workers, -(-len(code_counts) // MIN_CHUNK_CODES))
+    chunk_codes = max(-(-len(code_counts) // max(num_chunks, 1)), 1)
+    bounds = [0]
+    for i in range(len(contexts)):
+        if code_offsets[i + 1] - code_offsets[bounds[-1]] >= chunk_codes:
+            bounds.append(i + 1)
+    if bounds[-1] != len(contexts):
+        bounds.append(len(contexts))
+    tasks = [
+        (
+            count_lists[start:end],
+            num_branches,
+            roots[start],
+            code_offsets[start],
+        )
+        for start, end in zip(bounds, bounds[1:])
+    ]
+
+    if workers == 1 or len(tasks) <= 1:
+        chunks = [build_context_tables(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(build_context_tables, *zip(*tasks)))
+
+    table = array("i")
+    for chunk in chunks:
+        table.frombytes(chunk)
+
+    return ContextForest(
+        contexts=contexts,
+        context_ids={context: i for i, context in enumerate(contexts)},
+        targets=list(target_ids),
+        symbols=list(symbols),
+        table=table,
+        roots=roots,
+        code_offsets=code_offsets,
+        code_targets=code_targets,
+        code_counts=code_counts,
+    )
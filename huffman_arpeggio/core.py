@@ -1,8 +1,23 @@
+from collections import deque
 from heapq import heappush, heappop, heapify
 import math
-from typing import List, Dict, Tuple, Optional
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 from dataclasses import dataclass, field
 
+from huffman_arpeggio import profiling
+
+if TYPE_CHECKING:
+    from huffman_arpeggio.compact import CompactTree
+
 
 @dataclass(order=True, frozen=True)
 class Node:
@@ -49,14 +64,133 @@ def merge_nodes(nodes: List[Node], num_branches: int) -> Optional[Node]:
     return nodes[0] if nodes else None
 
 
+def ascending_order(counts: Sequence[int]) -> Sequence[int]:
+    """
+    Return the indices of the counts in ascending count order, in linear
+    time if they are already sorted in either direction.
+
+    :param counts: A sequence of counts.
+    :return: A sequence of indices into counts, ordered by ascending count.
+    """
+    if all(a <= b for a, b in zip(counts, counts[1:])):
+        return range(len(counts))
+    if all(a >= b for a, b in zip(counts, counts[1:])):
+        return range(len(counts) - 1, -1, -1)
+    return sorted(range(len(counts)), key=counts.__getitem__)
+
+
+def sort_nodes(nodes: List[Node]) -> List[Node]:
+    """
+    Return the nodes in ascending count order, in linear time if they are
+    already sorted in either direction.
+
+    :param nodes: A list of Node instances.
+    :return: A list of the same nodes sorted by ascending count.
+    """
+    order = ascending_order([node.count for node in nodes])
+    return [nodes[i] for i in order]
+
+
+def merge_nodes_two_queue(
+    nodes: List[Node], num_branches: int
+) -> Optional[Node]:
+    """
+    Merge nodes to form the Huffman tree using the two-queue method.
+
+    Leaves are consumed in ascending count order from one queue and merged
+    nodes are appended to a second queue, which stays sorted because every
+    merge is at least as heavy as the previous one. This is O(n) for
+    presorted input and O(n log n) otherwise, and yields the same code
+    lengths as `merge_nodes` (up to ties between equal counts).
+
+    :param nodes: A list of Node instances.
+    :param num_branches: The number of branches in the Huffman tree.
+    :return: The root of the Huffman tree.
+    """
+    leaves = deque(sort_nodes(nodes))
+    merged = deque()
+
+    while len(leaves) + len(merged) > 1:
+        merged_count = 0
+        merged_children = []
+
+        for _ in range(min(num_branches, len(leaves) + len(merged))):
+            if not merged or (leaves and leaves[0].count <= merged[0].count):
+                node = leaves.popleft()
+            else:
+                node = merged.popleft()
+            merged_count += node.count
+            merged_children.append(node)
+
+        merged.append(Node(merged_count, None, merged_children))
+
+    if merged:
+        return merged[0]
+    return leaves[0] if leaves else None
+
+
+MERGE_ENGINES = {
+    "heap": merge_nodes,
+    "two_queue": merge_nodes_two_queue,
+}
+
+
+def build_tree_from_code_lengths(
+    count_dict: Dict[str, int], code_lengths: Sequence[int], num_branches: int
+) -> Node:
+    """
+    Build a tree with the given code length for each target.
+
+    Nodes are grouped level by level from the deepest up, padding each level
+    to a multiple of `num_branches`, and children are kept in ascending count
+    order like the merge engines produce.
+
+    :param count_dict: A dictionary mapping targets to their counts.
+    :param code_lengths: The code length of each target, in count_dict order.
+    :param num_branches: The number of branches in the Huffman tree.
+    :return: The root of the tree.
+    :raises ValueError: If the code lengths violate the Kraft inequality.
+    """
+    levels: Dict[int, List[Node]] = {}
+    for (target, count), length in zip(count_dict.items(), code_lengths):
+        levels.setdefault(length, []).append(Node(count, target))
+
+    nodes: List[Node] = []
+    for length in range(max(levels), 0, -1):
+        nodes = sort_nodes(levels.get(length, []) + nodes)
+        num_padding = -len(nodes) % num_branches
+        nodes = [Node(0, None) for _ in range(num_padding)] + nodes
+        nodes = [
+            Node(
+                sum(node.count for node in nodes[i : i + num_branches]),
+                None,
+                nodes[i : i + num_branches],
+            )
+            for i in range(0, len(nodes), num_branches)
+        ]
+
+    nodes = levels.get(0, []) + nodes
+    if len(nodes) != 1:
+        raise ValueError("Code lengths violate the Kraft inequality")
+    return nodes[0]
+
+
 def build_huffman_tree(
-    count_dict: Dict[str, int], symbols: List[str]
+    count_dict: Dict[str, int],
+    symbols: List[str],
+    engine: str = "heap",
+    max_length: Optional[int] = None,
 ) -> Optional[Node]:
     """
     Build the Huffman tree.
 
     :param count_dict: A dictionary mapping targets to their counts.
     :param symbols: A list of symbols used in the encoding.
+    :param engine: The merge engine to use, one of `MERGE_ENGINES`. Use
+        "two_queue" for large count tables, especially presorted ones.
+    :param max_length: Optional maximum code length (arpeggio length). If
+        given, the optimal length-limited tree is built with package-merge
+        instead, and `engine` is ignored.
     :return: The root of the Huffman tree.
     :raises ValueError: If symbols are not unique or if inputs are invalid.
     """
@@ -68,34 +202,117 @@ def build_huffman_tree(
         raise ValueError(
             "Symbols must be unique to ensure a prefix-free encoding"
         )
+    if engine not in MERGE_ENGINES:
+        raise ValueError(
+            f"Unknown engine {engine!r}, expected one of {list(MERGE_ENGINES)}"
+        )
 
     num_elements = len(count_dict)
     num_branches = len(symbols)
 
+    if max_length is not None:
+        # Imported here to keep NumPy off the default build path
+        from huffman_arpeggio.length_limited import package_merge_code_lengths
+
+        code_lengths = package_merge_code_lengths(
+            list(count_dict.values()), num_branches, max_length
+        )
+        return build_tree_from_code_lengths(
+            count_dict, code_lengths.tolist(), num_branches
+        )
+
     num_branch_points, num_padding = calculate_padding(
         num_elements, num_branches
     )
 
-    nodes = [Node(count, target) for target, count in count_dict.items()]
+    with profiling.stage("build_huffman_tree"):
+        nodes = [Node(count, target) for target, count in count_dict.items()]
 
-    for _ in range(num_padding):
-        nodes.append(Node(0, None))
+        for _ in range(num_padding):
+            nodes.append(Node(0, None))
 
-    root = merge_nodes(nodes, num_branches)
+        root = MERGE_ENGINES[engine](nodes, num_branches)
+
+    # Counted in bulk, so that the merge loops carry no hooks
+    profiling.count(
+        "nodes_created", num_elements + num_padding + num_branch_points
+    )
+    if engine == "heap":
+        # One pop per child and one push per branch point
+        profiling.count(
+            "heap_operations", (num_branches + 1) * num_branch_points
+        )
 
     return root
 
 
-def generate_encoding_map_with_count(
-    root: Node, symbols: List[str], count_dict: Dict[str, int]
-) -> Dict[Tuple[str, ...], Tuple[str, int]]:
+def huffman_code_lengths(
+    counts: Sequence[int], num_branches: int
+) -> List[int]:
     """
-    Generate an encoding map with targets and counts.
+    Compute the n-ary Huffman code length of each count without building
+    any tree nodes.
+
+    Runs the two-queue merge over plain integers, including the padding from
+    `calculate_padding`, recording only each node's parent.
+
+    :param counts: A sequence of counts.
+    :param num_branches: The number of branches in the Huffman tree.
+    :return: The code length of each count, in input order.
+    """
+    num_branch_points, num_padding = calculate_padding(
+        len(counts), num_branches
+    )
+    order = ascending_order(counts)
+    weights = [0] * num_padding + [counts[i] for i in order]
+    num_leaves = len(weights)
+    parent = [0] * (num_leaves + num_branch_points)
 
-    :param root: The root of the Huffman tree.
+    leaf_index = 0
+    merged_index = num_leaves
+    while (num_leaves - leaf_index) + (len(weights) - merged_index) > 1:
+        merged_count = 0
+        for _ in range(num_branches):
+            if merged_index == len(weights) or (
+                leaf_index < num_leaves
+                and weights[leaf_index] <= weights[merged_index]
+            ):
+                kid = leaf_index
+                leaf_index += 1
+            else:
+                kid = merged_index
+                merged_index += 1
+            merged_count += weights[kid]
+            parent[kid] = len(weights)
+        weights.append(merged_count)
+
+    depth = [0] * len(weights)
+    for node in range(len(weights) - 2, -1, -1):
+        depth[node] = depth[parent[node]] + 1
+
+    lengths = [0] * len(counts)
+    for position, i in enumerate(order):
+        lengths[i] = depth[num_padding + position]
+    return lengths
+
+
+def iter_encoding_map(
+    root: Union[Node, "CompactTree"],
+    symbols: List[str],
+    count_dict: Dict[str, int],
+) -> Iterator[Tuple[Tuple[str, ...], str, int]]:
+    """
+    Iterate over the encoding map without materializing it.
+
+    The tree is walked depth-first with an explicit stack, so deep trees do
+    not hit the recursion limit. The current path is shared between siblings
+    and each leaf's code tuple is allocated exactly once.
+
+    :param root: The root of the Huffman tree, or a `CompactTree`.
     :param symbols: A list of symbols used in the encoding.
     :param count_dict: A dictionary mapping targets to their counts.
-    :return: An encoding map with targets and counts.
+    :return: An iterator of (code, target, count) triples in the same order
+        as `generate_encoding_map_with_count`.
     """
 
     # HACK: copy and reverse the symbols list to use its order as a preference
@@ -104,16 +321,41 @@ def generate_encoding_map_with_count(
     sorted_symbols = symbols.copy()
     sorted_symbols.reverse()
 
-    def traverse(
-        node: Node,
-        path: List[str],
-        encoding_map: Dict[Tuple[str, ...], Tuple[str, int]],
-    ):
+    if not isinstance(root, Node):
+        for path, target in root.iter_leaves(sorted_symbols):
+            yield path, target, count_dict[target]
+        return
+
+    path: List[str] = []
+    stack = [(root, 0, None)]
+    while stack:
+        node, depth, symbol = stack.pop()
+        if depth:
+            del path[depth - 1 :]
+            path.append(symbol)
         if node.target is not None:
-            encoding_map[tuple(path)] = (node.target, count_dict[node.target])
-        for i, child in enumerate(node.children):
-            traverse(child, path + [sorted_symbols[i]], encoding_map)
+            yield tuple(path), node.target, count_dict[node.target]
+        for i in reversed(range(len(node.children))):
+            stack.append((node.children[i], depth + 1, sorted_symbols[i]))
 
-    encoding_map = {}
-    traverse(root, [], encoding_map)
-    return encoding_map
+
+def generate_encoding_map_with_count(
+    root: Union[Node, "CompactTree"],
+    symbols: List[str],
+    count_dict: Dict[str, int],
+) -> Dict[Tuple[str, ...], Tuple[str, int]]:
+    """
+    Generate an encoding map with targets and counts.
+
+    :param root: The root of the Huffman tree, or a `CompactTree`.
+    :param symbols: A list of symbols used in the encoding.
+    :param count_dict: A dictionary mapping targets to their counts.
+    :return: An encoding map with targets and counts.
+    """
+    with profiling.stage("generate_encoding_map"):
+        return {
+            path: (target, count)
+            for path, target, count in iter_encoding_map(
+                root, symbols, count_dict
+            )
+        }
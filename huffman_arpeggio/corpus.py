@@ -0,0 +1,153 @@
+import mmap
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+UNITS = ("char", "line", "word")
+
+# Chunks smaller than this are not worth a round trip to a worker
+MIN_CHUNK_SIZE = 1 << 20
+
+WHITESPACE = b" \t\n\r\x0b\x0c"
+
+
+def is_boundary(data: bytes, position: int, unit: str) -> bool:
+    """
+    Check whether a chunk of a UTF-8 file can start at a byte position
+    without splitting a unit.
+
+    :param data: The file contents, e.g. a memory map.
+    :param position: The byte position.
+    :param unit: One of `UNITS`.
+    :return: True if the position is a safe boundary.
+    """
+    if position == 0 or position >= len(data):
+        return True
+    if unit == "char":
+        # Continuation bytes look like 0b10xxxxxx
+        return data[position] & 0xC0 != 0x80
+    if unit == "line":
+        return data[position - 1] == ord("\n")
+    return data[position - 1] in WHITESPACE
+
+
+def chunk_boundaries(
+    data: bytes, num_chunks: int, unit: str
+) -> List[Tuple[int, int]]:
+    """
+    Split a UTF-8 file into about `num_chunks` byte ranges of similar size
+    that do not split any unit.
+
+    :param data: The file contents, e.g. a memory map.
+    :param num_chunks: The desired number of chunks.
+    :param unit: One of `UNITS`.
+    :return: A list of (start, end) byte ranges covering the file.
+    """
+    size = len(data)
+    chunk_size = max(-(-size // max(num_chunks, 1)), 1)
+    bounds = [0]
+    while bounds[-1] < size:
+        position = min(bounds[-1] + chunk_size, size)
+        while not is_boundary(data, position, unit):
+            position += 1
+        bounds.append(position)
+    return list(zip(bounds, bounds[1:]))
+
+
+def count_text(text: str, unit: str) -> Counter:
+    """
+    Count the units in a text.
+
+    :param text: The text to count.
+    :param unit: One of `UNITS`. Lines are counted without their line
+        endings, and blank lines are skipped.
+    :return: A Counter of units.
+    """
+    if unit == "char":
+        # Histogram the codepoints instead of hashing one string per char
+        codepoints = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        histogram = np.bincount(codepoints)
+        present = np.flatnonzero(histogram)
+        return Counter(
+            dict(zip(map(chr, present.tolist()), histogram[present].tolist()))
+        )
+    if unit == "word":
+        return Counter(text.split())
+    return Counter(
+        line.rstrip("\r") for line in text.split("\n") if line.rstrip("\r")
+    )
+
+
+def count_chunk(path: str, start: int, end: int, unit: str) -> Counter:
+    """
+    Count the units in a byte range of a UTF-8 file.
+
+    :param path: Path to the file.
+    :param start: The first byte of the range.
+    :param end: One past the last byte of the range.
+    :param unit: One of `UNITS`.
+    :return: A Counter of units.
+    """
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            # Decode straight from the mapped pages rather than copying the
+            # range into bytes first. The views must be released before the
+            # map is closed.
+            with memoryview(data) as view, view[start:end] as chunk:
+                text = str(chunk, "utf-8")
+    return count_text(text, unit)
+
+
+def count_corpus(
+    paths: Sequence[str], unit: str = "char", workers: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    Count the characters, lines or words in UTF-8 text files in parallel.
+
+    Each file is memory-mapped and split into chunks on boundaries that do
+    not split a unit, and the chunks are counted in a process pool. Each
+    Counter is merged into the total as it comes back, in chunk order, so
+    only one chunk's Counter is held at a time besides the total. Workers
+    receive only a path and a byte range, so nothing but the Counters
+    crosses processes. The result can be passed straight to
+    `build_huffman_tree`.
+
+    :param paths: Paths to the files.
+    :param unit: One of "char", "line" or "word".
+    :param workers: The number of worker processes. Defaults to the number
+        of CPUs, and 1 counts in the current process.
+    :return: A dictionary mapping units to their counts, in descending
+        count order.
+    :raises ValueError: If the unit is unknown or workers is not positive.
+    """
+    if unit not in UNITS:
+        raise ValueError(f"Unknown unit {unit!r}, expected one of {UNITS}")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("workers must be positive")
+
+    tasks = []
+    for path in paths:
+        size = os.path.getsize(path)
+        if not size:
+            continue
+        num_chunks = min(4 * workers, -(-size // MIN_CHUNK_SIZE))
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for start, end in chunk_boundaries(data, num_chunks, unit):
+                    tasks.append((path, start, end, unit))
+
+    total: Counter = Counter()
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            total.update(count_chunk(*task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for counter in executor.map(count_chunk, *zip(*tasks)):
+                total.update(counter)
+
+    return dict(total.most_common())
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import os
+import signal
+import socket
+import stat
+from typing import Optional
+
+from huffman_arpeggio.decoder import Decoder
+from huffman_arpeggio.layout_file import LayoutFile
+
+
+async def read_request(reader: asyncio.StreamReader) -> bytes:
+    """
+    Read one request line, like `StreamReader.readline`.
+
+    A line longer than the reader's limit is read to its end and discarded,
+    so that the next request starts at the next line.
+
+    :param reader: The connection's reader.
+    :return: The line with its line ending, or what was left before the
+        end of the stream, which is empty if the client closed it.
+    :raises ValueError: If the line was too long.
+    """
+    too_long = False
+    while True:
+        try:
+            line = await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as error:
+            line = error.partial
+        except asyncio.LimitOverrunError as error:
+            await reader.readexactly(error.consumed)
+            too_long = True
+            continue
+        if too_long:
+            raise ValueError("line too long")
+        return line
+
+
+def remove_stale_socket(socket_path: str):
+    """
+    Remove a socket left behind by a daemon that is no longer running, so
+    that a new daemon can listen on its path.
+
+    :param socket_path: Path to the Unix socket.
+    :raises ValueError: If the path is not a socket, or a daemon is still
+        listening on it.
+    """
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise ValueError(f"{socket_path} exists and is not a socket")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except ConnectionRefusedError:
+            # Nothing is listening, so the socket is stale
+            os.unlink(socket_path)
+            return
+        except FileNotFoundError:
+            return
+    raise ValueError(f"A daemon is already listening on {socket_path}")
+
+
+class DecoderServer:
+    """
+    A long-running server that decodes press events into targets for many
+    clients over a Unix socket.
+
+    The protocol is line-based UTF-8. Every request line gets exactly one
+    response line, so clients can pipeline requests:
+
+    - `press SYMBOL` answers `emit TARGET` if the press completed a code,
+      `wait` if it continued one, or `error MESSAGE` if it matched no code,
+      in which case the partial code is discarded.
+    - `reset` discards the partial code and answers `ok`.
+    - `reload` loads the layout file again and answers `ok GENERATION`.
+    - `layout` answers `ok GENERATION NUM_TARGETS`.
+
+    Each connection has its own decoding state over the shared memory-mapped
+    layout. Reloading swaps the layout for every connection without closing
+    any of them, and a connection discards its partial code at its next
+    request after a swap, since it means nothing in the new layout. New
+    layouts must replace the file by renaming, as `dump_layout` does, since
+    rewriting it in place would change the memory map under the server.
+
+    :param layout_path: Path to a binary layout file from `dump_layout`.
+    """
+
+    def __init__(self, layout_path: str):
+        self.layout_path = layout_path
+        self.generation = 0
+        self.layout: Optional[LayoutFile] = None
+        self.load()
+
+    def load(self):
+        """
+        Load the layout file and make it the current layout.
+
+        :raises ValueError: If the file is not a supported layout file.
+        :raises OSError: If the file cannot be read.
+        """
+        self.layout = LayoutFile(self.layout_path)
+        self.generation += 1
+
+    def reload(self) -> bool:
+        """
+        Load the layout file again, keeping the current layout if it fails.
+
+        :return: True if the new layout was loaded.
+        """
+        logger = logging.getLogger(__name__)
+        try:
+            self.load()
+        except (OSError, ValueError) as error:
+            logger.error(f"Keeping layout {self.generation}: {error}")
+            return False
+        logger.info(f"Loaded layout {self.generation}")
+        return True
+
+    def respond(self, decoder: Decoder, line: str) -> str:
+        """
+        Answer one request line.
+
+        :param decoder: The decoding state of the connection.
+        :param line: The request, without the line ending.
+        :return: The response, without the line ending.
+        """
+        command, _, argument = line.partition(" ")
+        if command == "press":
+            try:
+                target = decoder.feed(argument)
+            except KeyError:
+                return f"error unknown symbol {argument}"
+            except ValueError as error:
+                return f"error {error}"
+            return "wait" if target is None else f"emit {target}"
+        if command == "reset":
+            decoder.reset()
+            return "ok"
+        if command == "reload":
+            if not self.reload():
+                return "error could not load layout"
+            return f"ok {self.generation}"
+        if command == "layout":
+            return f"ok {self.generation} {len(self.layout.targets)}"
+        return f"error unknown command {command}"
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        """
+        Serve one connection until the client closes it.
+
+        :param reader: The connection's reader.
+        :param writer: The connection's writer.
+        """
+        generation = self.generation
+        decoder = self.layout.decoder()
+        try:
+            while True:
+                try:
+                    line = await read_request(reader)
+                except ValueError as error:
+                    response = f"error {error}"
+                else:
+                    if not line:
+                        break
+                    if generation != self.generation:
+                        generation = self.generation
+                        decoder = self.layout.decoder()
+                    # Bytes that are not UTF-8 become U+FFFD, and are
+                    # answered like any other unknown command or symbol
+                    text = line.decode(errors="replace").rstrip("\r\n")
+                    response = self.respond(decoder, text)
+                writer.write(response.encode() + b"\n")
+                # Only wait for the client when it stops reading, so a
+                # pipelining client is answered without a round trip
+                if writer.transport.get_write_buffer_size() > 1 << 16:
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, socket_path: str):
+        """
+        Listen on a Unix socket until cancelled. SIGHUP reloads the layout.
+
+        The socket is removed when the server stops, unless it has been
+        replaced by another process in the meantime.
+
+        :param socket_path: Path to the Unix socket, which must not exist,
+            see `remove_stale_socket`.
+        """
+        server = await asyncio.start_unix_server(
+            self.handle_client, path=socket_path
+        )
+        created = os.stat(socket_path)
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGHUP, self.reload)
+        except (NotImplementedError, RuntimeError, ValueError):
+            # Not on the main thread, or not on Unix
+            pass
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            try:
+                current = os.stat(socket_path)
+                if (current.st_dev, current.st_ino) == (
+                    created.st_dev,
+                    created.st_ino,
+                ):
+                    os.unlink(socket_path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,226 @@
+from array import array
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union
+
+from huffman_arpeggio.core import Node, iter_encoding_map
+
+# NumPy is only needed for batch decoding, and the compact tree only for
+# type checking, so that `load_layout` starts fast
+if TYPE_CHECKING:
+    import numpy as np
+
+    from huffman_arpeggio.compact import CompactTree
+
+
+class Decoder:
+    """
+    A decoder for press streams, compiled into a flat transition table.
+
+    State 0 is the root and every other state is a proper prefix of some
+    code. The table has one row of `num_branches` entries per state: an
+    entry `>= 0` is the next state, and an entry `< 0` emits the target with
+    id `~entry` and returns to the root. The entry `~len(targets)` marks a
+    press that does not continue any code.
+
+    :param table: The flat state x symbol transition table, as an int32
+        array or a memoryview of one.
+    :param targets: The targets, indexed by target id.
+    :param symbols: A list of symbols used in the encoding.
+    :param max_length: The length of the longest code.
+    """
+
+    def __init__(
+        self,
+        table: Union[array, memoryview],
+        targets: Sequence[str],
+        symbols: List[str],
+        max_length: int,
+    ):
+        self.table = table
+        self.targets = targets
+        self.symbols = list(symbols)
+        self.num_branches = len(symbols)
+        self.invalid = ~len(targets)
+        self.max_length = max_length
+        self._symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+        self._state = 0
+
+    @property
+    def num_states(self) -> int:
+        return len(self.table) // self.num_branches
+
+    @classmethod
+    def from_encoding_map(
+        cls,
+        encoding_map: Dict[Tuple[str, ...], Tuple[str, int]],
+        symbols: List[str],
+    ) -> "Decoder":
+        """
+        Compile a decoder from an encoding map.
+
+        :param encoding_map: An encoding map with targets and counts.
+        :param symbols: A list of symbols used in the encoding.
+        :return: The compiled decoder.
+        :raises ValueError: If the codes are not prefix-free, are empty, or
+            use unknown symbols.
+        """
+        if len(symbols) != len(set(symbols)):
+            raise ValueError(
+                "Symbols must be unique to ensure a prefix-free encoding"
+            )
+        symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+        num_branches = len(symbols)
+        invalid = ~len(encoding_map)
+
+        table = array("i", [invalid]) * num_branches
+        targets = []
+        max_length = 0
+        for path, (target, _) in encoding_map.items():
+            if not path:
+                raise ValueError(f"Target {target!r} has an empty code")
+            state = 0
+            for depth, symbol in enumerate(path):
+                if symbol not in symbol_index:
+                    raise ValueError(f"Unknown symbol {symbol!r}")
+                slot = state * num_branches + symbol_index[symbol]
+                entry = table[slot]
+                if depth == len(path) - 1:
+                    if entry != invalid:
+                        raise ValueError("Codes must be prefix-free")
+                    table[slot] = ~len(targets)
+                elif entry == invalid:
+                    state = len(table) // num_branches
+                    table[slot] = state
+                    table.extend(array("i", [invalid]) * num_branches)
+                elif entry < 0:
+                    raise ValueError("Codes must be prefix-free")
+                else:
+                    state = entry
+            targets.append(target)
+            max_length = max(max_length, len(path))
+
+        return cls(table, targets, symbols, max_length)
+
+    @classmethod
+    def from_tree(
+        cls,
+        root: Union[Node, "CompactTree"],
+        symbols: List[str],
+        count_dict: Dict[str, int],
+    ) -> "Decoder":
+        """
+        Compile a decoder from a tree.
+
+        :param root: The root of the Huffman tree, or a `CompactTree`.
+        :param symbols: A list of symbols used in the encoding.
+        :param count_dict: A dictionary mapping targets to their counts.
+        :return: The compiled decoder.
+        """
+        encoding_map = {
+            path: (target, count)
+            for path, target, count in iter_encoding_map(
+                root, symbols, count_dict
+            )
+        }
+        return cls.from_encoding_map(encoding_map, symbols)
+
+    def reset(self):
+        """
+        Discard any partially entered code.
+        """
+        self._state = 0
+
+    def feed_index(self, symbol_index: int) -> Optional[str]:
+        """
+        Feed one press, given as an index into `symbols`.
+
+        :param symbol_index: The index of the pressed symbol.
+        :return: The decoded target if the press completed a code, otherwise
+            None.
+        :raises ValueError: If the press does not continue any code, in
+            which case the partial code is discarded.
+        """
+        entry = self.table[self._state * self.num_branches + symbol_index]
+        if entry >= 0:
+            self._state = entry
+            return None
+        self._state = 0
+        if entry == self.invalid:
+            raise ValueError("Press sequence does not match any code")
+        return self.targets[~entry]
+
+    def feed(self, symbol: str) -> Optional[str]:
+        """
+        Feed one press.
+
+        :param symbol: The pressed symbol.
+        :return: The decoded target if the press completed a code, otherwise
+            None.
+        :raises ValueError: If the press does not continue any code, in
+            which case the partial code is discarded.
+        """
+        return self.feed_index(self._symbol_index[symbol])
+
+    def decode_batch(
+        self, symbol_indices: Union["np.ndarray", Sequence[int]]
+    ) -> "np.ndarray":
+        """
+        Decode a whole press stream from the root state.
+
+        Instead of stepping through the presses one at a time, the code
+        starting at every position is decoded at once, one code level per
+        vectorized step over the whole stream. The codes actually used are
+        then found by pointer doubling over the "next code starts here"
+        links, so the work is O(n * max_length + n log n) in NumPy rather
+        than O(n) in Python. The `feed` state is not used or changed.
+
+        :param symbol_indices: The presses, as indices into `symbols`.
+        :return: The decoded target ids, indices into `targets`. A trailing
+            incomplete code is ignored.
+        :raises ValueError: If the presses do not match the codes.
+        """
+        import numpy as np
+
+        presses = np.asarray(symbol_indices, dtype=np.int64)
+        num_presses = len(presses)
+        if not num_presses:
+            return np.zeros(0, dtype=np.int64)
+        if presses.min() < 0 or presses.max() >= self.num_branches:
+            raise ValueError("Symbol index out of range")
+
+        table = np.frombuffer(self.table, dtype=np.int32)
+        padded = np.zeros(num_presses + self.max_length, dtype=np.int32)
+        padded[:num_presses] = presses
+
+        # Decode the code starting at every position at once, one press per
+        # step over the whole stream, until every code has ended
+        entry = np.zeros(num_presses, dtype=np.int32)
+        length = np.zeros(num_presses, dtype=np.int32)
+        alive = np.ones(num_presses, dtype=bool)
+        for depth in range(self.max_length):
+            step = table[
+                np.maximum(entry, 0) * self.num_branches
+                + padded[depth : depth + num_presses]
+            ]
+            length += alive
+            entry = np.where(alive, step, entry)
+            alive = entry >= 0
+            if not alive.any():
+                break
+
+        # Mark the code starts reachable from position 0 by pointer
+        # doubling: after round t, the first 2 ** t starts are marked
+        jump = np.minimum(np.arange(num_presses) + length, num_presses)
+        jump = np.append(jump, num_presses)
+        reached = np.zeros(num_presses + 1, dtype=bool)
+        reached[0] = True
+        for _ in range(num_presses.bit_length()):
+            reached[jump[reached]] = True
+            jump = jump[jump]
+
+        starts = np.flatnonzero(reached[:num_presses])
+        # The last code may run past the end of the stream
+        starts = starts[starts + length[starts] <= num_presses]
+        ids = ~entry[starts].astype(np.int64)
+        if np.any(ids == len(self.targets)):
+            raise ValueError("Press sequence does not match any code")
+        return ids
@@ -0,0 +1,225 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Named keyswitch targets and the characters they type
+KEYSWITCH_ALIASES = {"Space": " ", "Enter": "\n", "Tab": "\t"}
+
+
+def keyswitch_char_targets(
+    targets: Iterable[str], shift_target: str = "Shift"
+) -> Dict[str, Tuple[str, ...]]:
+    """
+    Map characters to the keyswitch targets that type them, for keyboard
+    layouts like the PlayStation/Wikipedia example.
+
+    Single-character targets type themselves, named targets type their
+    alias from `KEYSWITCH_ALIASES`, and if `shift_target` is a target, a
+    letter target types its lowercase form and is preceded by a shift for
+    its uppercase form.
+
+    :param targets: The targets of the encoding map.
+    :param shift_target: The name of the shift target.
+    :return: A dictionary mapping characters to target sequences.
+    """
+    targets = list(targets)
+    has_shift = shift_target in targets
+    char_targets: Dict[str, Tuple[str, ...]] = {}
+    for target in targets:
+        if target in KEYSWITCH_ALIASES:
+            char_targets[KEYSWITCH_ALIASES[target]] = (target,)
+        elif len(target) == 1:
+            if has_shift and target.lower() != target.upper():
+                char_targets[target.lower()] = (target,)
+                char_targets[target.upper()] = (shift_target, target)
+            else:
+                char_targets.setdefault(target, (target,))
+    return char_targets
+
+
+def gather_codes(
+    flat: np.ndarray, offsets: np.ndarray, lengths: np.ndarray
+) -> np.ndarray:
+    """
+    Concatenate variable-length codes stored back to back in a flat array,
+    in a single vectorized gather.
+
+    :param flat: All codes stored back to back.
+    :param offsets: The offset of each code to output in `flat`.
+    :param lengths: The length of each code to output.
+    :return: The concatenated codes.
+    """
+    starts = np.cumsum(lengths) - lengths
+    index = np.arange(int(lengths.sum())) + np.repeat(
+        offsets - starts, lengths
+    )
+    return flat[index]
+
+
+class Encoder:
+    """
+    A bulk encoder from targets or text to press sequences.
+
+    The code of every target is packed back to back into one flat array of
+    symbol indices, with an offset and length per target id, and every
+    mapped character gets the same kind of entry in a lookup table indexed
+    by codepoint. Encoding is then a NumPy gather instead of a dictionary
+    lookup and tuple concatenation per character.
+
+    :param encoding_map: An encoding map with targets and counts.
+    :param symbols: A list of symbols used in the encoding.
+    :param char_targets: Optional mapping from characters to the target
+        sequences that type them. Defaults to `keyswitch_char_targets`.
+    :raises ValueError: If a code uses an unknown symbol, or a character
+        maps to an unknown target.
+    """
+
+    def __init__(
+        self,
+        encoding_map: Dict[Tuple[str, ...], Tuple[str, int]],
+        symbols: List[str],
+        char_targets: Optional[Dict[str, Tuple[str, ...]]] = None,
+    ):
+        self.symbols = list(symbols)
+        self.num_branches = len(symbols)
+        self.dtype = np.min_scalar_type(max(self.num_branches - 1, 0))
+        symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+
+        self.targets: List[str] = []
+        self.target_id: Dict[str, int] = {}
+        digits: List[int] = []
+        offsets: List[int] = []
+        for path, (target, _) in encoding_map.items():
+            self.target_id[target] = len(self.targets)
+            self.targets.append(target)
+            offsets.append(len(digits))
+            for symbol in path:
+                if symbol not in symbol_index:
+                    raise ValueError(f"Unknown symbol {symbol!r}")
+                digits.append(symbol_index[symbol])
+        self.codes = np.array(digits, dtype=self.dtype)
+        self.code_offsets = np.array(offsets, dtype=np.int64)
+        self.code_lengths = np.array(
+            [len(path) for path in encoding_map], dtype=np.int64
+        )
+
+        if char_targets is None:
+            char_targets = keyswitch_char_targets(self.targets)
+        self._compile_chars(char_targets)
+
+    def _compile_chars(self, char_targets: Dict[str, Tuple[str, ...]]):
+        size = max((ord(char) + 1 for char in char_targets), default=0)
+        self.char_offsets = np.zeros(size, dtype=np.int64)
+        self.char_lengths = np.zeros(size, dtype=np.int64)
+        self.char_mapped = np.zeros(size, dtype=bool)
+
+        pieces = []
+        offset = 0
+        for char, targets in char_targets.items():
+            for target in targets:
+                if target not in self.target_id:
+                    raise ValueError(
+                        f"Character {char!r} maps to unknown target"
+                        f" {target!r}"
+                    )
+            ids = np.array(
+                [self.target_id[target] for target in targets], dtype=np.int64
+            )
+            code = gather_codes(
+                self.codes, self.code_offsets[ids], self.code_lengths[ids]
+            )
+            codepoint = ord(char)
+            self.char_offsets[codepoint] = offset
+            self.char_lengths[codepoint] = len(code)
+            self.char_mapped[codepoint] = True
+            pieces.append(code)
+            offset += len(code)
+        self.char_codes = (
+            np.concatenate(pieces) if pieces else np.zeros(0, self.dtype)
+        )
+
+    def encode_targets(self, targets: Iterable[str]) -> np.ndarray:
+        """
+        Encode a sequence of targets.
+
+        :param targets: The targets to encode.
+        :return: The presses, as indices into `symbols`.
+        :raises KeyError: If a target is not in the encoding map.
+        """
+        ids = np.fromiter(
+            (self.target_id[target] for target in targets), dtype=np.int64
+        )
+        return gather_codes(
+            self.codes, self.code_offsets[ids], self.code_lengths[ids]
+        )
+
+    def _codepoints(self, text: str, errors: str) -> np.ndarray:
+        codepoints = np.frombuffer(
+            text.encode("utf-32-le"), dtype=np.uint32
+        ).astype(np.int64)
+        known = codepoints < len(self.char_mapped)
+        known[known] = self.char_mapped[codepoints[known]]
+        if known.all():
+            return codepoints
+        if errors == "strict":
+            char = text[int(np.argmin(known))]
+            raise ValueError(f"No target types the character {char!r}")
+        if errors != "ignore":
+            raise ValueError(f"Unknown errors mode {errors!r}")
+        return codepoints[known]
+
+    def encode(self, text: str, errors: str = "strict") -> np.ndarray:
+        """
+        Encode text into presses.
+
+        :param text: The text to encode.
+        :param errors: "strict" to raise on characters without a target, or
+            "ignore" to skip them.
+        :return: The presses, as indices into `symbols`.
+        :raises ValueError: If a character has no target and errors is
+            "strict".
+        """
+        codepoints = self._codepoints(text, errors)
+        return gather_codes(
+            self.char_codes,
+            self.char_offsets[codepoints],
+            self.char_lengths[codepoints],
+        )
+
+    def press_count(self, text: str, errors: str = "strict") -> int:
+        """
+        Count the presses needed to type text, without encoding it.
+
+        :param text: The text to measure.
+        :param errors: "strict" or "ignore", as for `encode`.
+        :return: The total number of presses.
+        """
+        codepoints = self._codepoints(text, errors)
+        return int(self.char_lengths[codepoints].sum())
+
+    def encode_file(
+        self,
+        file_path: str,
+        encoding: str = "utf-8",
+        errors: str = "strict",
+        chunk_size: int = 1 << 22,
+    ) -> np.ndarray:
+        """
+        Encode a text file into presses, reading it in chunks.
+
+        :param file_path: Path to the text file.
+        :param encoding: The text encoding of the file.
+        :param errors: "strict" or "ignore", as for `encode`.
+        :param chunk_size: The number of characters to encode at a time.
+        :return: The presses, as indices into `symbols`.
+        """
+        chunks = []
+        with open(file_path, encoding=encoding) as f:
+            while True:
+                text = f.read(chunk_size)
+                if not text:
+                    break
+                chunks.append(self.encode(text, errors))
+        if not chunks:
+            return np.zeros(0, dtype=self.dtype)
+        return np.concatenate(chunks)
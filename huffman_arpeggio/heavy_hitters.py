@@ -0,0 +1,86 @@
+from heapq import heapify, heappop, heappush
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class SpaceSaving:
+    """
+    Approximate counts of the most frequent items in a stream, using the
+    Space-Saving algorithm of Metwally, Agrawal and El Abbadi in at most
+    `capacity` counters.
+
+    An item that is already monitored has its counter incremented. A new
+    item takes over the smallest counter, inheriting its count as error.
+    Every reported count overestimates the true count by at most its error,
+    and every error is at most `total / capacity`, so any item with a true
+    count above that is guaranteed to be monitored.
+
+    :param capacity: The maximum number of counters.
+    :raises ValueError: If capacity is not positive.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.total = 0
+        self.counts: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        # Min-heap of (count, item), with stale entries skipped lazily
+        self._heap: List[Tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def _pop_min(self) -> Tuple[int, str]:
+        while True:
+            count, item = heappop(self._heap)
+            if self.counts.get(item) == count:
+                return count, item
+
+    def update(self, item: str, count: int = 1):
+        """
+        Add occurrences of an item.
+
+        :param item: The item seen.
+        :param count: The number of occurrences.
+        """
+        self.total += count
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            minimum, evicted = self._pop_min()
+            del self.counts[evicted]
+            del self.errors[evicted]
+            self.counts[item] = minimum + count
+            self.errors[item] = minimum
+        heappush(self._heap, (self.counts[item], item))
+
+        # Drop the stale entries once they outnumber the live ones
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, i) for i, c in self.counts.items()]
+            heapify(self._heap)
+
+    def update_all(self, items: Iterable[str]):
+        """
+        Add one occurrence of each item in a stream.
+
+        :param items: The items seen.
+        """
+        for item in items:
+            self.update(item)
+
+    def top(self, k: Optional[int] = None) -> List[Tuple[str, int, int]]:
+        """
+        Get the monitored items by descending estimated count.
+
+        :param k: Optional number of items to return.
+        :return: A list of (item, count, error) triples, where the true
+            count lies between count - error and count.
+        """
+        items = sorted(
+            self.counts.items(), key=lambda item: item[1], reverse=True
+        )
+        return [(item, count, self.errors[item]) for item, count in items[:k]]
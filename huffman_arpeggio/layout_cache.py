@@ -0,0 +1,234 @@
+import functools
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from huffman_arpeggio import profiling
+from huffman_arpeggio.core import (
+    build_huffman_tree,
+    generate_encoding_map_with_count,
+)
+
+EncodingMap = Dict[Tuple[str, ...], Tuple[str, int]]
+
+DEFAULT_MAX_BYTES = 64 << 20
+
+SUFFIX = ".layout"
+
+
+def layout_key(
+    count_dict: Dict[str, int], symbols: List[str], **options: Any
+) -> str:
+    """
+    Hash everything a layout depends on into a cache key.
+
+    The counts are hashed in dictionary order, since ties between equal
+    counts are broken by it.
+
+    :param count_dict: A dictionary mapping targets to their counts.
+    :param symbols: A list of symbols used in the encoding.
+    :param options: Algorithm options, which must be JSON-serializable.
+    :return: A hex digest.
+    :raises TypeError: If an option is not JSON-serializable.
+    """
+    payload = json.dumps(
+        [list(count_dict.items()), list(symbols), sorted(options.items())],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _parse_entries(entries: Any) -> EncodingMap:
+    """
+    Rebuild an encoding map from the rows of a cache entry.
+
+    :param entries: The decoded JSON of a cache entry.
+    :return: The encoding map.
+    :raises ValueError: If the rows are not [path, target, count] rows.
+    :raises TypeError: If a row is not a sequence.
+    """
+    if not isinstance(entries, list):
+        raise ValueError("Cache entry must be a list of rows")
+    encoding_map: EncodingMap = {}
+    for path, target, count in entries:
+        if not (
+            isinstance(path, list)
+            and isinstance(target, str)
+            and isinstance(count, int)
+        ):
+            raise ValueError("Cache rows must be [path, target, count]")
+        encoding_map[tuple(path)] = (target, count)
+    if not all(
+        isinstance(symbol, str) for path in encoding_map for symbol in path
+    ):
+        raise ValueError("Cache paths must be lists of symbols")
+    return encoding_map
+
+
+class LayoutCache:
+    """
+    A content-addressed on-disk cache of encoding maps.
+
+    Each entry is a JSON list of [path, target, count] rows in a file named
+    after its key. Entries are plain data rather than pickles, so that a
+    writable cache directory cannot be used to run code in the reader.
+    Writes go to a temporary file that is renamed into place, so concurrent
+    readers never see a partial entry. Reads refresh the modification time,
+    and after each write the least recently used entries are evicted until
+    the cache fits in `max_bytes`.
+
+    :param cache_dir: The directory holding the entries.
+    :param max_bytes: The maximum total size of the entries.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + SUFFIX)
+
+    def get(self, key: str) -> Optional[EncodingMap]:
+        """
+        Look up an encoding map.
+
+        :param key: The cache key, e.g. from `layout_key`.
+        :return: The encoding map, or None if it is not cached.
+        """
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                encoding_map = _parse_entries(json.load(f))
+            os.utime(path)
+        except (OSError, ValueError, TypeError):
+            # A missing, corrupt or outdated entry is a miss, and is
+            # replaced by the next put
+            return None
+        return encoding_map
+
+    def put(self, key: str, encoding_map: EncodingMap):
+        """
+        Store an encoding map atomically, then evict old entries.
+
+        :param key: The cache key, e.g. from `layout_key`.
+        :param encoding_map: The encoding map to store.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = [
+            [list(path), target, count]
+            for path, (target, count) in encoding_map.items()
+        ]
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(
+                    entries, f, ensure_ascii=False, separators=(",", ":")
+                )
+            os.replace(temp_path, self._path(key))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.evict(keep=key)
+
+    def evict(self, keep: Optional[str] = None):
+        """
+        Remove the least recently used entries until the cache fits.
+
+        :param keep: Optional key that is never evicted.
+        """
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda item: item[0]):
+            if total <= self.max_bytes:
+                break
+            if entry.name == (keep or "") + SUFFIX:
+                continue
+            try:
+                os.unlink(entry.path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def cached_layout(
+    cache: Optional[LayoutCache], **key_options: Any
+) -> Callable[[Callable[..., EncodingMap]], Callable[..., EncodingMap]]:
+    """
+    Decorate a function from (count_dict, symbols, **options) to an encoding
+    map so that its results are cached.
+
+    The key covers the function name, the arguments and `key_options`, which
+    should describe anything else the result depends on.
+
+    :param cache: The cache, or None to not cache at all.
+    :param key_options: Extra JSON-serializable values to key on.
+    :return: The decorator.
+    """
+
+    def decorator(
+        function: Callable[..., EncodingMap],
+    ) -> Callable[..., EncodingMap]:
+        if cache is None:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(
+            count_dict: Dict[str, int], symbols: List[str], **options: Any
+        ) -> EncodingMap:
+            key = layout_key(
+                count_dict,
+                symbols,
+                function=f"{function.__module__}.{function.__qualname__}",
+                options=sorted(options.items()),
+                **key_options,
+            )
+            with profiling.stage("layout_cache_get"):
+                encoding_map = cache.get(key)
+            if encoding_map is not None:
+                profiling.count("layout_cache_hits")
+                return encoding_map
+            profiling.count("layout_cache_misses")
+            encoding_map = function(count_dict, symbols, **options)
+            with profiling.stage("layout_cache_put"):
+                cache.put(key, encoding_map)
+            return encoding_map
+
+        return wrapper
+
+    return decorator
+
+
+def build_encoding_map(
+    count_dict: Dict[str, int],
+    symbols: List[str],
+    engine: str = "heap",
+    max_length: Optional[int] = None,
+) -> EncodingMap:
+    """
+    Build a Huffman tree and generate its encoding map, in one call that can
+    be wrapped with `cached_layout`.
+
+    :param count_dict: A dictionary mapping targets to their counts.
+    :param symbols: A list of symbols used in the encoding.
+    :param engine: The merge engine, as for `build_huffman_tree`.
+    :param max_length: Optional maximum code length, as for
+        `build_huffman_tree`.
+    :return: An encoding map with targets and counts.
+    """
+    root = build_huffman_tree(
+        count_dict, symbols, engine=engine, max_length=max_length
+    )
+    return generate_encoding_map_with_count(root, symbols, count_dict)
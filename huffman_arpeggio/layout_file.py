@@ -0,0 +1,321 @@
+import csv
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from huffman_arpeggio.decoder import Decoder
+
+MAGIC = b"HARP"
+VERSION = 1
+
+# magic, version, reserved, num_symbols, num_targets, num_states,
+# max_length, symbol_bytes, target_bytes
+HEADER = struct.Struct("<4sHHIIIIII")
+
+ALIGNMENT = 8
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def _section_offsets(
+    num_symbols: int,
+    num_targets: int,
+    num_states: int,
+    symbol_bytes: int,
+) -> Tuple[int, int, int, int, int, int]:
+    """
+    Compute where each section after the header starts.
+
+    :return: The offsets of the counts, the decode table, the symbol
+        offsets, the symbol data, the target offsets and the target data.
+    """
+    counts = _aligned(HEADER.size)
+    table = _aligned(counts + 8 * num_targets)
+    symbol_offsets = _aligned(table + 4 * num_states * num_symbols)
+    symbol_data = symbol_offsets + 4 * (num_symbols + 1)
+    target_offsets = _aligned(symbol_data + symbol_bytes)
+    target_data = target_offsets + 4 * (num_targets + 1)
+    return (
+        counts,
+        table,
+        symbol_offsets,
+        symbol_data,
+        target_offsets,
+        target_data,
+    )
+
+
+def _string_table(strings: Sequence[str]) -> Tuple[array, bytes]:
+    encoded = [string.encode("utf-8") for string in strings]
+    offsets = array("I", [0])
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    return offsets, b"".join(encoded)
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _view(
+    buffer: memoryview, offset: int, typecode: str, length: int
+) -> Union[memoryview, array]:
+    """
+    View little-endian values in a buffer, without copying on little-endian
+    machines.
+    """
+    size = struct.calcsize(typecode)
+    view = buffer[offset : offset + size * length]
+    if len(view) != size * length:
+        raise ValueError("Layout file is truncated")
+    if sys.byteorder == "little":
+        return view.cast(typecode)
+    values = array(typecode, view.tobytes())
+    values.byteswap()
+    return values
+
+
+class StringTable(Sequence[str]):
+    """
+    A read-only sequence of strings stored as UTF-8 back to back, decoded
+    only when accessed.
+
+    :param offsets: The byte offset of each string, and one past the last.
+    :param data: The UTF-8 bytes of all strings.
+    """
+
+    def __init__(self, offsets: Union[memoryview, array], data: memoryview):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("string table index out of range")
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return bytes(self.data[start:end]).decode("utf-8")
+
+
+def dump_layout(
+    encoding_map: Dict[Tuple[str, ...], Tuple[str, int]],
+    symbols: List[str],
+    output_path: str,
+):
+    """
+    Save an encoding map as a binary layout file.
+
+    The file holds a header, the target counts, the flat decode table of a
+    `Decoder`, a symbol table and a target string table, all little-endian
+    and aligned so that `load_layout` can use them straight from a memory
+    map. It is written to a temporary file that is renamed into place, so a
+    running reader never sees a partial layout.
+
+    :param encoding_map: An encoding map with targets and counts.
+    :param symbols: A list of symbols used in the encoding.
+    :param output_path: Path to the layout file.
+    :raises ValueError: If the codes are not a valid prefix-free code.
+    """
+    decoder = Decoder.from_encoding_map(encoding_map, symbols)
+    counts = array("q", [count for target, count in encoding_map.values()])
+    symbol_offsets, symbol_data = _string_table(symbols)
+    target_offsets, target_data = _string_table(decoder.targets)
+    offsets = _section_offsets(
+        len(symbols),
+        len(decoder.targets),
+        decoder.num_states,
+        len(symbol_data),
+    )
+
+    header = HEADER.pack(
+        MAGIC,
+        VERSION,
+        0,
+        len(symbols),
+        len(decoder.targets),
+        decoder.num_states,
+        decoder.max_length,
+        len(symbol_data),
+        len(target_data),
+    )
+    sections = [
+        header,
+        _little_endian(counts),
+        _little_endian(decoder.table),
+        _little_endian(symbol_offsets),
+        symbol_data,
+        _little_endian(target_offsets),
+        target_data,
+    ]
+    data = bytearray()
+    for offset, section in zip((0,) + offsets, sections):
+        data.extend(bytes(offset - len(data)))
+        data.extend(section)
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class LayoutFile:
+    """
+    A binary layout file mapped into memory.
+
+    Sections are exposed as views of the memory map, so opening a layout
+    costs the same regardless of its size.
+
+    :param file_path: Path to the layout file.
+    :raises ValueError: If the file is not a supported layout file.
+    """
+
+    def __init__(self, file_path: str):
+        with open(file_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        if len(buffer) < HEADER.size:
+            raise ValueError("Layout file is truncated")
+        (
+            magic,
+            version,
+            _,
+            num_symbols,
+            num_targets,
+            num_states,
+            self.max_length,
+            symbol_bytes,
+            target_bytes,
+        ) = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f"{file_path!r} is not a layout file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported layout version {version}")
+
+        (
+            counts,
+            table,
+            symbol_offsets,
+            symbol_data,
+            target_offsets,
+            target_data,
+        ) = _section_offsets(
+            num_symbols, num_targets, num_states, symbol_bytes
+        )
+        if len(buffer) < target_data + target_bytes:
+            raise ValueError("Layout file is truncated")
+
+        self.counts = _view(buffer, counts, "q", num_targets)
+        self.table = _view(buffer, table, "i", num_states * num_symbols)
+        self.symbols = StringTable(
+            _view(buffer, symbol_offsets, "I", num_symbols + 1),
+            buffer[symbol_data : symbol_data + symbol_bytes],
+        )
+        self.targets = StringTable(
+            _view(buffer, target_offsets, "I", num_targets + 1),
+            buffer[target_data : target_data + target_bytes],
+        )
+
+    def decoder(self) -> Decoder:
+        """
+        Make a decoder that reads its table straight from the memory map.
+
+        :return: The decoder.
+        """
+        return Decoder(
+            self.table, self.targets, list(self.symbols), self.max_length
+        )
+
+    def encoding_map(self) -> Dict[Tuple[str, ...], Tuple[str, int]]:
+        """
+        Recover the encoding map by walking the decode table.
+
+        :return: An encoding map with targets and counts, in target order.
+        """
+        symbols = list(self.symbols)
+        num_branches = len(symbols)
+        invalid = ~len(self.targets)
+        codes: List[Optional[Tuple[str, ...]]] = [None] * len(self.targets)
+        stack: List[Tuple[int, Tuple[str, ...]]] = [(0, ())]
+        while stack:
+            state, path = stack.pop()
+            for i, symbol in enumerate(symbols):
+                entry = self.table[state * num_branches + i]
+                if entry >= 0:
+                    stack.append((entry, path + (symbol,)))
+                elif entry != invalid:
+                    codes[~entry] = path + (symbol,)
+        return {
+            code: (self.targets[i], self.counts[i])
+            for i, code in enumerate(codes)
+        }
+
+
+def load_layout(file_path: str) -> Decoder:
+    """
+    Load a binary layout file as a ready decoder, without parsing it.
+
+    :param file_path: Path to the layout file.
+    :return: The decoder.
+    :raises ValueError: If the file is not a supported layout file.
+    """
+    return LayoutFile(file_path).decoder()
+
+
+def csv_to_layout(
+    csv_path: str,
+    layout_path: str,
+    symbols: Optional[List[str]] = None,
+):
+    """
+    Convert an encoding map CSV, as written by
+    `save_encoding_map_with_count`, into a binary layout file.
+
+    :param csv_path: Path to the CSV file.
+    :param layout_path: Path to the layout file.
+    :param symbols: Optional list of symbols used in the encoding. Defaults
+        to the symbols of the sequences, in order of first appearance.
+    """
+    encoding_map = {}
+    with open(csv_path, newline="") as f:
+        for row in csv.DictReader(f):
+            path = tuple(row["sequence"].split(" "))
+            encoding_map[path] = (row["target"], int(row["count"]))
+    if symbols is None:
+        symbols = list(
+            dict.fromkeys(symbol for path in encoding_map for symbol in path)
+        )
+    dump_layout(encoding_map, symbols, layout_path)
+
+
+def layout_to_csv(layout_path: str, csv_path: str):
+    """
+    Convert a binary layout file into an encoding map CSV, as written by
+    `save_encoding_map_with_count`.
+
+    :param layout_path: Path to the layout file.
+    :param csv_path: Path to the CSV file.
+    """
+    from huffman_arpeggio.utils import save_encoding_map_with_count
+
+    save_encoding_map_with_count(
+        LayoutFile(layout_path).encoding_map(), csv_path
+    )
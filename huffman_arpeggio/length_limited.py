@@ -0,0 +1,82 @@
+from typing import Sequence
+
+import numpy as np
+
+from huffman_arpeggio.core import calculate_padding
+
+
+def package_merge_code_lengths(
+    counts: Sequence[int], num_branches: int, max_length: int
+) -> np.ndarray:
+    """
+    Compute optimal n-ary code lengths no longer than `max_length` with the
+    package-merge algorithm.
+
+    Every leaf contributes one "coin" per level with face value
+    num_branches ** -level and its count as cost. Starting from the deepest
+    level, the cheapest coins are packaged `num_branches` at a time and
+    merged into the next level up. The cheapest num_branches *
+    num_branch_points items at the top level give an optimal solution, and a
+    leaf's code length is the number of levels its coins were selected at.
+    Each level is a vectorized merge of two sorted arrays, so the total work
+    is O(max_length * n log n) and close to linear in practice.
+
+    :param counts: A sequence of counts.
+    :param num_branches: The number of branches in the Huffman tree.
+    :param max_length: The maximum code length (arpeggio length).
+    :return: The code length of each count, in input order.
+    :raises ValueError: If the targets do not fit in `max_length` presses.
+    """
+    num_elements = len(counts)
+    if num_elements == 1:
+        return np.zeros(1, dtype=np.int64)
+
+    num_branch_points, num_padding = calculate_padding(
+        num_elements, num_branches
+    )
+    num_leaves = num_elements + num_padding
+    if max_length < 1 or num_branches**max_length < num_leaves:
+        raise ValueError(
+            f"{num_elements} targets do not fit in codes of at most"
+            f" {max_length} presses with {num_branches} symbols"
+        )
+
+    counts = np.asarray(counts, dtype=np.int64)
+    order = np.argsort(counts, kind="stable")
+    leaves = np.concatenate(
+        [np.zeros(num_padding, dtype=np.int64), counts[order]]
+    )
+
+    # is_leaf[level] marks which items of the merged list at that level are
+    # original leaves rather than packages from the level below
+    is_leaf = [np.ones(num_leaves, dtype=bool)]
+    items = leaves
+    for _ in range(max_length - 1):
+        num_packages = len(items) // num_branches
+        packages = (
+            items[: num_packages * num_branches]
+            .reshape(num_packages, num_branches)
+            .sum(axis=1)
+        )
+        # Merge the two sorted arrays, putting leaves first on ties
+        leaf_positions = np.arange(num_leaves) + np.searchsorted(
+            packages, leaves, side="left"
+        )
+        merged = np.empty(num_leaves + num_packages, dtype=np.int64)
+        merged_is_leaf = np.zeros(len(merged), dtype=bool)
+        merged[leaf_positions] = leaves
+        merged_is_leaf[leaf_positions] = True
+        merged[~merged_is_leaf] = packages
+        is_leaf.append(merged_is_leaf)
+        items = merged
+
+    lengths = np.zeros(num_leaves, dtype=np.int64)
+    selected = num_branches * num_branch_points
+    for merged_is_leaf in reversed(is_leaf):
+        num_selected_leaves = int(np.count_nonzero(merged_is_leaf[:selected]))
+        lengths[:num_selected_leaves] += 1
+        selected = (selected - num_selected_leaves) * num_branches
+
+    result = np.empty(num_elements, dtype=np.int64)
+    result[order] = lengths[num_padding:]
+    return result
@@ -0,0 +1,185 @@
+import contextlib
+import json
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, TextIO, Union
+
+# Profiling is off unless enabled, and then every hook returns right after
+# checking this flag, so instrumented code pays one global lookup per hook
+_enabled = False
+_stages: Dict[str, List[float]] = {}
+_counters: Dict[str, int] = {}
+
+PROFILE_FORMATS = ("text", "json")
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        totals = _stages.setdefault(self.name, [0.0, 0])
+        totals[0] += elapsed
+        totals[1] += 1
+
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+def enable():
+    """
+    Start recording stages and counters.
+    """
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """
+    Stop recording stages and counters, keeping what was recorded.
+    """
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    """
+    Check whether stages and counters are being recorded.
+    """
+    return _enabled
+
+
+def reset():
+    """
+    Discard everything recorded so far.
+    """
+    _stages.clear()
+    _counters.clear()
+
+
+def stage(name: str) -> Union[_Stage, contextlib.nullcontext]:
+    """
+    Time a stage, as a context manager. Time spent in nested stages also
+    counts towards the enclosing stage.
+
+    :param name: The stage name.
+    :return: A context manager.
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def count(name: str, amount: int = 1):
+    """
+    Add to a counter.
+
+    :param name: The counter name.
+    :param amount: The amount to add.
+    """
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def report() -> Dict[str, Dict]:
+    """
+    Get everything recorded so far.
+
+    :return: A dictionary with the total seconds and calls of each stage,
+        and the value of each counter.
+    """
+    return {
+        "stages": {
+            name: {"seconds": seconds, "calls": calls}
+            for name, (seconds, calls) in _stages.items()
+        },
+        "counters": dict(_counters),
+    }
+
+
+def format_report(profile: Dict[str, Dict]) -> str:
+    """
+    Format a report as an aligned table, slowest stages first.
+
+    :param profile: A report from `report`.
+    :return: The table.
+    """
+    lines = [f"{'stage':<32} {'calls':>8} {'seconds':>10}"]
+    for name, totals in sorted(
+        profile["stages"].items(), key=lambda item: -item[1]["seconds"]
+    ):
+        lines.append(
+            f"{name:<32} {totals['calls']:>8} {totals['seconds']:>10.6f}"
+        )
+    if profile["counters"]:
+        lines.append("")
+        lines.append(f"{'counter':<32} {'value':>19}")
+        for name, value in sorted(profile["counters"].items()):
+            lines.append(f"{name:<32} {value:>19}")
+    return "\n".join(lines)
+
+
+def dump(profile_format: str = "text", file: Optional[TextIO] = None):
+    """
+    Write everything recorded so far.
+
+    :param profile_format: One of `PROFILE_FORMATS`.
+    :param file: The stream to write to. Defaults to stderr.
+    :raises ValueError: If the format is unknown.
+    """
+    if profile_format not in PROFILE_FORMATS:
+        raise ValueError(
+            f"Unknown profile format {profile_format!r}, expected one of"
+            f" {PROFILE_FORMATS}"
+        )
+    if file is None:
+        file = sys.stderr
+    if profile_format == "json":
+        file.write(json.dumps(report(), indent=2) + "\n")
+    else:
+        file.write(format_report(report()) + "\n")
+
+
+def parse_profile_option(argv: List[str]) -> Optional[str]:
+    """
+    Parse a `--profile` or `--profile=FORMAT` command line option.
+
+    :param argv: The command line arguments.
+    :return: The profile format, or None if profiling was not requested.
+    """
+    for arg in argv[1:]:
+        if arg == "--profile":
+            return "text"
+        if arg.startswith("--profile="):
+            return arg.split("=", 1)[1]
+    return None
+
+
+@contextlib.contextmanager
+def profile_cli(argv: List[str]) -> Iterator[None]:
+    """
+    Profile a command line entry point if it was given `--profile`, and
+    dump the report to stderr when it exits.
+
+    :param argv: The command line arguments.
+    """
+    profile_format = parse_profile_option(argv)
+    if profile_format is None:
+        yield
+        return
+    if profile_format not in PROFILE_FORMATS:
+        sys.exit(f"Unknown profile format {profile_format!r}")
+    reset()
+    enable()
+    try:
+        with stage("total"):
+            yield
+    finally:
+        disable()
+        dump(profile_format)
@@ -0,0 +1,419 @@
+import itertools
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from huffman_arpeggio.core import Node, generate_encoding_map_with_count
+
+BigramCounts = Dict[Tuple[str, str], int]
+
+# Branch points with at most this many ways to assign symbols to children
+# are solved by trying every way at once, for a batch of nodes, instead of
+# one Hungarian algorithm run per node and incoming symbol
+MAX_PERMUTATIONS = 5040
+
+
+def assign_min_cost(cost: Sequence[Sequence[float]]) -> List[int]:
+    """
+    Solve the assignment problem with the Hungarian algorithm: match every
+    row to a distinct column so that the total cost is minimal.
+
+    Runs in O(rows^2 * columns) with shortest augmenting paths and dual
+    potentials, which is fast for the small matrices of one branch point.
+
+    :param cost: A rows x columns cost matrix with rows <= columns.
+    :return: The column assigned to each row.
+    :raises ValueError: If there are more rows than columns.
+    """
+    num_rows = len(cost)
+    num_columns = len(cost[0]) if num_rows else 0
+    if num_rows > num_columns:
+        raise ValueError("cost must not have more rows than columns")
+
+    # Index 0 is a virtual column that starts every augmenting path
+    row_potential = [0.0] * (num_rows + 1)
+    column_potential = [0.0] * (num_columns + 1)
+    column_row = [0] * (num_columns + 1)
+    previous = [0] * (num_columns + 1)
+    for row in range(1, num_rows + 1):
+        column_row[0] = row
+        column = 0
+        slack = [math.inf] * (num_columns + 1)
+        used = [False] * (num_columns + 1)
+        while column_row[column]:
+            used[column] = True
+            current_row = column_row[column]
+            row_costs = cost[current_row - 1]
+            delta = math.inf
+            next_column = 0
+            for j in range(1, num_columns + 1):
+                if used[j]:
+                    continue
+                reduced = (
+                    row_costs[j - 1]
+                    - row_potential[current_row]
+                    - column_potential[j]
+                )
+                if reduced < slack[j]:
+                    slack[j] = reduced
+                    previous[j] = column
+                if slack[j] < delta:
+                    delta = slack[j]
+                    next_column = j
+            for j in range(num_columns + 1):
+                if used[j]:
+                    row_potential[column_row[j]] += delta
+                    column_potential[j] -= delta
+                else:
+                    slack[j] -= delta
+            column = next_column
+        # Flip the augmenting path back to the virtual column
+        while column:
+            column_row[column] = column_row[previous[column]]
+            column = previous[column]
+
+    assignment = [0] * num_rows
+    for j in range(1, num_columns + 1):
+        if column_row[j]:
+            assignment[column_row[j] - 1] = j - 1
+    return assignment
+
+
+def best_assignments(
+    kid_costs: np.ndarray, kid_weights: np.ndarray, costs: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Assign symbols to the children of a batch of branch points with the same
+    number of children, once for every symbol that leads to them.
+
+    Giving child i of node g symbol s after symbol a costs
+    `kid_costs[g, i, s] + kid_weights[g, i] * costs[a, s]`.
+
+    :param kid_costs: A (nodes, children, symbols) array of the cost of each
+        child below each symbol.
+    :param kid_weights: A (nodes, children) array of the weight of each
+        child's incoming transition.
+    :param costs: The symbols x symbols transition cost matrix.
+    :return: A (nodes, symbols, children) array of the symbols of each
+        child after each incoming symbol, and a (nodes, symbols) array of
+        the minimal total costs.
+    """
+    num_nodes, num_kids, num_branches = kid_costs.shape
+    assignments = np.empty((num_nodes, num_branches, num_kids), dtype=np.int64)
+    totals = np.empty((num_nodes, num_branches))
+    if math.perm(num_branches, num_kids) > MAX_PERMUTATIONS:
+        for g in range(num_nodes):
+            for symbol in range(num_branches):
+                matrix = kid_costs[g] + kid_weights[g, :, None] * costs[symbol]
+                assignment = assign_min_cost(matrix.tolist())
+                assignments[g, symbol] = assignment
+                totals[g, symbol] = matrix[
+                    np.arange(num_kids), assignment
+                ].sum()
+        return assignments, totals
+
+    permutations = np.array(
+        list(itertools.permutations(range(num_branches), num_kids)),
+        dtype=np.int64,
+    ).reshape(-1, num_kids)
+    # (symbols, permutations, children) cost of each incoming transition
+    moving = costs[:, permutations]
+    chunk = max(1, (1 << 20) // (num_branches * len(permutations)))
+    for start in range(0, num_nodes, chunk):
+        end = min(start + chunk, num_nodes)
+        fixed = kid_costs[start:end, np.arange(num_kids), permutations].sum(
+            axis=2
+        )
+        total = fixed[:, None, :] + (
+            kid_weights[start:end] @ moving.reshape(-1, num_kids).T
+        ).reshape(end - start, num_branches, -1)
+        best = total.argmin(axis=2)
+        assignments[start:end] = permutations[best]
+        totals[start:end] = np.take_along_axis(total, best[..., None], 2)[
+            ..., 0
+        ]
+    return assignments, totals
+
+
+class _FlatTree:
+    """
+    A tree flattened in breadth-first order, with the symbol of each node's
+    incoming edge as an index into `symbols`.
+    """
+
+    def __init__(self, root: Node, num_branches: int):
+        self.nodes = [root]
+        self.parent = [-1]
+        self.children: List[List[int]] = []
+        i = 0
+        while i < len(self.nodes):
+            kids = []
+            for child in self.nodes[i].children:
+                kids.append(len(self.nodes))
+                self.nodes.append(child)
+                self.parent.append(i)
+            self.children.append(kids)
+            i += 1
+
+        # Child i of a node gets symbol num_branches - 1 - i, as in
+        # `generate_encoding_map_with_count`
+        self.label = np.full(len(self.nodes), -1, dtype=np.int64)
+        for kids in self.children:
+            for position, kid in enumerate(kids):
+                self.label[kid] = num_branches - 1 - position
+
+        self.internal = [
+            i for i in range(1, len(self.nodes)) if self.children[i]
+        ]
+        self.weight = np.array(
+            [node.count for node in self.nodes], dtype=float
+        )
+        self.is_leaf = np.array([not kids for kids in self.children])
+
+        # The child of the root above each node, which sets its first symbol
+        self.top = np.arange(len(self.nodes))
+        depth = [0] * len(self.nodes)
+        for i in range(1, len(self.nodes)):
+            depth[i] = depth[self.parent[i]] + 1
+            if depth[i] > 1:
+                self.top[i] = self.top[self.parent[i]]
+        self.depth = depth
+        self.levels = [
+            np.flatnonzero(np.array(depth) == level)
+            for level in range(2, max(depth) + 1)
+        ]
+        self.parent_array = np.array(self.parent)
+
+    def target_ids(self) -> Dict[str, int]:
+        return {
+            node.target: i
+            for i, node in enumerate(self.nodes)
+            if node.target is not None and not self.children[i]
+        }
+
+    def rebuild(self, num_branches: int) -> Node:
+        rebuilt: Dict[int, Node] = {}
+        for i in reversed(range(len(self.nodes))):
+            if not self.children[i]:
+                rebuilt[i] = self.nodes[i]
+                continue
+            children = [Node(0, None) for _ in range(num_branches)]
+            for kid in self.children[i]:
+                children[num_branches - 1 - self.label[kid]] = rebuilt.pop(kid)
+            rebuilt[i] = Node(
+                self.nodes[i].count, self.nodes[i].target, children
+            )
+        return rebuilt[0]
+
+
+def _total_cost(
+    tree: _FlatTree,
+    label: np.ndarray,
+    costs: np.ndarray,
+    bigrams: Tuple[np.ndarray, np.ndarray, np.ndarray],
+) -> float:
+    # Accumulate the transitions along each path one level at a time
+    path_cost = np.zeros(len(label))
+    for level in tree.levels:
+        parents = tree.parent_array[level]
+        path_cost[level] = (
+            path_cost[parents] + costs[label[parents], label[level]]
+        )
+    within = float((tree.weight * path_cost)[tree.is_leaf].sum())
+    previous, following, counts = bigrams
+    between = float(
+        (counts * costs[label[previous], label[tree.top[following]]]).sum()
+    )
+    return within + between
+
+
+def optimize_transitions(
+    root: Node,
+    transition_costs: Sequence[Sequence[float]],
+    bigram_counts: Optional[BigramCounts] = None,
+    max_sweeps: int = 8,
+) -> Node:
+    """
+    Permute the symbols at every branch point to minimize the expected
+    transition cost, i.e. the cost of each press given the one before it,
+    such as pressing a button with the same finger twice.
+
+    Transitions inside a code are weighted by the counts of the targets
+    below them. Transitions between codes, from the last press of a target
+    to the first press of the next one, are weighted by `bigram_counts`.
+
+    Given the symbols at the root, the optimal symbols of every other node
+    come from a bottom-up pass that solves one assignment problem per node
+    and incoming symbol, each over the best costs of its children. The root
+    symbols are then improved by local search given the last symbol of
+    every code, and the two steps alternate while the total cost improves.
+    Without bigram counts this finds the optimum in one sweep.
+
+    :param root: The root of the tree.
+    :param transition_costs: The cost of pressing `symbols[j]` right after
+        `symbols[i]` at row i and column j, with `symbols` as passed to
+        `generate_encoding_map_with_count`.
+    :param bigram_counts: Optional counts of (previous target, target)
+        pairs. Pairs with targets outside the tree are ignored.
+    :param max_sweeps: The maximum number of alternating sweeps.
+    :return: The root of the relabeled tree.
+    :raises ValueError: If the cost matrix is not square or has fewer rows
+        than some node has children.
+    """
+    costs = np.asarray(transition_costs, dtype=float)
+    if costs.ndim != 2 or costs.shape[0] != costs.shape[1]:
+        raise ValueError("transition_costs must be a square matrix")
+    num_branches = len(costs)
+    if not root.children:
+        return root
+    tree = _FlatTree(root, num_branches)
+    if max(len(kids) for kids in tree.children) > num_branches:
+        raise ValueError("transition_costs has fewer symbols than branches")
+
+    ids = tree.target_ids()
+    pairs = [
+        (ids[previous], ids[target], count)
+        for (previous, target), count in (bigram_counts or {}).items()
+        if previous in ids and target in ids
+    ]
+    bigrams = (
+        np.array([pair[0] for pair in pairs], dtype=np.int64),
+        np.array([pair[1] for pair in pairs], dtype=np.int64),
+        np.array([pair[2] for pair in pairs], dtype=float),
+    )
+    previous, following, counts = bigrams
+    root_kids = tree.children[0]
+
+    # Branch points in batches that can be solved together: the same number
+    # of children, and deepest first so children are solved before parents
+    batches: Dict[Tuple[int, int], List[int]] = {}
+    for v in tree.internal:
+        key = (-tree.depth[v], len(tree.children[v]))
+        batches.setdefault(key, []).append(v)
+    kid_arrays = {v: np.array(tree.children[v]) for v in tree.internal}
+
+    def propagate(label: np.ndarray, best: Dict[int, np.ndarray]):
+        # Parents come before children in breadth-first order
+        for v in tree.internal:
+            label[kid_arrays[v]] = best[v][label[v]]
+
+    def relabel_below_root(
+        label: np.ndarray,
+    ) -> Tuple[Dict[int, np.ndarray], np.ndarray]:
+        # Each leaf's cost of ending on each symbol, given the first
+        # symbols of the targets that follow it
+        ending = np.zeros((len(label), num_branches))
+        np.add.at(ending, (previous, label[tree.top[following]]), counts)
+        best_cost = ending @ costs.T
+
+        best = {}
+        for key in sorted(batches):
+            nodes = batches[key]
+            kids = np.array([tree.children[v] for v in nodes])
+            assignments, totals = best_assignments(
+                best_cost[kids], tree.weight[kids], costs
+            )
+            best_cost[nodes] = totals
+            best.update(zip(nodes, assignments))
+        propagate(label, best)
+        return best, best_cost
+
+    label = tree.label.copy()
+    best, best_cost = relabel_below_root(label)
+    total = _total_cost(tree, label, costs, bigrams)
+    for _ in range(max_sweeps):
+        # Propose root symbols given the last symbol before every code: the
+        # assignment that is optimal if the rest of the tree keeps its best
+        # costs, and every swap of two root symbols
+        starting = np.zeros((len(label), num_branches))
+        np.add.at(starting, (tree.top[following], label[previous]), counts)
+        matrix = best_cost[root_kids] + starting[root_kids] @ costs
+        proposals = [assign_min_cost(matrix.tolist())]
+        for a, b in itertools.combinations(range(len(root_kids)), 2):
+            swapped = label[root_kids].tolist()
+            swapped[a], swapped[b] = swapped[b], swapped[a]
+            proposals.append(swapped)
+
+        candidate, candidate_total = None, total
+        for proposal in proposals:
+            relabeled = label.copy()
+            relabeled[root_kids] = proposal
+            propagate(relabeled, best)
+            relabeled_total = _total_cost(tree, relabeled, costs, bigrams)
+            if relabeled_total < candidate_total:
+                candidate, candidate_total = relabeled, relabeled_total
+        if candidate is None:
+            break
+        label = candidate
+        best, best_cost = relabel_below_root(label)
+        total = _total_cost(tree, label, costs, bigrams)
+
+    tree.label = label
+    return tree.rebuild(num_branches)
+
+
+def expected_transition_cost(
+    encoding_map: Dict[Tuple[str, ...], Tuple[str, int]],
+    symbols: List[str],
+    transition_costs: Sequence[Sequence[float]],
+    bigram_counts: Optional[BigramCounts] = None,
+) -> float:
+    """
+    Compute the expected transition cost per target of an encoding map.
+
+    :param encoding_map: An encoding map with targets and counts.
+    :param symbols: A list of symbols used in the encoding.
+    :param transition_costs: The cost of pressing `symbols[j]` right after
+        `symbols[i]` at row i and column j.
+    :param bigram_counts: Optional counts of (previous target, target)
+        pairs, for the transitions between codes.
+    :return: The total transition cost divided by the total count.
+    """
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    codes = {target: path for path, (target, _) in encoding_map.items()}
+    total_count = sum(count for _, count in encoding_map.values())
+    total_cost = sum(
+        count
+        * sum(
+            transition_costs[index[a]][index[b]]
+            for a, b in zip(path, path[1:])
+        )
+        for path, (_, count) in encoding_map.items()
+    )
+    for (previous, target), count in (bigram_counts or {}).items():
+        if previous in codes and target in codes:
+            total_cost += (
+                count
+                * transition_costs[index[codes[previous][-1]]][
+                    index[codes[target][0]]
+                ]
+            )
+    return total_cost / total_count if total_count else 0.0
+
+
+def transition_optimized_encoding_map(
+    root: Node,
+    symbols: List[str],
+    count_dict: Dict[str, int],
+    transition_costs: Sequence[Sequence[float]],
+    bigram_counts: Optional[BigramCounts] = None,
+) -> Dict[Tuple[str, ...], Tuple[str, int]]:
+    """
+    Generate an encoding map with the symbols at every branch point chosen
+    by `optimize_transitions`. The code lengths are those of the tree.
+
+    :param root: The root of the Huffman tree.
+    :param symbols: A list of symbols used in the encoding.
+    :param count_dict: A dictionary mapping targets to their counts.
+    :param transition_costs: The cost of pressing `symbols[j]` right after
+        `symbols[i]` at row i and column j.
+    :param bigram_counts: Optional counts of (previous target, target)
+        pairs.
+    :return: An encoding map with targets and counts.
+    :raises ValueError: If the cost matrix does not match the symbols.
+    """
+    if len(transition_costs) != len(symbols):
+        raise ValueError("transition_costs must have one row per symbol")
+    relabeled = optimize_transitions(root, transition_costs, bigram_counts)
+    return generate_encoding_map_with_count(relabeled, symbols, count_dict)
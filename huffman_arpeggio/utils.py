@@ -1,5 +1,6 @@
-import pandas as pd
-from typing import Dict, Tuple, List
+import csv
+import os
+from typing import Dict, Iterable, Iterator, TextIO, Tuple, List
 from collections import Counter
 
 
@@ -9,13 +10,62 @@ def load_count_dict(
     """
     Load the count dictionary from a CSV file.
 
+    The file is read one row at a time with the stdlib `csv` module, so
+    this does not import pandas or hold the whole file in memory.
+
     :param file_path: Path to the CSV file.
     :param target_col: The column containing the targets.
     :param count_col: The column containing the counts.
     :return: A dictionary mapping targets to their counts.
     """
-    df = pd.read_csv(file_path)
-    return df.set_index(target_col)[count_col].to_dict()
+    with open(file_path, newline="") as f:
+        return {
+            row[target_col]: int(row[count_col]) for row in csv.DictReader(f)
+        }
+
+
+def iter_rows_by_count(
+    encoding_map_with_count: Dict[Tuple[str, ...], Tuple[str, int]],
+) -> Iterator[Tuple[Tuple[str, ...], str, int]]:
+    """
+    Iterate over the rows of an encoding map in descending count order.
+
+    Maps that are already in that order, such as those from
+    `canonical_encoding_map`, are streamed as they are after a single pass
+    to check the order. Only other maps are sorted, keeping the map order
+    of equal counts.
+
+    :param encoding_map_with_count: The encoding map with counts.
+    :return: An iterator of (path, target, count) rows.
+    """
+    items = encoding_map_with_count.items()
+    previous = None
+    for _, count in encoding_map_with_count.values():
+        if previous is not None and count > previous:
+            items = sorted(items, key=lambda item: item[1][1], reverse=True)
+            break
+        previous = count
+    for path, (target, count) in items:
+        yield path, target, count
+
+
+def write_encoding_map_rows(
+    rows: Iterable[Tuple[Tuple[str, ...], str, int]], output_path: str
+):
+    """
+    Write encoding map rows to a CSV file as they come, without holding
+    them in memory.
+
+    :param rows: An iterable of (path, target, count) rows, e.g. from
+        `iter_rows_by_count` or `iter_encoding_map`.
+    :param output_path: Path to the output CSV file.
+    """
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator=os.linesep)
+        writer.writerow(["sequence", "target", "count"])
+        writer.writerows(
+            (" ".join(path), target, count) for path, target, count in rows
+        )
 
 
 def save_encoding_map_with_count(
@@ -23,21 +73,15 @@ def save_encoding_map_with_count(
     output_path: str,
 ):
     """
-    Save the encoding map with counts to a CSV file.
+    Save the encoding map with counts to a CSV file, in descending count
+    order.
 
     :param encoding_map_with_count: The encoding map with counts.
     :param output_path: Path to the output CSV file.
     """
-    encoding_map_data_with_count = [
-        {"sequence": " ".join(path), "target": target, "count": count}
-        for path, (target, count) in encoding_map_with_count.items()
-    ]
-    encoding_map_df_with_count = pd.DataFrame(encoding_map_data_with_count)
-    encoding_map_df_with_count.sort_values(
-        by="count", ascending=False, inplace=True
+    write_encoding_map_rows(
+        iter_rows_by_count(encoding_map_with_count), output_path
     )
-    encoding_map_df_with_count.reset_index(drop=True, inplace=True)
-    encoding_map_df_with_count.to_csv(output_path, index=False)
 
 
 def generate_count_dict(strings: List[str]) -> Dict[str, int]:
@@ -48,3 +92,40 @@ def generate_count_dict(strings: List[str]) -> Dict[str, int]:
     :return: A dictionary mapping each unique string to its count in the list.
     """
     return dict(Counter(strings))
+
+
+def iter_lines(stream: TextIO, chunk_size: int = 1 << 20) -> Iterator[str]:
+    """
+    Iterate over the non-empty lines of a text stream, reading it in
+    fixed-size chunks so that memory use does not grow with the input.
+
+    :param stream: The text stream to read, e.g. sys.stdin.
+    :param chunk_size: The number of characters to read at a time.
+    :return: An iterator of lines without their line endings.
+    """
+    remainder = ""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (remainder + chunk).split("\n")
+        remainder = lines.pop()
+        for line in lines:
+            line = line.rstrip("\r")
+            if line:
+                yield line
+    if remainder.rstrip("\r"):
+        yield remainder.rstrip("\r")
+
+
+def count_lines(lines: Iterable[str]) -> Dict[str, int]:
+    """
+    Generate a target => count map from a stream of lines, without holding
+    the lines in memory.
+
+    :param lines: An iterable of lines, e.g. from `iter_lines`.
+    :return: A dictionary mapping each unique line to its count.
+    """
+    counter: Counter = Counter()
+    counter.update(lines)
+    return dict(counter)
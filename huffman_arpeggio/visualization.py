@@ -1,50 +1,206 @@
-from graphviz import Digraph
+import itertools
+import os
+from heapq import heappop, heappush
+from typing import TYPE_CHECKING, List, Optional, Sequence, Set, TextIO
+
 from huffman_arpeggio.core import Node
-from rich.tree import Tree
+
+# Graphviz and Rich are imported when a visualization is made, so importing
+# this module stays cheap
+if TYPE_CHECKING:
+    from rich.tree import Tree
 
 
-def visualize_huffman_tree_graphviz(root: Node, output_path: str):
+def expanded_nodes(
+    root: Node, max_depth: Optional[int] = None, top_k: Optional[int] = None
+) -> Optional[Set[int]]:
     """
-    Visualize the Huffman tree using Graphviz.
+    Choose the internal nodes to expand in a truncated view: the `top_k`
+    internal nodes with the highest counts, at most `max_depth` levels below
+    the root. Counts never grow down the tree, so they form a subtree that
+    contains the root.
 
     :param root: The root of the Huffman tree.
-    :param output_path: The path to save the output visualization file.
+    :param max_depth: The depth below which nodes are not expanded, or None.
+    :param top_k: The number of internal nodes to expand, or None for all.
+    :return: The ids of the nodes to expand, or None to expand every node
+        within `max_depth`.
     """
-    dot = Digraph(comment="Huffman Tree")
+    if top_k is None:
+        return None
+    expanded: Set[int] = set()
+    # The counter breaks ties in visiting order, since nodes do not compare
+    # by anything but count
+    order = itertools.count()
+    heap = [(-root.count, next(order), 0, root)]
+    while heap and len(expanded) < top_k:
+        _, _, depth, node = heappop(heap)
+        if max_depth is not None and depth >= max_depth:
+            continue
+        expanded.add(id(node))
+        for child in node.children:
+            if child.children:
+                heappush(heap, (-child.count, next(order), depth + 1, child))
+    return expanded
+
+
+def _is_expanded(
+    node: Node,
+    depth: int,
+    max_depth: Optional[int],
+    expanded: Optional[Set[int]],
+) -> bool:
+    if not node.children:
+        return False
+    if max_depth is not None and depth >= max_depth:
+        return False
+    return expanded is None or id(node) in expanded
+
 
-    def add_nodes_edges(node: Node, parent_id=None):
-        node_id = id(node)
-        label = (
-            f"{node.target}\n{node.count}" if node.target else str(node.count)
-        )
-        dot.node(name=str(node_id), label=label)
+def _dot_string(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"')
+    return '"' + escaped.replace("\n", "\\n") + '"'
+
+
+def write_dot(
+    root: Node,
+    file: TextIO,
+    symbols: Optional[Sequence[str]] = None,
+    max_depth: Optional[int] = None,
+    top_k: Optional[int] = None,
+):
+    """
+    Write the Huffman tree in the Graphviz DOT language, one node or edge
+    at a time, without holding a graph in memory.
+
+    Nodes are named `n0`, `n1`, ... in depth-first order, so the same tree
+    is always written the same way. Internal nodes that are not expanded
+    are written as dashed summary nodes with the count of their subtree.
+
+    :param root: The root of the Huffman tree.
+    :param file: The stream to write to.
+    :param symbols: The symbols used in the encoding, to label the edges.
+    :param max_depth: The depth below which subtrees are summarized, or
+        None.
+    :param top_k: Expand only the `top_k` internal nodes with the highest
+        counts, or None for all.
+    """
+    expanded = expanded_nodes(root, max_depth, top_k)
+    # Child i is pressed with symbols[-1 - i], as in `iter_encoding_map`
+    edge_symbols = list(reversed(symbols)) if symbols is not None else None
+    file.write("// Huffman Tree\ndigraph {\n")
+    node_ids = itertools.count()
+    stack = [(root, None, None, 0)]
+    while stack:
+        node, parent_id, symbol, depth = stack.pop()
+        node_id = f"n{next(node_ids)}"
+        if node.target:
+            label = f"{node.target}\n{node.count}"
+            attributes = f"label={_dot_string(label)}"
+        elif _is_expanded(node, depth, max_depth, expanded):
+            attributes = f"label={_dot_string(str(node.count))}"
+            children = [
+                (
+                    child,
+                    node_id,
+                    edge_symbols[index] if edge_symbols else None,
+                    depth + 1,
+                )
+                for index, child in enumerate(node.children)
+            ]
+            stack.extend(reversed(children))
+        elif node.children:
+            label = f"{node.count}\n…"
+            attributes = f"label={_dot_string(label)} style=dashed"
+        else:
+            attributes = f"label={_dot_string(str(node.count))}"
+        file.write(f"\t{node_id} [{attributes}]\n")
 
         if parent_id is not None:
-            dot.edge(str(parent_id), str(node_id))
+            edge = f"\t{parent_id} -> {node_id}"
+            if symbol is not None:
+                edge += f" [label={_dot_string(symbol)}]"
+            file.write(edge + "\n")
+    file.write("}\n")
 
-        for child in node.children:
-            add_nodes_edges(child, node_id)
 
-    add_nodes_edges(root)
-    dot.render(output_path, format="png", cleanup=True)
+def visualize_huffman_tree_graphviz(
+    root: Node,
+    output_path: str,
+    symbols: Optional[Sequence[str]] = None,
+    max_depth: Optional[int] = None,
+    top_k: Optional[int] = None,
+):
+    """
+    Visualize the Huffman tree using Graphviz.
 
+    The DOT source is streamed to `output_path` and rendered to
+    `output_path.png`, then removed. Large trees should be truncated with
+    `max_depth` or `top_k`, since Graphviz lays out every node it is given.
 
-def visualize_huffman_tree_rich(root: Node) -> Tree:
+    :param root: The root of the Huffman tree.
+    :param output_path: The path to save the output visualization file.
+    :param symbols: The symbols used in the encoding, to label the edges.
+    :param max_depth: The depth below which subtrees are summarized, or
+        None.
+    :param top_k: Expand only the `top_k` internal nodes with the highest
+        counts, or None for all.
+    """
+    import graphviz
+
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        write_dot(root, f, symbols, max_depth, top_k)
+    try:
+        graphviz.render("dot", "png", output_path)
+    finally:
+        os.remove(output_path)
+
+
+def visualize_huffman_tree_rich(
+    root: Node,
+    max_depth: Optional[int] = None,
+    top_k: Optional[int] = None,
+    path: Sequence[int] = (),
+) -> "Tree":
     """
     Visualize the Huffman tree as an ASCII tree using Rich.
 
+    Only the nodes shown are visited, so a large tree can be inspected
+    piece by piece: view the top levels with `max_depth`, then view the
+    subtree under one of the summarized nodes by passing its `path`.
+
     :param root: The root of the Huffman tree.
+    :param max_depth: The depth below the viewed node at which subtrees are
+        summarized, or None.
+    :param top_k: Expand only the `top_k` internal nodes with the highest
+        counts, or None for all.
+    :param path: The child indices leading from the root to the node to
+        view.
+    :return: The Rich tree.
+    :raises IndexError: If the path does not lead to a node.
     """
+    from rich.tree import Tree
 
-    def add_nodes(node: Node, tree: Tree, level: int):
+    for index in path:
+        root = root.children[index]
+    expanded = expanded_nodes(root, max_depth, top_k)
+
+    tree = Tree(f"{root.count}")
+    stack: List = [(root, tree, 0)]
+    while stack:
+        node, branch, depth = stack.pop()
+        if not _is_expanded(node, depth, max_depth, expanded):
+            if node.children:
+                branch.add("…")
+            continue
         for index, child in enumerate(node.children):
             label = f"{child.count}"
             if child.target:
                 label += f" {child.target}"
-            branch = tree.add(f"{index + 1}. {label}")
-            add_nodes(child, branch, level + 1)
-
-    tree = Tree(f"{root.count}")
-    add_nodes(root, tree, 0)
-
+            stack.append(
+                (child, branch.add(f"{index + 1}. {label}"), depth + 1)
+            )
     return tree
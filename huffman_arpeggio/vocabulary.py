@@ -0,0 +1,259 @@
+import csv
+import os
+from array import array
+from bisect import bisect_left
+from collections.abc import ItemsView, Mapping, ValuesView
+from typing import Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from huffman_arpeggio.layout_file import StringTable
+
+
+class _Values(ValuesView):
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._mapping.counts.tolist())
+
+
+class _Items(ItemsView):
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        return zip(self._mapping, self._mapping.counts.tolist())
+
+
+class Vocabulary(Mapping):
+    """
+    A target => count table stored in columns: the targets as UTF-8 back to
+    back in one buffer with an array of offsets, and the counts as an int64
+    array. A million command-sized targets take tens of megabytes, instead
+    of the hundreds of a `Dict[str, int]`.
+
+    It is a read-only mapping, so it can be passed anywhere a count_dict is
+    expected. Iteration decodes targets one at a time, in table order.
+    Looking up a target by key builds a hash index on first use, which
+    costs 16 bytes per target, so bulk operations should work on `counts`
+    and positions instead.
+
+    :param data: The UTF-8 bytes of all targets, which must be unique.
+    :param offsets: The byte offset of each target in `data`, and one past
+        the last, as int64.
+    :param counts: The count of each target, as int64.
+    :raises ValueError: If the offsets and counts do not match.
+    """
+
+    def __init__(self, data: bytes, offsets: np.ndarray, counts: np.ndarray):
+        self.data = data
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        if len(self.offsets) != len(self.counts) + 1:
+            raise ValueError("offsets must have one more entry than counts")
+        if self.offsets[0] != 0 or self.offsets[-1] != len(data):
+            raise ValueError("offsets must span the whole data buffer")
+        self._hashes: Optional[array] = None
+        self._hash_order: Optional[array] = None
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[str, int]]) -> "Vocabulary":
+        """
+        Build a vocabulary from (target, count) pairs, e.g. the items of a
+        count_dict or the rows of a CSV file, without holding them in memory.
+
+        :param items: An iterable of (target, count) pairs with unique
+            targets.
+        :return: The vocabulary, in the order of the pairs.
+        """
+        data = bytearray()
+        offsets = array("q", [0])
+        counts = array("q")
+        for target, count in items:
+            data += target.encode("utf-8")
+            offsets.append(len(data))
+            counts.append(count)
+        return cls(
+            bytes(data),
+            np.frombuffer(offsets, dtype=np.int64),
+            np.frombuffer(counts, dtype=np.int64),
+        )
+
+    @property
+    def targets(self) -> StringTable:
+        """
+        The targets as a sequence, decoded only when accessed.
+        """
+        return StringTable(self.offsets, memoryview(self.data))
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The size of the columns in bytes, without the hash index.
+        """
+        return len(self.data) + self.offsets.nbytes + self.counts.nbytes
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __iter__(self) -> Iterator[str]:
+        data = self.data
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield data[start:end].decode("utf-8")
+
+    def __getitem__(self, target: str) -> int:
+        return int(self.counts[self.position(target)])
+
+    def __contains__(self, target) -> bool:
+        try:
+            self.position(target)
+        except KeyError:
+            return False
+        return True
+
+    def __repr__(self) -> str:
+        return f"<Vocabulary of {len(self)} targets>"
+
+    def values(self) -> _Values:
+        return _Values(self)
+
+    def items(self) -> _Items:
+        return _Items(self)
+
+    def position(self, target: str) -> int:
+        """
+        Look up the position of a target in the table.
+
+        :param target: The target.
+        :return: Its index into `counts` and `targets`.
+        :raises KeyError: If the target is not in the table.
+        """
+        if self._hashes is None:
+            hashes = np.fromiter(
+                (hash(t) for t in self), dtype=np.int64, count=len(self)
+            )
+            order = np.argsort(hashes, kind="stable")
+            # Arrays rather than NumPy, since bisect and scalar indexing
+            # are several times faster on them
+            self._hash_order = array("q", order.tobytes())
+            self._hashes = array("q", hashes[order].tobytes())
+        if not isinstance(target, str):
+            raise KeyError(target)
+        key = hash(target)
+        hashes = self._hashes
+        i = bisect_left(hashes, key)
+        while i < len(hashes) and hashes[i] == key:
+            index = self._hash_order[i]
+            start, end = self.offsets[index], self.offsets[index + 1]
+            if self.data[start:end].decode("utf-8") == target:
+                return index
+            i += 1
+        raise KeyError(target)
+
+    def take(self, indices: np.ndarray) -> "Vocabulary":
+        """
+        Select targets by position, copying both columns in a few array
+        operations.
+
+        :param indices: The positions of the targets to keep, in the order
+            to keep them.
+        :return: A new vocabulary.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        starts = self.offsets[indices]
+        lengths = self.offsets[indices + 1] - starts
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # The source byte of every output byte: each target's bytes are a
+        # run starting at its old offset
+        sources = np.arange(offsets[-1], dtype=np.int64) + np.repeat(
+            starts - offsets[:-1], lengths
+        )
+        data = np.frombuffer(self.data, dtype=np.uint8)[sources].tobytes()
+        return Vocabulary(data, offsets, self.counts[indices])
+
+    def filter(self, mask: np.ndarray) -> "Vocabulary":
+        """
+        Keep the targets where a boolean mask is true, in order, e.g.
+        `vocabulary.filter(vocabulary.counts >= 4)`.
+
+        :param mask: A boolean array with one entry per target.
+        :return: A new vocabulary.
+        """
+        return self.take(np.flatnonzero(mask))
+
+    def min_count(self, minimum: int) -> "Vocabulary":
+        """
+        Keep the targets with at least a given count, in order.
+
+        :param minimum: The minimum count.
+        :return: A new vocabulary.
+        """
+        return self.filter(self.counts >= minimum)
+
+    def sort(self) -> "Vocabulary":
+        """
+        Sort the targets by descending count, keeping the table order of
+        equal counts.
+
+        :return: A new vocabulary.
+        """
+        return self.take(np.argsort(-self.counts, kind="stable"))
+
+    def top_k(self, k: int) -> "Vocabulary":
+        """
+        Select the `k` targets with the highest counts, in descending count
+        order, in time linear in the size of the table.
+
+        :param k: The number of targets to keep.
+        :return: A new vocabulary.
+        """
+        if k >= len(self):
+            return self.sort()
+        if k <= 0:
+            return self.take(np.zeros(0, dtype=np.int64))
+        # The k-th highest count, then everything above it and as many of
+        # the ties as fit, by table order
+        threshold = np.partition(self.counts, len(self) - k)[len(self) - k]
+        above = np.flatnonzero(self.counts > threshold)
+        ties = np.flatnonzero(self.counts == threshold)[: k - len(above)]
+        indices = np.concatenate([above, ties])
+        indices.sort()
+        return self.take(
+            indices[np.argsort(-self.counts[indices], kind="stable")]
+        )
+
+
+def load_vocabulary(
+    file_path: str, target_col: str, count_col: str
+) -> Vocabulary:
+    """
+    Load a vocabulary from a CSV file, one row at a time, like
+    `load_count_dict`.
+
+    :param file_path: Path to the CSV file.
+    :param target_col: The column containing the targets.
+    :param count_col: The column containing the counts.
+    :return: The vocabulary, in file order.
+    """
+    with open(file_path, newline="") as f:
+        return Vocabulary.from_items(
+            (row[target_col], int(row[count_col])) for row in csv.DictReader(f)
+        )
+
+
+def save_vocabulary(
+    vocabulary: Vocabulary,
+    output_path: str,
+    target_col: str = "target",
+    count_col: str = "count",
+):
+    """
+    Save a vocabulary to a CSV file, in table order, in the format of
+    `count-lines-to-csv`.
+
+    :param vocabulary: The vocabulary.
+    :param output_path: Path to the output CSV file.
+    :param target_col: The header of the target column.
+    :param count_col: The header of the count column.
+    """
+    with open(output_path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator=os.linesep)
+        writer.writerow([target_col, count_col])
+        writer.writerows(vocabulary.items())
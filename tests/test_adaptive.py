@@ -0,0 +1,106 @@
+import random
+
+import pytest
+from huffman_arpeggio.adaptive import AdaptiveHuffman
+from huffman_arpeggio.core import huffman_code_lengths
+
+
+def total_cost(encoding_map):
+    return sum(len(code) * count for code, (_, count) in encoding_map.items())
+
+
+def optimal_cost(encoding_map, num_branches):
+    counts = [count for _, count in encoding_map.values()]
+    lengths = huffman_code_lengths(counts, num_branches)
+    return sum(count * length for count, length in zip(counts, lengths))
+
+
+def test_adaptive_huffman_initial_counts():
+    count_dict = {"A": 5, "B": 2, "C": 1, "D": 1}
+    adaptive = AdaptiveHuffman(["X", "O"], count_dict)
+    encoding_map = adaptive.encoding_map()
+
+    assert len(adaptive) == 4
+    assert "A" in adaptive
+    assert encoding_map[("X",)] == ("A", 5)
+    assert {target: count for target, count in encoding_map.values()} == (
+        count_dict
+    )
+    assert total_cost(encoding_map) == optimal_cost(encoding_map, 2)
+
+
+def test_adaptive_huffman_increment_reorders_codes():
+    adaptive = AdaptiveHuffman(["X", "O", "□"], {"A": 3, "B": 2, "C": 1})
+    assert adaptive.code("A") == ("X",)
+    adaptive.pop_code_changes()
+
+    adaptive.increment("C", 3)
+
+    assert adaptive.code("C") == ("X",)
+    assert adaptive.code("A") == ("O",)
+    assert adaptive.pop_code_changes() == {
+        "A": (("X",), ("O",)),
+        "B": (("O",), ("□",)),
+        "C": (("□",), ("X",)),
+    }
+    assert adaptive.pop_code_changes() == {}
+
+
+def test_adaptive_huffman_add_target():
+    adaptive = AdaptiveHuffman(["X", "O"])
+    adaptive.add_target("A")
+    assert adaptive.code("A") == ()
+    assert adaptive.pop_code_changes() == {"A": (None, ())}
+
+    adaptive.add_target("B", 2)
+    adaptive.add_target("C")
+
+    encoding_map = adaptive.encoding_map()
+    assert encoding_map[("X",)] == ("B", 2)
+    assert sorted(encoding_map.values()) == [("A", 0), ("B", 2), ("C", 0)]
+    assert adaptive.pop_code_changes()["C"][0] is None
+
+
+def test_adaptive_huffman_stays_optimal():
+    rng = random.Random(0)
+    for num_branches in [2, 3, 5]:
+        adaptive = AdaptiveHuffman([str(i) for i in range(num_branches)])
+        counts = {}
+        codes = {}
+        for step in range(300):
+            if not counts or rng.random() < 0.2:
+                target = f"t{step}"
+                counts[target] = rng.choice([0, 1, 4])
+                adaptive.add_target(target, counts[target])
+            else:
+                target = rng.choice(list(counts))
+                delta = rng.randint(1, 3)
+                counts[target] += delta
+                adaptive.increment(target, delta)
+
+            encoding_map = adaptive.encoding_map()
+            assert {t: count for t, count in encoding_map.values()} == counts
+            assert total_cost(encoding_map) == optimal_cost(
+                encoding_map, num_branches
+            )
+
+            current = {t: code for code, (t, _) in encoding_map.items()}
+            for target, (old, new) in adaptive.pop_code_changes().items():
+                assert codes.get(target) == old
+                codes[target] = new
+            assert codes == current
+
+
+def test_adaptive_huffman_invalid_input():
+    with pytest.raises(ValueError):
+        AdaptiveHuffman(["X", "X"])
+    with pytest.raises(ValueError):
+        AdaptiveHuffman(["X", "O"], {"A": -1})
+
+    adaptive = AdaptiveHuffman(["X", "O"], {"A": 1})
+    with pytest.raises(KeyError):
+        adaptive.increment("B")
+    with pytest.raises(ValueError):
+        adaptive.increment("A", -1)
+    with pytest.raises(ValueError):
+        adaptive.add_target("A")
@@ -0,0 +1,163 @@
+import math
+
+import numpy as np
+import pytest
+
+from huffman_arpeggio.analytics import (
+    analyze_alphabets,
+    analyze_code_lengths,
+    analyze_columns,
+    analyze_layout,
+    entropy_bits,
+    format_stats_table,
+)
+from huffman_arpeggio.arrow_io import LayoutColumns
+from huffman_arpeggio.canonical import canonical_encoding_map
+from huffman_arpeggio.core import (
+    build_huffman_tree,
+    generate_encoding_map_with_count,
+)
+from huffman_arpeggio.utils import load_count_dict
+
+INPUT_CSV = "tests/data/playstation-qwerty-wikipedia-example-input.csv"
+PLAYSTATION = ["X", "O", "□", "∆", "⬇️", "⬆️", "⬅️", "➡️"]
+HOME_ROW = list("jfkdls")
+
+
+def expected_presses(encoding_map):
+    total = sum(count for _, count in encoding_map.values())
+    return (
+        sum(len(path) * count for path, (_, count) in encoding_map.items())
+        / total
+    )
+
+
+def test_entropy_bits():
+    assert entropy_bits([1, 1, 1, 1]) == pytest.approx(2.0)
+    assert entropy_bits([5, 0]) == 0.0
+    with pytest.raises(ValueError):
+        entropy_bits([0, 0])
+
+
+def test_analyze_alphabets():
+    count_dict = load_count_dict(INPUT_CSV, "keyswitch", "count")
+
+    stats = analyze_alphabets(
+        count_dict, {"playstation": PLAYSTATION, "home row": HOME_ROW}
+    )
+
+    assert [layout.name for layout in stats] == ["playstation", "home row"]
+    for layout, symbols in zip(stats, [PLAYSTATION, HOME_ROW]):
+        root = build_huffman_tree(count_dict, symbols)
+        encoding_map = generate_encoding_map_with_count(
+            root, symbols, count_dict
+        )
+        assert layout.symbols == tuple(symbols)
+        assert layout.num_targets == len(count_dict)
+        assert layout.expected_presses == pytest.approx(
+            expected_presses(encoding_map)
+        )
+        assert layout.entropy_bound == pytest.approx(
+            entropy_bits(list(count_dict.values())) / math.log2(len(symbols))
+        )
+        assert layout.entropy_bound <= layout.expected_presses
+        assert layout.expected_presses < layout.entropy_bound + 1
+        assert 0 < layout.efficiency <= 1
+        assert layout.length_histogram.sum() == len(count_dict)
+        assert layout.max_length == len(layout.length_histogram) - 1
+        assert layout.symbol_usage.sum() == pytest.approx(1.0)
+
+
+def test_analyze_alphabets_max_length():
+    count_dict = load_count_dict(INPUT_CSV, "keyswitch", "count")
+
+    unlimited, limited = analyze_alphabets(
+        count_dict, {"home row": HOME_ROW}
+    ) + analyze_alphabets(count_dict, {"home row": HOME_ROW}, max_length=4)
+
+    assert limited.max_length == 4
+    assert limited.expected_presses >= unlimited.expected_presses
+
+
+def test_analyze_code_lengths_batch():
+    counts = [4, 2, 1, 1]
+    code_lengths = np.array([[1, 2, 3, 3], [2, 2, 2, 2], [1, 1, 1, 1]])
+
+    stats = analyze_code_lengths(counts, code_lengths, [2, 2, 4])
+
+    assert [layout.expected_presses for layout in stats] == [1.75, 2.0, 1.0]
+    assert stats[0].efficiency == pytest.approx(1.0)
+    assert stats[1].length_histogram.tolist() == [0, 0, 4]
+    assert stats[2].length_histogram.tolist() == [0, 4]
+    assert stats[2].symbol_usage.tolist() == [0.5, 0.25, 0.125, 0.125]
+    assert stats[2].name == "4 symbols"
+
+    with pytest.raises(ValueError):
+        analyze_code_lengths(counts, code_lengths, [2, 2])
+
+
+def test_canonical_symbol_usage_matches_layout():
+    count_dict = load_count_dict(INPUT_CSV, "keyswitch", "count")
+    encoding_map = canonical_encoding_map(count_dict, HOME_ROW)
+
+    from_layout = analyze_layout("layout", encoding_map, HOME_ROW)
+    (from_lengths,) = analyze_alphabets(count_dict, {"layout": HOME_ROW})
+
+    np.testing.assert_allclose(
+        from_layout.symbol_usage, from_lengths.symbol_usage
+    )
+    assert from_layout.expected_presses == pytest.approx(
+        from_lengths.expected_presses
+    )
+
+
+def test_analyze_layout():
+    encoding_map = {("a",): ("x", 3), ("b", "a"): ("y", 1)}
+
+    stats = analyze_layout("small", encoding_map, ["a", "b"])
+
+    assert stats.expected_presses == 1.25
+    assert stats.symbol_usage.tolist() == [0.8, 0.2]
+    assert stats.length_histogram.tolist() == [0, 1, 1]
+
+    with pytest.raises(ValueError):
+        analyze_layout("small", encoding_map, ["a", "c"])
+    with pytest.raises(ValueError):
+        analyze_layout("empty", {}, ["a", "b"])
+
+
+def test_analyze_columns():
+    columns = LayoutColumns(
+        symbols=["a", "b"],
+        offsets=np.array([0, 1, 3]),
+        presses=np.array([0, 1, 0]),
+        targets=["x", "y"],
+        counts=np.array([3, 1]),
+    )
+
+    stats = analyze_columns("small", columns)
+
+    assert stats.expected_presses == 1.25
+    assert stats.symbol_usage.tolist() == [0.8, 0.2]
+    assert stats.length_histogram.tolist() == [0, 1, 1]
+
+    layout_stats = analyze_layout("small", columns.encoding_map(), ["a", "b"])
+    assert stats.efficiency == layout_stats.efficiency
+    assert stats.symbol_usage.tolist() == layout_stats.symbol_usage.tolist()
+
+    with pytest.raises(ValueError):
+        analyze_columns("empty", LayoutColumns(["a"], [0], [], [], []))
+
+
+def test_format_stats_table():
+    count_dict = load_count_dict(INPUT_CSV, "keyswitch", "count")
+    stats = analyze_alphabets(
+        count_dict, {"playstation": PLAYSTATION, "home row": HOME_ROW}
+    )
+
+    lines = format_stats_table(stats).splitlines()
+
+    assert lines[0].split()[:2] == ["layout", "symbols"]
+    # Most efficient first
+    assert lines[1].startswith("home row")
+    assert lines[2].startswith("playstation")
@@ -0,0 +1,71 @@
+import pytest
+
+from huffman_arpeggio.analytics import analyze_columns, analyze_layout
+from huffman_arpeggio.arrow_io import (
+    iter_record_batches,
+    load_arrow_columns,
+    load_parquet_columns,
+    save_encoding_map_arrow,
+    save_encoding_map_parquet,
+)
+from huffman_arpeggio.canonical import canonical_encoding_map
+from huffman_arpeggio.utils import load_count_dict
+
+pa = pytest.importorskip("pyarrow")
+
+INPUT_CSV = "tests/data/playstation-qwerty-wikipedia-example-input.csv"
+PLAYSTATION = ["X", "O", "□", "∆", "⬇️", "⬆️", "⬅️", "➡️"]
+
+
+@pytest.fixture
+def encoding_map():
+    count_dict = load_count_dict(INPUT_CSV, "keyswitch", "count")
+    return canonical_encoding_map(count_dict, PLAYSTATION)
+
+
+@pytest.mark.parametrize(
+    "save, load",
+    [
+        (save_encoding_map_arrow, load_arrow_columns),
+        (save_encoding_map_parquet, load_parquet_columns),
+    ],
+)
+def test_round_trip(tmp_path, encoding_map, save, load):
+    path = str(tmp_path / "layout")
+    save(encoding_map, PLAYSTATION, path)
+
+    columns = load(path)
+
+    assert columns.symbols == PLAYSTATION
+    assert columns.encoding_map() == encoding_map
+    assert list(columns.counts) == sorted(columns.counts, reverse=True)
+
+    stats = analyze_columns("playstation", columns)
+    layout_stats = analyze_layout("playstation", encoding_map, PLAYSTATION)
+    assert stats.expected_presses == pytest.approx(
+        layout_stats.expected_presses
+    )
+    assert stats.symbol_usage.tolist() == pytest.approx(
+        layout_stats.symbol_usage.tolist()
+    )
+
+
+def test_record_batches(encoding_map):
+    batches = list(
+        iter_record_batches(encoding_map, PLAYSTATION, batch_size=3)
+    )
+
+    assert [batch.num_rows for batch in batches[:-1]] == [3] * (
+        len(batches) - 1
+    )
+    assert sum(batch.num_rows for batch in batches) == len(encoding_map)
+    assert pa.types.is_dictionary(
+        batches[0].schema.field("sequence").type.value_type
+    )
+
+
+def test_unknown_symbol(tmp_path):
+    with pytest.raises(ValueError):
+        save_encoding_map_arrow(
+            {("a",): ("x", 1)}, ["b"], str(tmp_path / "layout")
+        )
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from huffman_arpeggio.canonical import (
+    assign_canonical_codes,
+    canonical_code_lengths,
+    canonical_encoding_map,
+)
+from huffman_arpeggio.core import (
+    build_huffman_tree,
+    generate_encoding_map_with_count,
+)
+from huffman_arpeggio.utils import load_count_dict
+
+
+def assert_prefix_free(codes):
+    code_set = set(codes)
+    for code in codes:
+        for i in range(len(code)):
+            assert code[:i] not in code_set
+
+
+def test_assign_canonical_codes():
+    digits = assign_canonical_codes(np.array([1, 2, 2, 2, 2]), 3)
+    assert digits.tolist() == [
+        [0, -1],
+        [1, 0],
+        [1, 1],
+        [1, 2],
+        [2, 0],
+    ]
+
+    with pytest.raises(ValueError):
+        assign_canonical_codes(np.array([1, 1, 1]), 2)
+
+
+def test_canonical_encoding_map():
+    count_dict = {"A": 5, "B": 7, "C": 10}
+    symbols = ["X", "O"]
+    encoding_map = canonical_encoding_map(count_dict, symbols)
+
+    assert encoding_map == {
+        ("X",): ("C", 10),
+        ("O", "X"): ("B", 7),
+        ("O", "O"): ("A", 5),
+    }
+
+    with pytest.raises(ValueError):
+        canonical_encoding_map({}, symbols)
+
+    with pytest.raises(ValueError):
+        canonical_encoding_map(count_dict, ["X", "X"])
+
+
+def test_canonical_encoding_map_matches_tree_lengths():
+    count_dict = load_count_dict(
+        "tests/data/playstation-qwerty-wikipedia-example-input.csv",
+        "keyswitch",
+        "count",
+    )
+    symbols = ["X", "O", "□", "∆", "⬇️", "⬆️", "⬅️", "➡️"]
+    encoding_map = canonical_encoding_map(count_dict, symbols)
+    tree_map = generate_encoding_map_with_count(
+        build_huffman_tree(count_dict, symbols), symbols, count_dict
+    )
+
+    assert_prefix_free(list(encoding_map))
+    assert sorted(encoding_map.values()) == sorted(tree_map.values())
+    assert {
+        target: len(code) for code, (target, _) in encoding_map.items()
+    } == {target: len(code) for code, (target, _) in tree_map.items()}
+    assert encoding_map[("X",)] == ("Shift", count_dict["Shift"])
+
+
+def test_canonical_encoding_map_from_lengths_table():
+    count_dict = {"A": 5, "B": 7, "C": 10, "D": 1}
+    symbols = ["X", "O", "□"]
+    code_lengths = canonical_code_lengths(count_dict, symbols)
+
+    assert code_lengths == {"A": 2, "B": 1, "C": 1, "D": 2}
+    # The padding node takes the last, unused code ("□", "□")
+    assert canonical_encoding_map(count_dict, symbols, code_lengths) == {
+        ("X",): ("C", 10),
+        ("O",): ("B", 7),
+        ("□", "X"): ("A", 5),
+        ("□", "O"): ("D", 1),
+    }
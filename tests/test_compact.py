@@ -0,0 +1,55 @@
+import pytest
+from huffman_arpeggio.compact import CompactTree, build_compact_tree
+from huffman_arpeggio.core import (
+    build_huffman_tree,
+    generate_encoding_map_with_count,
+)
+
+
+def test_build_compact_tree():
+    count_dict = {"A": 5, "B": 7, "C": 10}
+    symbols = ["X", "O"]
+    tree = build_compact_tree(count_dict, symbols)
+
+    assert len(tree) == 5
+    assert tree.count[0] == 22
+    assert list(tree.parent) == [-1, 0, 0, 2, 2]
+    assert list(tree.first_child) == [1, -1, 3, -1, -1]
+
+    with pytest.raises(ValueError):
+        build_compact_tree({}, symbols)
+
+    with pytest.raises(ValueError):
+        build_compact_tree(count_dict, ["X", "X"])
+
+
+def test_compact_tree_encoding_map_matches_node_tree():
+    count_dict = {chr(65 + i): (i * 7919) % 101 + 1 for i in range(26)}
+    symbols = ["X", "O", "□"]
+    root = build_huffman_tree(count_dict, symbols, engine="two_queue")
+    expected = generate_encoding_map_with_count(root, symbols, count_dict)
+
+    compact = build_compact_tree(count_dict, symbols)
+    assert (
+        generate_encoding_map_with_count(compact, symbols, count_dict)
+        == expected
+    )
+
+    converted = CompactTree.from_node(root, len(symbols))
+    assert (
+        generate_encoding_map_with_count(converted, symbols, count_dict)
+        == expected
+    )
+    assert (
+        generate_encoding_map_with_count(
+            converted.to_node(), symbols, count_dict
+        )
+        == expected
+    )
+
+
+def test_compact_tree_single_target():
+    tree = build_compact_tree({"A": 3}, ["X", "O"])
+    assert generate_encoding_map_with_count(tree, ["X", "O"], {"A": 3}) == {
+        (): ("A", 3)
+    }
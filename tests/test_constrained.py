@@ -0,0 +1,141 @@
+import random
+
+import pytest
+
+from huffman_arpeggio.constrained import build_constrained_encoding_map
+from huffman_arpeggio.core import (
+    build_huffman_tree,
+    generate_encoding_map_with_count,
+)
+
+
+def is_prefix_free(codes):
+    codes = sorted(codes)
+    return all(
+        codes[i + 1][: len(codes[i])] != codes[i]
+        for i in range(len(codes) - 1)
+    )
+
+
+def test_unconstrained_matches_huffman_cost():
+    rng = random.Random(0)
+    symbols = ["a", "b", "c"]
+    count_dict = {f"t{i}": rng.randint(1, 100) for i in range(40)}
+
+    encoding_map = build_constrained_encoding_map(count_dict, symbols)
+    expected = generate_encoding_map_with_count(
+        build_huffman_tree(count_dict, symbols), symbols, count_dict
+    )
+
+    def cost(mapping):
+        return sum(len(path) * count for path, (_, count) in mapping.items())
+
+    assert is_prefix_free(list(encoding_map))
+    assert cost(encoding_map) == cost(expected)
+
+
+def test_forbidden_codewords_become_prefixes():
+    count_dict = {"a": 10, "b": 5, "c": 1}
+    forbidden = {("x",), ("y", "x")}
+
+    encoding_map = build_constrained_encoding_map(
+        count_dict, ["x", "y"], is_forbidden=forbidden.__contains__
+    )
+
+    assert sorted(target for target, _ in encoding_map.values()) == [
+        "a",
+        "b",
+        "c",
+    ]
+    assert not set(encoding_map) & forbidden
+    assert is_prefix_free(list(encoding_map))
+    assert any(path[:1] == ("x",) for path in encoding_map)
+
+
+def test_forbidden_prefixes_are_skipped():
+    count_dict = {"a": 10, "b": 5, "c": 1}
+
+    encoding_map = build_constrained_encoding_map(
+        count_dict,
+        ["x", "y", "z"],
+        is_forbidden_prefix=lambda path: path[0] == "x",
+    )
+
+    assert len(encoding_map) == 3
+    assert all(path[0] != "x" for path in encoding_map)
+    assert is_prefix_free(list(encoding_map))
+
+
+def test_forbidden_prefixes_are_never_extended():
+    symbols = ["j", "f", "k", "d"]
+    forbidden = {("j",), ("f", "k"), ("d", "d", "j")}
+
+    def is_forbidden_prefix(path):
+        return path in forbidden
+
+    for seed in range(30):
+        rng = random.Random(seed)
+        count_dict = {
+            f"t{i}": rng.randint(1, 1000) for i in range(rng.randint(2, 60))
+        }
+        is_forbidden = {
+            tuple(rng.choice(symbols) for _ in range(rng.randint(1, 3)))
+            for _ in range(10)
+        }.__contains__
+
+        encoding_map = build_constrained_encoding_map(
+            count_dict,
+            symbols,
+            is_forbidden=is_forbidden,
+            is_forbidden_prefix=is_forbidden_prefix,
+        )
+
+        assert is_prefix_free(list(encoding_map))
+        for path in encoding_map:
+            assert not any(path[: len(p)] == p for p in forbidden), path
+
+
+def test_max_lengths_drop_targets_and_shorten_others():
+    count_dict = {"a": 8, "b": 4, "c": 2, "d": 1}
+
+    encoding_map = build_constrained_encoding_map(
+        count_dict, ["x", "y"], max_lengths={"c": 1, "d": 0}
+    )
+
+    # c cannot get a one-symbol code and d no code at all, so a and b
+    # share the two one-symbol codes
+    assert encoding_map == {("x",): ("a", 8), ("y",): ("b", 4)}
+
+
+def test_respects_all_constraints_randomly():
+    rng = random.Random(1)
+    symbols = ["j", "f", "k", "d"]
+    for _ in range(50):
+        count_dict = {
+            f"t{i}": rng.randint(1, 1000) for i in range(rng.randint(1, 60))
+        }
+        max_lengths = {target: rng.randint(0, 4) for target in count_dict}
+        forbidden = {
+            tuple(rng.choice(symbols) for _ in range(rng.randint(1, 3)))
+            for _ in range(10)
+        }
+
+        encoding_map = build_constrained_encoding_map(
+            count_dict,
+            symbols,
+            max_lengths=max_lengths,
+            is_forbidden=forbidden.__contains__,
+        )
+
+        assert is_prefix_free(list(encoding_map))
+        for path, (target, count) in encoding_map.items():
+            assert path not in forbidden
+            assert 1 <= len(path) <= max_lengths[target]
+            assert count == count_dict[target]
+
+
+def test_rejects_bad_symbols():
+    with pytest.raises(ValueError):
+        build_constrained_encoding_map({"a": 1}, ["x"])
+    with pytest.raises(ValueError):
+        build_constrained_encoding_map({"a": 1}, ["x", "x"])
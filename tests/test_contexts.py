@@ -0,0 +1,144 @@
+import random
+
+import pytest
+
+from huffman_arpeggio.contexts import (
+    INVALID,
+    ContextDecoder,
+    build_context_forest,
+)
+from huffman_arpeggio.core import (
+    build_huffman_tree,
+    generate_encoding_map_with_count,
+)
+
+SYMBOLS = ["△", "○", "□", "✕"]
+
+
+def random_context_counts(num_contexts, seed=0):
+    rng = random.Random(seed)
+    return {
+        f"context-{i}": {
+            f"target-{rng.randint(0, 100)}": rng.randint(1, 1000)
+            for _ in range(rng.randint(1, 30))
+        }
+        for i in range(num_contexts)
+    }
+
+
+def cost(encoding_map):
+    return sum(len(path) * count for path, (_, count) in encoding_map.items())
+
+
+@pytest.mark.parametrize("num_symbols", [2, 3, 4, 6])
+def test_context_trees_are_optimal(num_symbols):
+    symbols = [f"s{i}" for i in range(num_symbols)]
+    context_counts = random_context_counts(50)
+
+    forest = build_context_forest(context_counts, symbols, workers=1)
+
+    assert len(forest) == 50
+    for context, count_dict in context_counts.items():
+        encoding_map = forest.encoding_map(context)
+        assert sorted(target for target, _ in encoding_map.values()) == sorted(
+            count_dict
+        )
+        for target, count in encoding_map.values():
+            assert count == count_dict[target]
+        if len(count_dict) > 1:
+            root = build_huffman_tree(count_dict, symbols)
+            reference = generate_encoding_map_with_count(
+                root, symbols, count_dict
+            )
+            assert cost(encoding_map) == cost(reference)
+
+
+def test_decoder_switches_contexts():
+    context_counts = random_context_counts(20)
+    forest = build_context_forest(context_counts, SYMBOLS, workers=1)
+
+    decoder = ContextDecoder(forest, "context-0")
+    for context in context_counts:
+        decoder.switch(context)
+        for path, (target, _) in forest.encoding_map(context).items():
+            outputs = [decoder.feed(symbol) for symbol in path]
+            assert outputs == [None] * (len(path) - 1) + [target]
+
+
+def test_switch_discards_partial_code():
+    context_counts = {
+        "a": {"x": 1, "y": 1, "z": 1, "w": 1, "v": 1},
+        "b": {"x": 5, "y": 3},
+    }
+    forest = build_context_forest(context_counts, SYMBOLS, workers=1)
+    decoder = ContextDecoder(forest, "a")
+    long_path = max(forest.encoding_map("a"), key=len)
+    assert decoder.feed(long_path[0]) is None
+
+    decoder.switch("b")
+
+    assert decoder.context == "b"
+    for path, (target, _) in forest.encoding_map("b").items():
+        assert decoder.feed(path[0]) == target
+
+    decoder.switch("a")
+    assert decoder.feed(long_path[0]) is None
+    decoder.reset()
+    assert decoder.feed(long_path[0]) is None
+
+
+def test_single_target_context():
+    forest = build_context_forest({"only": {"x": 3}}, SYMBOLS, workers=1)
+
+    assert forest.encoding_map("only") == {(SYMBOLS[0],): ("x", 3)}
+    assert forest.num_states == 1
+
+
+def test_invalid_press():
+    forest = build_context_forest({"a": {"x": 5, "y": 3}}, SYMBOLS, workers=1)
+    decoder = ContextDecoder(forest, "a")
+    unused = set(SYMBOLS) - {path[0] for path in forest.encoding_map("a")}
+    assert INVALID in forest.table
+
+    with pytest.raises(ValueError):
+        decoder.feed(unused.pop())
+    assert decoder.feed(SYMBOLS[0]) in {"x", "y"}
+
+
+def test_targets_are_shared():
+    forest = build_context_forest(
+        {"a": {"x": 5, "y": 3}, "b": {"y": 2, "x": 1}}, SYMBOLS, workers=1
+    )
+
+    assert sorted(forest.targets) == ["x", "y"]
+    assert len(forest.code_targets) == 4
+
+
+def test_unknown_context():
+    forest = build_context_forest({"a": {"x": 1}}, SYMBOLS, workers=1)
+
+    with pytest.raises(KeyError):
+        ContextDecoder(forest, "b")
+
+
+def test_invalid_input():
+    with pytest.raises(ValueError):
+        build_context_forest({"a": {}}, SYMBOLS)
+    with pytest.raises(ValueError):
+        build_context_forest({"a": {"x": 1}}, ["△"])
+    with pytest.raises(ValueError):
+        build_context_forest({"a": {"x": 1}}, ["△", "△"])
+    with pytest.raises(ValueError):
+        build_context_forest({"a": {"x": 1}}, SYMBOLS, workers=0)
+
+
+def test_workers_match_serial(monkeypatch):
+    monkeypatch.setattr("huffman_arpeggio.contexts.MIN_CHUNK_CODES", 100)
+    context_counts = random_context_counts(200)
+
+    serial = build_context_forest(context_counts, SYMBOLS, workers=1)
+    parallel = build_context_forest(context_counts, SYMBOLS, workers=2)
+
+    assert parallel.table == serial.table
+    assert parallel.roots == serial.roots
+    assert parallel.code_targets == serial.code_targets
@@ -3,8 +3,11 @@ from huffman_arpeggio.core import (
     Node,
     calculate_padding,
     merge_nodes,
+    merge_nodes_two_queue,
     build_huffman_tree,
     generate_encoding_map_with_count,
+    huffman_code_lengths,
+    iter_encoding_map,
 )
 
 
@@ -20,6 +23,37 @@ def test_merge_nodes():
     assert len(root.children) == 2
 
 
+def test_merge_nodes_two_queue():
+    nodes = [Node(10, "C"), Node(7, "B"), Node(5, "A")]
+    root = merge_nodes_two_queue(nodes, 2)
+    assert root.count == 22
+    assert [child.count for child in root.children] == [10, 12]
+    assert [child.count for child in root.children[1].children] == [5, 7]
+
+
+def test_build_huffman_tree_two_queue_matches_heap():
+    count_dict = {chr(65 + i): (i * 7919) % 101 + 1 for i in range(26)}
+    symbols = ["X", "O", "□"]
+    heap_map = generate_encoding_map_with_count(
+        build_huffman_tree(count_dict, symbols), symbols, count_dict
+    )
+    two_queue_map = generate_encoding_map_with_count(
+        build_huffman_tree(count_dict, symbols, engine="two_queue"),
+        symbols,
+        count_dict,
+    )
+
+    def code_lengths(encoding_map):
+        return {
+            target: len(path) for path, (target, _) in encoding_map.items()
+        }
+
+    assert code_lengths(two_queue_map) == code_lengths(heap_map)
+
+    with pytest.raises(ValueError):
+        build_huffman_tree(count_dict, symbols, engine="bogus")
+
+
 def test_build_huffman_tree():
     count_dict = {"A": 5, "B": 7, "C": 10}
     symbols = ["X", "O"]
@@ -48,3 +82,34 @@ def test_generate_encoding_map_with_count():
     assert encoding_map[("O",)] == ("C", 10)
     assert encoding_map[("X", "O")] == ("A", 5)
     assert encoding_map[("X", "X")] == ("B", 7)
+
+
+def test_generate_encoding_map_with_count_deep_tree():
+    # Doubling counts produce a maximally skewed (caterpillar) binary tree
+    # that is deeper than the default recursion limit
+    count_dict = {f"t{i}": 2**i for i in range(1500)}
+    symbols = ["X", "O"]
+    root = build_huffman_tree(count_dict, symbols, engine="two_queue")
+    encoding_map = generate_encoding_map_with_count(root, symbols, count_dict)
+
+    assert len(encoding_map) == len(count_dict)
+    assert encoding_map[("X",)] == ("t1499", 2**1499)
+    assert max(len(path) for path in encoding_map) == 1499
+
+
+def test_iter_encoding_map():
+    count_dict = {"A": 5, "B": 7, "C": 10}
+    symbols = ["X", "O"]
+    root = build_huffman_tree(count_dict, symbols)
+
+    assert list(iter_encoding_map(root, symbols, count_dict)) == [
+        (("O",), "C", 10),
+        (("X", "O"), "A", 5),
+        (("X", "X"), "B", 7),
+    ]
+
+
+def test_huffman_code_lengths():
+    assert huffman_code_lengths([5, 7, 10], 2) == [2, 2, 1]
+    assert huffman_code_lengths([5, 7, 10, 1], 3) == [2, 1, 1, 2]
+    assert huffman_code_lengths([3], 2) == [0]
@@ -0,0 +1,57 @@
+from collections import Counter
+
+import pytest
+from huffman_arpeggio.core import build_huffman_tree
+from huffman_arpeggio.corpus import (
+    chunk_boundaries,
+    count_corpus,
+    count_text,
+)
+
+TEXT = "naïve café\nnaïve 日本語 text\r\n\ncafé café\n"
+
+
+@pytest.mark.parametrize("unit", ["char", "line", "word"])
+def test_chunk_boundaries_do_not_split_units(unit):
+    data = TEXT.encode("utf-8")
+    chunks = chunk_boundaries(data, 16, unit)
+
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(data)
+    total = Counter()
+    for start, end in chunks:
+        total.update(count_text(data[start:end].decode("utf-8"), unit))
+    assert total == count_text(TEXT, unit)
+
+
+def test_count_text():
+    assert count_text(TEXT, "line") == Counter(
+        {"naïve café": 1, "naïve 日本語 text": 1, "café café": 1}
+    )
+    assert count_text(TEXT, "word")["café"] == 3
+    assert count_text(TEXT, "char") == Counter(TEXT)
+
+
+def test_count_corpus(tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"corpus{i}.txt"
+        path.write_bytes(TEXT.encode("utf-8"))
+        paths.append(str(path))
+    (tmp_path / "empty.txt").write_bytes(b"")
+    paths.append(str(tmp_path / "empty.txt"))
+
+    count_dict = count_corpus(paths, "word", workers=2)
+    assert count_dict == dict(Counter(TEXT.split() * 3))
+    assert list(count_dict)[0] == "café"
+    assert count_corpus(paths, "word", workers=1) == count_dict
+    assert build_huffman_tree(count_dict, ["X", "O"]).count == sum(
+        count_dict.values()
+    )
+
+
+def test_count_corpus_invalid_input(tmp_path):
+    with pytest.raises(ValueError):
+        count_corpus([], unit="sentence")
+    with pytest.raises(ValueError):
+        count_corpus([], workers=0)
+    assert count_corpus([]) == {}
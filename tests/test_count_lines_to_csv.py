@@ -0,0 +1,32 @@
+import io
+import sys
+
+import pytest
+
+import bin.count_lines_to_csv as count_lines_to_csv
+
+
+def run(monkeypatch, capsys, *args):
+    monkeypatch.setattr(sys, "argv", ["count-lines-to-csv", *args])
+    monkeypatch.setattr(sys, "stdin", io.StringIO("ls\ngit status\nls\n"))
+    count_lines_to_csv.main()
+    return capsys.readouterr().out.splitlines()
+
+
+def test_counts_lines(monkeypatch, capsys):
+    assert run(monkeypatch, capsys) == ["target,count", "ls,2", "git status,1"]
+    assert run(monkeypatch, capsys, "--top-k=2", "--chunk-size=4") == [
+        "target,count,error",
+        "ls,2,0",
+        "git status,1,0",
+    ]
+
+
+@pytest.mark.parametrize(
+    "args",
+    [["--top-k", "100"], ["--topk=100"], ["--top-k=many"], ["lines.txt"]],
+)
+def test_rejects_bad_arguments(monkeypatch, capsys, args):
+    with pytest.raises(SystemExit) as error:
+        run(monkeypatch, capsys, *args)
+    assert error.value.code != 0
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import socket
+
+import pytest
+
+import bin.arpeggio_daemon as arpeggio_daemon
+from huffman_arpeggio.daemon import DecoderServer, remove_stale_socket
+from huffman_arpeggio.layout_file import dump_layout
+
+SYMBOLS = ["X", "O"]
+FIRST = {("X",): ("A", 5), ("O", "X"): ("B", 2), ("O", "O"): ("C", 1)}
+SECOND = {("O",): ("C", 9), ("X", "O"): ("A", 2), ("X", "X"): ("B", 1)}
+
+
+async def request(reader, writer, line):
+    writer.write(line.encode() + b"\n")
+    return (await reader.readline()).decode().rstrip("\n")
+
+
+def run_session(tmp_path, session):
+    layout_path = str(tmp_path / "layout.harp")
+    socket_path = str(tmp_path / "daemon.sock")
+    dump_layout(FIRST, SYMBOLS, layout_path)
+    server = DecoderServer(layout_path)
+
+    async def main():
+        task = asyncio.create_task(server.serve(socket_path))
+        while not (tmp_path / "daemon.sock").exists():
+            await asyncio.sleep(0.001)
+        try:
+            return await session(socket_path, layout_path)
+        finally:
+            task.cancel()
+
+    return asyncio.run(main())
+
+
+def test_decodes_per_client(tmp_path):
+    async def session(socket_path, layout_path):
+        first = await asyncio.open_unix_connection(socket_path)
+        second = await asyncio.open_unix_connection(socket_path)
+        responses = [
+            await request(*first, "press O"),
+            await request(*second, "press X"),
+            await request(*first, "press X"),
+            await request(*first, "press Z"),
+            await request(*first, "press O"),
+            await request(*first, "reset"),
+            await request(*first, "press X"),
+            await request(*first, "frobnicate"),
+            await request(*first, "layout"),
+        ]
+        for _, writer in (first, second):
+            writer.close()
+        return responses
+
+    assert run_session(tmp_path, session) == [
+        "wait",
+        "emit A",
+        "emit B",
+        "error unknown symbol Z",
+        "wait",
+        "ok",
+        "emit A",
+        "error unknown command frobnicate",
+        "ok 1 3",
+    ]
+
+
+def test_bad_requests_are_answered(tmp_path):
+    async def session(socket_path, layout_path):
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        writer.write(b"press \xff\n")
+        writer.write(b"press " + b"X" * (1 << 17) + b"\n")
+        responses = [
+            (await reader.readline()).decode().rstrip("\n"),
+            (await reader.readline()).decode().rstrip("\n"),
+            await request(reader, writer, "press X"),
+        ]
+        writer.close()
+        return responses
+
+    assert run_session(tmp_path, session) == [
+        "error unknown symbol \ufffd",
+        "error line too long",
+        "emit A",
+    ]
+
+
+def test_reload_keeps_connections(tmp_path):
+    async def session(socket_path, layout_path):
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        responses = [await request(reader, writer, "press O")]
+        dump_layout(SECOND, SYMBOLS, layout_path)
+        responses.append(await request(reader, writer, "reload"))
+        # The partial code from the old layout is discarded
+        responses.append(await request(reader, writer, "press O"))
+        responses.append(await request(reader, writer, "press X"))
+        responses.append(await request(reader, writer, "press O"))
+        writer.close()
+        return responses
+
+    assert run_session(tmp_path, session) == [
+        "wait",
+        "ok 2",
+        "emit C",
+        "wait",
+        "emit A",
+    ]
+
+
+def test_failed_reload_keeps_layout(tmp_path):
+    async def session(socket_path, layout_path):
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        with open(layout_path + ".new", "wb") as f:
+            f.write(b"garbage")
+        os.replace(layout_path + ".new", layout_path)
+        responses = [
+            await request(reader, writer, "reload"),
+            await request(reader, writer, "press X"),
+        ]
+        writer.close()
+        return responses
+
+    assert run_session(tmp_path, session) == [
+        "error could not load layout",
+        "emit A",
+    ]
+
+
+def test_removes_only_its_own_socket(tmp_path):
+    async def session(socket_path, layout_path):
+        # A second daemon must not take over a live socket
+        with pytest.raises(ValueError):
+            remove_stale_socket(socket_path)
+        return os.path.exists(socket_path)
+
+    assert run_session(tmp_path, session)
+    assert not (tmp_path / "daemon.sock").exists()
+
+
+def test_remove_stale_socket(tmp_path):
+    socket_path = str(tmp_path / "stale.sock")
+    remove_stale_socket(socket_path)
+
+    # A socket that nothing listens on anymore
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(socket_path)
+    remove_stale_socket(socket_path)
+    assert not os.path.exists(socket_path)
+
+    (tmp_path / "notes.txt").write_text("keep me")
+    with pytest.raises(ValueError):
+        remove_stale_socket(str(tmp_path / "notes.txt"))
+    assert (tmp_path / "notes.txt").read_text() == "keep me"
+
+
+def test_default_socket_path_is_private(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path / "run"))
+    assert arpeggio_daemon.default_socket_path() == str(
+        tmp_path / "run" / "huffman-arpeggio.sock"
+    )
+
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    monkeypatch.setattr(arpeggio_daemon.tempfile, "tempdir", str(tmp_path))
+    socket_path = arpeggio_daemon.default_socket_path()
+    directory = os.path.dirname(socket_path)
+    assert os.path.dirname(directory) == str(tmp_path)
+    assert os.stat(directory).st_mode & 0o777 == 0o700
+
+    # A directory that others can enter, e.g. made by another user first
+    os.chmod(directory, 0o755)
+    with pytest.raises(ValueError):
+        arpeggio_daemon.default_socket_path()
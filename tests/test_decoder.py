@@ -0,0 +1,87 @@
+import random
+
+import numpy as np
+import pytest
+from huffman_arpeggio.compact import build_compact_tree
+from huffman_arpeggio.core import (
+    build_huffman_tree,
+    generate_encoding_map_with_count,
+)
+from huffman_arpeggio.decoder import Decoder
+
+
+def test_decoder_feed():
+    encoding_map = {
+        ("X",): ("A", 5),
+        ("O", "X"): ("B", 2),
+        ("O", "O"): ("C", 1),
+    }
+    decoder = Decoder.from_encoding_map(encoding_map, ["X", "O"])
+
+    assert decoder.num_states == 2
+    assert decoder.feed("X") == "A"
+    assert decoder.feed("O") is None
+    assert decoder.feed("O") == "C"
+    assert decoder.feed("O") is None
+    assert decoder.feed("X") == "B"
+
+
+def test_decoder_invalid_press():
+    encoding_map = {("X",): ("A", 5), ("O", "X"): ("B", 2)}
+    decoder = Decoder.from_encoding_map(encoding_map, ["X", "O", "□"])
+
+    decoder.feed("O")
+    with pytest.raises(ValueError):
+        decoder.feed("□")
+    # The partial code is discarded
+    assert decoder.feed("X") == "A"
+
+    with pytest.raises(ValueError):
+        decoder.decode_batch([1, 0, 2, 0])
+    with pytest.raises(ValueError):
+        decoder.decode_batch([3])
+
+
+def test_decoder_rejects_bad_codes():
+    with pytest.raises(ValueError):
+        Decoder.from_encoding_map(
+            {("X",): ("A", 1), ("X", "O"): ("B", 1)}, ["X", "O"]
+        )
+    with pytest.raises(ValueError):
+        Decoder.from_encoding_map({(): ("A", 1)}, ["X", "O"])
+    with pytest.raises(ValueError):
+        Decoder.from_encoding_map({("Y",): ("A", 1)}, ["X", "O"])
+
+
+def test_decode_batch_matches_feed():
+    rng = random.Random(0)
+    symbols = ["j", "f", "k", "d"]
+    count_dict = {f"t{i}": rng.randint(1, 100) for i in range(50)}
+    root = build_huffman_tree(count_dict, symbols)
+    encoding_map = generate_encoding_map_with_count(root, symbols, count_dict)
+    codes = {target: path for path, (target, _) in encoding_map.items()}
+
+    typed = [rng.choice(list(count_dict)) for _ in range(1000)]
+    presses = [symbols.index(s) for target in typed for s in codes[target]]
+
+    decoder = Decoder.from_tree(root, symbols, count_dict)
+    fed = [decoder.feed_index(press) for press in presses]
+    assert [target for target in fed if target is not None] == typed
+
+    ids = decoder.decode_batch(np.array(presses))
+    assert [decoder.targets[i] for i in ids] == typed
+
+    # A trailing incomplete code is ignored
+    partial = next(path for path in encoding_map if len(path) > 1)
+    ids = decoder.decode_batch(presses + [symbols.index(partial[0])])
+    assert [decoder.targets[i] for i in ids] == typed
+    assert len(decoder.decode_batch([])) == 0
+
+
+def test_decoder_from_compact_tree():
+    count_dict = {"A": 5, "B": 2, "C": 1, "D": 1}
+    symbols = ["X", "O", "□"]
+    decoder = Decoder.from_tree(
+        build_compact_tree(count_dict, symbols), symbols, count_dict
+    )
+    assert decoder.feed("X") == "A"
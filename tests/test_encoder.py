@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from huffman_arpeggio.core import (
+    build_huffman_tree,
+    generate_encoding_map_with_count,
+)
+from huffman_arpeggio.decoder import Decoder
+from huffman_arpeggio.encoder import Encoder, keyswitch_char_targets
+from huffman_arpeggio.utils import load_count_dict
+
+
+@pytest.fixture
+def playstation():
+    count_dict = load_count_dict(
+        "tests/data/playstation-qwerty-wikipedia-example-input.csv",
+        "keyswitch",
+        "count",
+    )
+    symbols = ["X", "O", "□", "△"]
+    root = build_huffman_tree(count_dict, symbols)
+    encoding_map = generate_encoding_map_with_count(root, symbols, count_dict)
+    return encoding_map, symbols
+
+
+def test_keyswitch_char_targets():
+    char_targets = keyswitch_char_targets(["Shift", "Space", "E", ".", "1"])
+    assert char_targets == {
+        " ": ("Space",),
+        "e": ("E",),
+        "E": ("Shift", "E"),
+        ".": (".",),
+        "1": ("1",),
+    }
+    assert keyswitch_char_targets(["E"]) == {"E": ("E",)}
+
+
+def test_encoder_round_trip(playstation):
+    encoding_map, symbols = playstation
+    codes = {target: path for path, (target, _) in encoding_map.items()}
+    encoder = Encoder(encoding_map, symbols)
+
+    text = "Hello, World.\n"
+    presses = encoder.encode(text)
+    targets = [
+        "Shift", "H", "E", "L", "L", "O", ",", "Space",
+        "Shift", "W", "O", "R", "L", "D", ".", "Enter",
+    ]  # fmt: skip
+    expected = [symbols.index(s) for target in targets for s in codes[target]]
+    assert presses.tolist() == expected
+    assert presses.dtype == np.uint8
+    assert encoder.press_count(text) == len(expected)
+    assert encoder.encode_targets(targets).tolist() == expected
+
+    decoder = Decoder.from_encoding_map(encoding_map, symbols)
+    assert [decoder.targets[i] for i in decoder.decode_batch(presses)] == (
+        targets
+    )
+
+
+def test_encoder_unknown_characters(playstation):
+    encoding_map, symbols = playstation
+    encoder = Encoder(encoding_map, symbols)
+
+    with pytest.raises(ValueError):
+        encoder.encode("naïve")
+    assert encoder.encode("naïve", errors="ignore").tolist() == (
+        encoder.encode("nave").tolist()
+    )
+    assert len(encoder.encode("")) == 0
+    with pytest.raises(ValueError):
+        Encoder(encoding_map, symbols, {"é": ("É",)})
+
+
+def test_encoder_encode_file(playstation, tmp_path):
+    encoding_map, symbols = playstation
+    encoder = Encoder(encoding_map, symbols)
+    text = "The quick brown fox jumps over the lazy dog.\n" * 10
+    path = tmp_path / "text.txt"
+    path.write_text(text)
+
+    presses = encoder.encode_file(str(path), chunk_size=7)
+    assert presses.tolist() == encoder.encode(text).tolist()
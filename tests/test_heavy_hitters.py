@@ -0,0 +1,36 @@
+import random
+from collections import Counter
+
+import pytest
+from huffman_arpeggio.heavy_hitters import SpaceSaving
+
+
+def test_space_saving_exact_under_capacity():
+    summary = SpaceSaving(10)
+    summary.update_all(["a", "b", "a", "c", "a", "b"])
+    assert summary.top() == [("a", 3, 0), ("b", 2, 0), ("c", 1, 0)]
+    assert summary.top(1) == [("a", 3, 0)]
+
+
+def test_space_saving_error_bounds():
+    rng = random.Random(0)
+    items = [f"cmd{int(rng.paretovariate(1.2))}" for _ in range(20000)]
+    true_counts = Counter(items)
+    capacity = 50
+
+    summary = SpaceSaving(capacity)
+    summary.update_all(items)
+
+    assert len(summary) == capacity
+    for item, count, error in summary.top():
+        assert count - error <= true_counts[item] <= count
+        assert error <= len(items) / capacity
+    # Frequent items are guaranteed to be monitored
+    for item, count in true_counts.items():
+        if count > len(items) / capacity:
+            assert item in summary.counts
+
+
+def test_space_saving_invalid_capacity():
+    with pytest.raises(ValueError):
+        SpaceSaving(0)
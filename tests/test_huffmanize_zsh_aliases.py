@@ -0,0 +1,76 @@
+import os
+import subprocess
+
+import bin.huffmanize_zsh_aliases as huffmanize
+
+
+def test_load_shell_names_uses_cache(tmp_path, monkeypatch):
+    cache_path = str(tmp_path / "cache" / "zsh-names.json")
+    dumps = []
+
+    def dump_shell_names():
+        dumps.append(1)
+        return {"ls", "git", "jj"}
+
+    monkeypatch.setattr(huffmanize, "dump_shell_names", dump_shell_names)
+    path_dir = tmp_path / "bin"
+    path_dir.mkdir()
+    monkeypatch.setenv("PATH", str(path_dir))
+
+    assert huffmanize.load_shell_names(cache_path) == {"ls", "git", "jj"}
+    assert huffmanize.load_shell_names(cache_path) == {"ls", "git", "jj"}
+    assert len(dumps) == 1
+
+    # Installing a command invalidates the cache
+    (path_dir / "fj").write_text("")
+    huffmanize.load_shell_names(cache_path)
+    assert len(dumps) == 2
+
+
+def test_load_shell_names_when_zsh_fails(tmp_path, monkeypatch):
+    cache_path = str(tmp_path / "cache" / "zsh-names.json")
+    results = [
+        subprocess.CompletedProcess([], 1, stdout="", stderr="bad zshrc"),
+        subprocess.CompletedProcess([], 0, stdout="\n", stderr=""),
+    ]
+
+    def run(*args, **kwargs):
+        if not results:
+            raise FileNotFoundError("zsh")
+        return results.pop(0)
+
+    monkeypatch.setattr(huffmanize.subprocess, "run", run)
+
+    for _ in range(3):
+        assert huffmanize.load_shell_names(cache_path) is None
+        assert not os.path.exists(cache_path)
+    # Aliases cannot be checked, so they all count as conflicts
+    monkeypatch.setattr(huffmanize, "get_shell_names", lambda: None)
+    assert huffmanize.is_alias_conflict("jf")
+
+
+def test_is_alias_conflict():
+    assert huffmanize.is_alias_conflict("ls", {"ls", "git"})
+    assert not huffmanize.is_alias_conflict("jf", {"ls", "git"})
+
+
+def test_filter_commands_with_conflicts():
+    count_dict = {
+        "git status": 50,
+        "docker compose up": 30,
+        "kubectl get pods": 20,
+    }
+    alphabet = ["j", "f", "k", "d", "l", "s"]
+    shell_names = {"j"}
+
+    encoding_map = huffmanize.filter_commands(
+        count_dict,
+        alphabet,
+        lambda alias: huffmanize.is_alias_conflict(alias, shell_names),
+    )
+
+    aliases = {
+        "".join(path): target for path, (target, _) in encoding_map.items()
+    }
+    assert sorted(aliases.values()) == sorted(count_dict)
+    assert not set(aliases) & shell_names
@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ["pandas", "numpy", "graphviz"]
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "bin.count_lines_to_csv",
+        "bin.huffmanize_zsh_aliases",
+        "bin.local_harps",
+        "huffman_arpeggio.utils",
+        "huffman_arpeggio.layout_file",
+        "huffman_arpeggio.visualization",
+    ],
+)
+def test_startup_modules_do_not_import_heavy_dependencies(module):
+    # A fresh interpreter, since this one has imported everything already
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys, {module}; "
+            f"print(' '.join(m for m in {HEAVY_MODULES} if m in sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.split() == []
@@ -0,0 +1,94 @@
+import os
+
+import pytest
+
+from huffman_arpeggio.layout_cache import (
+    LayoutCache,
+    build_encoding_map,
+    cached_layout,
+    layout_key,
+)
+
+COUNT_DICT = {"a": 10, "b": 6, "c": 3, "d": 1}
+SYMBOLS = ["x", "y"]
+
+
+def test_layout_key_depends_on_inputs():
+    key = layout_key(COUNT_DICT, SYMBOLS, engine="heap")
+
+    assert key == layout_key(dict(COUNT_DICT), list(SYMBOLS), engine="heap")
+    assert key != layout_key({**COUNT_DICT, "d": 2}, SYMBOLS, engine="heap")
+    assert key != layout_key(COUNT_DICT, ["y", "x"], engine="heap")
+    assert key != layout_key(COUNT_DICT, SYMBOLS, engine="two_queue")
+
+
+def test_get_and_put_round_trip(tmp_path):
+    cache = LayoutCache(str(tmp_path))
+    encoding_map = build_encoding_map(COUNT_DICT, SYMBOLS)
+
+    assert cache.get("key") is None
+    cache.put("key", encoding_map)
+
+    assert cache.get("key") == encoding_map
+    assert list(cache.get("key")) == list(encoding_map)
+    assert [name for name in os.listdir(tmp_path)] == ["key.layout"]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"not a layout",
+        b"\xff\xfe",
+        b'{"rows": []}',
+        b'[[["x"], "a"]]',
+        b'[["x", "a", 10]]',
+        b"[1, 2]",
+        b'[[[1], "a", 10]]',
+        # A pickle, as written by older versions, is never unpickled
+        b"cos\nsystem\n(S'exit 1'\ntR.",
+    ],
+)
+def test_corrupt_entry_is_a_miss(tmp_path, data):
+    (tmp_path / "key.layout").write_bytes(data)
+
+    assert LayoutCache(str(tmp_path)).get("key") is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    encoding_map = build_encoding_map(COUNT_DICT, SYMBOLS)
+    cache = LayoutCache(str(tmp_path))
+    cache.put("old", encoding_map)
+    cache.put("used", encoding_map)
+    size = os.path.getsize(tmp_path / "old.layout")
+    os.utime(tmp_path / "old.layout", ns=(0, 0))
+    os.utime(tmp_path / "used.layout", ns=(1, 1))
+    cache.get("used")
+
+    cache.max_bytes = 2 * size
+    cache.put("new", encoding_map)
+
+    assert sorted(os.listdir(tmp_path)) == ["new.layout", "used.layout"]
+
+
+def test_cached_layout_computes_once(tmp_path):
+    calls = []
+
+    def build(count_dict, symbols, **options):
+        calls.append(options)
+        return build_encoding_map(count_dict, symbols, **options)
+
+    cached_build = cached_layout(LayoutCache(str(tmp_path)))(build)
+    first = cached_build(COUNT_DICT, SYMBOLS, max_length=3)
+    second = cached_build(COUNT_DICT, SYMBOLS, max_length=3)
+    cached_build(COUNT_DICT, SYMBOLS)
+
+    assert (
+        first
+        == second
+        == build_encoding_map(COUNT_DICT, SYMBOLS, max_length=3)
+    )
+    assert calls == [{"max_length": 3}, {}]
+
+
+def test_cached_layout_without_cache_is_identity():
+    assert cached_layout(None)(build_encoding_map) is build_encoding_map
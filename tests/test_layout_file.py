@@ -0,0 +1,88 @@
+import os
+
+import numpy as np
+import pytest
+
+from huffman_arpeggio.core import (
+    build_huffman_tree,
+    generate_encoding_map_with_count,
+)
+from huffman_arpeggio.decoder import Decoder
+from huffman_arpeggio.layout_file import (
+    LayoutFile,
+    csv_to_layout,
+    dump_layout,
+    layout_to_csv,
+    load_layout,
+)
+from huffman_arpeggio.utils import (
+    load_count_dict,
+    save_encoding_map_with_count,
+)
+
+INPUT_CSV = "tests/data/playstation-qwerty-wikipedia-example-input.csv"
+SYMBOLS = ["△", "○", "□", "✕"]
+
+
+@pytest.fixture
+def encoding_map():
+    count_dict = load_count_dict(INPUT_CSV, "keyswitch", "count")
+    root = build_huffman_tree(count_dict, SYMBOLS)
+    return generate_encoding_map_with_count(root, SYMBOLS, count_dict)
+
+
+def test_round_trip(tmp_path, encoding_map):
+    path = str(tmp_path / "layout.harp")
+    dump_layout(encoding_map, SYMBOLS, path)
+
+    layout = LayoutFile(path)
+
+    assert list(layout.symbols) == SYMBOLS
+    assert layout.encoding_map() == encoding_map
+    assert list(layout.encoding_map()) == list(encoding_map)
+
+
+def test_load_layout_decodes_like_compiled_decoder(tmp_path, encoding_map):
+    path = str(tmp_path / "layout.harp")
+    dump_layout(encoding_map, SYMBOLS, path)
+
+    decoder = load_layout(path)
+    expected = Decoder.from_encoding_map(encoding_map, SYMBOLS)
+
+    assert list(decoder.table) == list(expected.table)
+    assert list(decoder.targets) == expected.targets
+    for path, (target, _) in encoding_map.items():
+        assert [decoder.feed(symbol) for symbol in path][-1] == target
+    presses = [
+        SYMBOLS.index(symbol) for path in encoding_map for symbol in path
+    ]
+    np.testing.assert_array_equal(
+        decoder.decode_batch(presses), np.arange(len(encoding_map))
+    )
+
+
+def test_csv_round_trip(tmp_path, encoding_map):
+    csv_path = str(tmp_path / "layout.csv")
+    layout_path = str(tmp_path / "layout.harp")
+    save_encoding_map_with_count(encoding_map, csv_path)
+
+    csv_to_layout(csv_path, layout_path, SYMBOLS)
+    layout_to_csv(layout_path, str(tmp_path / "again.csv"))
+
+    assert LayoutFile(layout_path).encoding_map() == encoding_map
+    with open(csv_path) as expected, open(tmp_path / "again.csv") as actual:
+        assert actual.read() == expected.read()
+
+
+def test_rejects_other_files(tmp_path, encoding_map):
+    path = tmp_path / "layout.harp"
+    path.write_bytes(b"not a layout file at all, just some bytes")
+    with pytest.raises(ValueError):
+        LayoutFile(str(path))
+
+    dump_layout(encoding_map, SYMBOLS, str(path))
+    data = path.read_bytes()
+    path.write_bytes(data[: len(data) // 2])
+    with pytest.raises(ValueError):
+        LayoutFile(str(path))
+    assert sorted(os.listdir(tmp_path)) == ["layout.harp"]
@@ -0,0 +1,76 @@
+import itertools
+
+import pytest
+from huffman_arpeggio.canonical import canonical_encoding_map
+from huffman_arpeggio.core import (
+    build_huffman_tree,
+    generate_encoding_map_with_count,
+    huffman_code_lengths,
+)
+from huffman_arpeggio.length_limited import package_merge_code_lengths
+
+
+def brute_force_cost(counts, num_branches, max_length):
+    return min(
+        sum(count * length for count, length in zip(counts, lengths))
+        for lengths in itertools.product(
+            range(1, max_length + 1), repeat=len(counts)
+        )
+        if sum(num_branches**-length for length in lengths) <= 1
+    )
+
+
+def test_package_merge_code_lengths():
+    counts = [1, 1, 2, 4, 8, 16, 32]
+    assert package_merge_code_lengths(counts, 2, 10).tolist() == (
+        huffman_code_lengths(counts, 2)
+    )
+    assert package_merge_code_lengths(counts, 2, 3).tolist() == [
+        3,
+        3,
+        3,
+        3,
+        3,
+        3,
+        2,
+    ]
+    assert package_merge_code_lengths([5], 2, 1).tolist() == [0]
+
+    with pytest.raises(ValueError):
+        package_merge_code_lengths(counts, 2, 2)
+
+
+@pytest.mark.parametrize(
+    "counts, num_branches, max_length",
+    [
+        ([9, 1, 1, 1, 1, 7], 2, 3),
+        ([3, 0, 5, 2, 8, 1], 3, 2),
+        ([10, 1, 1, 1, 1], 3, 2),
+        ([4, 4, 1, 2, 6, 9, 3], 4, 2),
+    ],
+)
+def test_package_merge_code_lengths_is_optimal(
+    counts, num_branches, max_length
+):
+    lengths = package_merge_code_lengths(counts, num_branches, max_length)
+    assert lengths.max() <= max_length
+    assert sum(num_branches ** -int(length) for length in lengths) <= 1
+    assert int((lengths * counts).sum()) == brute_force_cost(
+        counts, num_branches, max_length
+    )
+
+
+def test_build_huffman_tree_max_length():
+    count_dict = {chr(65 + i): 2**i for i in range(8)}
+    symbols = ["X", "O"]
+    root = build_huffman_tree(count_dict, symbols, max_length=4)
+    encoding_map = generate_encoding_map_with_count(root, symbols, count_dict)
+
+    assert root.count == sum(count_dict.values())
+    assert max(len(path) for path in encoding_map) == 4
+    assert encoding_map[("X",)] == ("H", 128)
+
+    canonical_map = canonical_encoding_map(count_dict, symbols, max_length=4)
+    assert {
+        target: len(path) for path, (target, _) in canonical_map.items()
+    } == {target: len(path) for path, (target, _) in encoding_map.items()}
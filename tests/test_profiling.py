@@ -0,0 +1,79 @@
+import io
+import json
+
+import pytest
+
+from huffman_arpeggio import profiling
+from huffman_arpeggio.core import build_huffman_tree
+
+
+@pytest.fixture(autouse=True)
+def clean_profile():
+    profiling.reset()
+    yield
+    profiling.disable()
+    profiling.reset()
+
+
+def test_disabled_records_nothing():
+    with profiling.stage("stage"):
+        profiling.count("counter")
+    build_huffman_tree({"A": 5, "B": 7, "C": 10}, ["X", "O"])
+
+    assert profiling.report() == {"stages": {}, "counters": {}}
+
+
+def test_records_stages_and_counters():
+    profiling.enable()
+    for _ in range(3):
+        with profiling.stage("stage"):
+            profiling.count("counter", 2)
+
+    profile = profiling.report()
+    assert profile["stages"]["stage"]["calls"] == 3
+    assert profile["stages"]["stage"]["seconds"] >= 0
+    assert profile["counters"] == {"counter": 6}
+
+
+def test_build_huffman_tree_counts_nodes_and_heap_operations():
+    profiling.enable()
+    build_huffman_tree({"A": 5, "B": 7, "C": 10, "D": 1}, ["X", "O", "□"])
+
+    profile = profiling.report()
+    # Four leaves, one padding node and two branch points
+    assert profile["counters"]["nodes_created"] == 7
+    assert profile["counters"]["heap_operations"] == 8
+    assert profile["stages"]["build_huffman_tree"]["calls"] == 1
+
+
+def test_dump_formats():
+    profiling.enable()
+    with profiling.stage("stage"):
+        profiling.count("counter")
+
+    text = io.StringIO()
+    profiling.dump("text", text)
+    assert "stage" in text.getvalue() and "counter" in text.getvalue()
+
+    output = io.StringIO()
+    profiling.dump("json", output)
+    assert json.loads(output.getvalue())["counters"] == {"counter": 1}
+
+    with pytest.raises(ValueError):
+        profiling.dump("xml", output)
+
+
+def test_parse_profile_option():
+    assert profiling.parse_profile_option(["cli"]) is None
+    assert profiling.parse_profile_option(["cli", "--profile"]) == "text"
+    assert profiling.parse_profile_option(["cli", "--profile=json"]) == "json"
+
+
+def test_profile_cli_dumps_to_stderr(capsys):
+    with profiling.profile_cli(["cli", "--profile=json"]):
+        profiling.count("counter")
+
+    profile = json.loads(capsys.readouterr().err)
+    assert profile["counters"] == {"counter": 1}
+    assert profile["stages"]["total"]["calls"] == 1
+    assert not profiling.is_enabled()
@@ -0,0 +1,189 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from huffman_arpeggio.core import (
+    Node,
+    build_huffman_tree,
+    generate_encoding_map_with_count,
+)
+from huffman_arpeggio.transitions import (
+    assign_min_cost,
+    best_assignments,
+    expected_transition_cost,
+    optimize_transitions,
+    transition_optimized_encoding_map,
+)
+
+# Alternating hands is cheap, the same finger twice is expensive
+SYMBOLS = ["j", "f", "k", "d"]
+HAND_COSTS = [
+    [3, 1, 2, 1],
+    [1, 3, 1, 2],
+    [2, 1, 3, 1],
+    [1, 2, 1, 3],
+]
+
+
+def all_relabelings(node):
+    if not node.children:
+        yield node
+        return
+    for order in itertools.permutations(node.children):
+        for children in itertools.product(
+            *[list(all_relabelings(child)) for child in order]
+        ):
+            yield Node(node.count, node.target, list(children))
+
+
+def random_case(rng, num_branches, num_targets, with_bigrams):
+    symbols = SYMBOLS[:num_branches]
+    count_dict = {f"t{i}": rng.randint(1, 50) for i in range(num_targets)}
+    costs = [
+        [rng.randint(0, 9) for _ in range(num_branches)]
+        for _ in range(num_branches)
+    ]
+    bigrams = None
+    if with_bigrams:
+        bigrams = {
+            (a, b): rng.randint(1, 20)
+            for a in count_dict
+            for b in count_dict
+            if rng.random() < 0.5
+        }
+    return symbols, count_dict, costs, bigrams
+
+
+def test_assign_min_cost():
+    rng = random.Random(0)
+    for _ in range(200):
+        num_rows = rng.randint(1, 5)
+        num_columns = rng.randint(num_rows, 6)
+        cost = [
+            [rng.randint(0, 20) for _ in range(num_columns)]
+            for _ in range(num_rows)
+        ]
+
+        assignment = assign_min_cost(cost)
+
+        assert len(set(assignment)) == num_rows
+        assert sum(cost[i][j] for i, j in enumerate(assignment)) == min(
+            sum(cost[i][j] for i, j in enumerate(columns))
+            for columns in itertools.permutations(range(num_columns), num_rows)
+        )
+
+    with pytest.raises(ValueError):
+        assign_min_cost([[1], [2]])
+
+
+def test_best_assignments_match_hungarian(monkeypatch):
+    rng = np.random.default_rng(0)
+    kid_costs = rng.random((20, 3, 4))
+    kid_weights = rng.random((20, 3))
+    costs = rng.random((4, 4))
+
+    batched = best_assignments(kid_costs, kid_weights, costs)
+    monkeypatch.setattr("huffman_arpeggio.transitions.MAX_PERMUTATIONS", 0)
+    one_by_one = best_assignments(kid_costs, kid_weights, costs)
+
+    np.testing.assert_array_equal(batched[0], one_by_one[0])
+    np.testing.assert_allclose(batched[1], one_by_one[1])
+
+
+@pytest.mark.parametrize("num_branches", [2, 3])
+def test_optimal_without_bigrams(num_branches):
+    rng = random.Random(num_branches)
+    for _ in range(5):
+        symbols, count_dict, costs, _ = random_case(
+            rng, num_branches, 6, with_bigrams=False
+        )
+        root = build_huffman_tree(count_dict, symbols)
+
+        encoding_map = transition_optimized_encoding_map(
+            root, symbols, count_dict, costs
+        )
+
+        best = min(
+            expected_transition_cost(
+                generate_encoding_map_with_count(tree, symbols, count_dict),
+                symbols,
+                costs,
+            )
+            for tree in all_relabelings(root)
+        )
+        assert expected_transition_cost(
+            encoding_map, symbols, costs
+        ) == pytest.approx(best)
+
+
+def test_bigrams_never_worse_than_default():
+    rng = random.Random(0)
+    for _ in range(10):
+        symbols, count_dict, costs, bigrams = random_case(
+            rng, 3, 7, with_bigrams=True
+        )
+        root = build_huffman_tree(count_dict, symbols)
+        default = generate_encoding_map_with_count(root, symbols, count_dict)
+
+        encoding_map = transition_optimized_encoding_map(
+            root, symbols, count_dict, costs, bigrams
+        )
+
+        assert expected_transition_cost(
+            encoding_map, symbols, costs, bigrams
+        ) <= expected_transition_cost(default, symbols, costs, bigrams)
+        assert sorted(
+            (target, len(path)) for path, (target, _) in encoding_map.items()
+        ) == sorted(
+            (target, len(path)) for path, (target, _) in default.items()
+        )
+
+
+def test_hand_costs():
+    count_dict = {"a": 10, "b": 9, "c": 8, "d": 7, "e": 6, "f": 5, "g": 4}
+    root = build_huffman_tree(count_dict, SYMBOLS)
+
+    encoding_map = transition_optimized_encoding_map(
+        root, SYMBOLS, count_dict, HAND_COSTS
+    )
+
+    best = min(
+        expected_transition_cost(
+            generate_encoding_map_with_count(tree, SYMBOLS, count_dict),
+            SYMBOLS,
+            HAND_COSTS,
+        )
+        for tree in all_relabelings(root)
+    )
+    assert expected_transition_cost(
+        encoding_map, SYMBOLS, HAND_COSTS
+    ) == pytest.approx(best)
+    # Every symbol is used after the first press, and the same finger twice
+    # goes to the least frequent target
+    repeats = [
+        target
+        for path, (target, _) in encoding_map.items()
+        if path[0] == path[-1] and len(path) > 1
+    ]
+    assert repeats == ["g"]
+
+
+def test_single_target():
+    root = Node(3, "a")
+
+    assert optimize_transitions(root, HAND_COSTS) is root
+
+
+def test_invalid_costs():
+    root = build_huffman_tree({"a": 1, "b": 2, "c": 3}, SYMBOLS)
+
+    with pytest.raises(ValueError):
+        optimize_transitions(root, [[0, 1], [1, 0]])
+    with pytest.raises(ValueError):
+        optimize_transitions(root, [[0, 1, 2]])
+    with pytest.raises(ValueError):
+        transition_optimized_encoding_map(
+            root, SYMBOLS[:3], {"a": 1, "b": 2, "c": 3}, HAND_COSTS
+        )
@@ -0,0 +1,66 @@
+import pytest
+from huffman_arpeggio.core import (
+    build_huffman_tree,
+    generate_encoding_map_with_count,
+)
+from huffman_arpeggio.unequal_costs import (
+    build_unequal_cost_tree,
+    characteristic_root,
+    expected_press_cost,
+)
+
+
+def test_characteristic_root():
+    assert characteristic_root([1, 1]) == pytest.approx(2)
+    assert characteristic_root([1, 1, 1, 1]) == pytest.approx(4)
+    # Fibonacci costs: r ** -1 + r ** -2 == 1 at the golden ratio
+    assert characteristic_root([1, 2]) == pytest.approx((1 + 5**0.5) / 2)
+
+
+def test_build_unequal_cost_tree_equal_costs_matches_huffman():
+    count_dict = {chr(65 + i): (i * 7919) % 101 + 1 for i in range(26)}
+    symbols = ["X", "O", "□"]
+    costs = [1, 1, 1]
+
+    root = build_unequal_cost_tree(count_dict, symbols, costs)
+    encoding_map = generate_encoding_map_with_count(root, symbols, count_dict)
+    huffman_map = generate_encoding_map_with_count(
+        build_huffman_tree(count_dict, symbols), symbols, count_dict
+    )
+
+    assert len(encoding_map) == len(count_dict)
+    assert expected_press_cost(encoding_map, symbols, costs) == pytest.approx(
+        expected_press_cost(huffman_map, symbols, costs)
+    )
+
+
+def test_build_unequal_cost_tree_prefers_cheap_symbols():
+    count_dict = {f"t{i}": 1000 // (i + 1) for i in range(40)}
+    symbols = ["thumb", "index", "middle", "pinky"]
+    costs = [1, 1.2, 1.5, 4]
+
+    root = build_unequal_cost_tree(count_dict, symbols, costs)
+    encoding_map = generate_encoding_map_with_count(root, symbols, count_dict)
+    huffman_map = generate_encoding_map_with_count(
+        build_huffman_tree(count_dict, symbols), symbols, count_dict
+    )
+
+    codes = set(encoding_map)
+    for code in codes:
+        for i in range(len(code)):
+            assert code[:i] not in codes
+    assert sorted(target for target, _ in encoding_map.values()) == sorted(
+        count_dict
+    )
+    assert expected_press_cost(
+        encoding_map, symbols, costs
+    ) < expected_press_cost(huffman_map, symbols, costs)
+    assert encoding_map[("thumb", "thumb")] == ("t0", 1000)
+
+
+def test_build_unequal_cost_tree_invalid_costs():
+    with pytest.raises(ValueError):
+        build_unequal_cost_tree({"A": 1, "B": 2}, ["X", "O"], [1])
+
+    with pytest.raises(ValueError):
+        build_unequal_cost_tree({"A": 1, "B": 2}, ["X", "O"], [1, 0])
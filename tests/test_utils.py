@@ -0,0 +1,49 @@
+import io
+
+from huffman_arpeggio.utils import (
+    count_lines,
+    iter_lines,
+    iter_rows_by_count,
+    save_encoding_map_with_count,
+)
+
+
+def test_iter_lines_across_chunks():
+    stream = io.StringIO("ls -la\ngit status\r\n\nls -la\ngit status")
+    lines = list(iter_lines(stream, chunk_size=4))
+    assert lines == ["ls -la", "git status", "ls -la", "git status"]
+
+
+def test_count_lines():
+    stream = io.StringIO("a\nb\na\n")
+    assert count_lines(iter_lines(stream)) == {"a": 2, "b": 1}
+    assert count_lines(iter_lines(io.StringIO(""))) == {}
+
+
+def test_iter_rows_by_count():
+    ordered = {("a",): ("x", 3), ("b",): ("y", 3), ("a", "b"): ("z", 1)}
+    assert list(iter_rows_by_count(ordered)) == [
+        (("a",), "x", 3),
+        (("b",), "y", 3),
+        (("a", "b"), "z", 1),
+    ]
+
+    unordered = {("a",): ("x", 1), ("b",): ("y", 3), ("a", "b"): ("z", 1)}
+    assert list(iter_rows_by_count(unordered)) == [
+        (("b",), "y", 3),
+        (("a",), "x", 1),
+        (("a", "b"), "z", 1),
+    ]
+    assert list(iter_rows_by_count({})) == []
+
+
+def test_save_encoding_map_with_count(tmp_path):
+    output_path = tmp_path / "encoding_map.csv"
+    save_encoding_map_with_count(
+        {("a",): ("x", 1), ("b", "a"): ("y, z", 3)}, str(output_path)
+    )
+    assert output_path.read_text().splitlines() == [
+        "sequence,target,count",
+        'b a,"y, z",3',
+        "a,x,1",
+    ]
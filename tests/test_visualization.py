@@ -1,6 +1,14 @@
+import io
 import os
-from huffman_arpeggio.core import build_huffman_tree
-from huffman_arpeggio.visualization import visualize_huffman_tree_graphviz
+import re
+
+from huffman_arpeggio.core import build_huffman_tree, iter_encoding_map
+from huffman_arpeggio.visualization import (
+    expanded_nodes,
+    visualize_huffman_tree_graphviz,
+    visualize_huffman_tree_rich,
+    write_dot,
+)
 
 
 def test_visualize_huffman_tree():
@@ -17,3 +25,113 @@ def test_visualize_huffman_tree():
     # Cleanup
     os.remove(f"{output_path}.png")
     os.rmdir("tests/output")
+
+
+def chain_tree(depth):
+    # Doubling counts merge one at a time, into a chain as deep as the tree
+    count_dict = {f"t{i}": 2**i for i in range(depth + 1)}
+    return build_huffman_tree(count_dict, ["X", "O"])
+
+
+def test_write_dot():
+    count_dict = {"A": 5, "B": 7, "C": 10}
+    root = build_huffman_tree(count_dict, ["X", "O"])
+    output = io.StringIO()
+
+    write_dot(root, output, symbols=["X", "O"])
+
+    dot = output.getvalue()
+    assert dot.startswith("// Huffman Tree\ndigraph {\n")
+    assert dot.endswith("}\n")
+    assert dot.count(" -> ") == 4
+    assert '\tn0 [label="22"]\n' in dot
+    assert '"C\\n10"' in dot
+
+    # The edge labels spell out the same paths as the encoding map
+    labels = dict(re.findall(r'\t(n\d+) \[label="([^"]*)', dot))
+    edges = re.findall(r'\t(n\d+) -> (n\d+) \[label="([^"]*)"\]', dot)
+    paths = {"n0": ()}
+    for parent, child, symbol in edges:
+        paths[child] = paths[parent] + (symbol,)
+    leaf_paths = {
+        labels[node].split("\\n")[0]: path
+        for node, path in paths.items()
+        if "\\n" in labels[node]
+    }
+    assert leaf_paths == {
+        target: path
+        for path, target, _ in iter_encoding_map(root, ["X", "O"], count_dict)
+    }
+
+    again = io.StringIO()
+    write_dot(root, again, symbols=["X", "O"])
+    assert again.getvalue() == dot
+
+
+def test_write_dot_escapes_labels():
+    root = build_huffman_tree({'say "hi"': 2, "a\\b": 1}, ["X", "O"])
+    output = io.StringIO()
+
+    write_dot(root, output)
+
+    assert '"say \\"hi\\"\\n2"' in output.getvalue()
+    assert '"a\\\\b\\n1"' in output.getvalue()
+
+
+def test_write_dot_deep_tree():
+    root = chain_tree(5000)
+    output = io.StringIO()
+
+    write_dot(root, output)
+
+    assert output.getvalue().count(" -> ") == 10000
+
+
+def test_write_dot_truncated():
+    root = chain_tree(100)
+
+    by_depth = io.StringIO()
+    write_dot(root, by_depth, max_depth=3)
+    by_top_k = io.StringIO()
+    write_dot(root, by_top_k, top_k=3)
+
+    for output in (by_depth, by_top_k):
+        dot = output.getvalue()
+        assert dot.count(" -> ") == 6
+        assert dot.count("style=dashed") == 1
+        assert "t100" in dot
+        assert "t0\\n" not in dot
+
+
+def test_expanded_nodes_prefers_high_counts():
+    root = build_huffman_tree(
+        {"A": 1, "B": 1, "C": 1, "D": 1, "E": 100, "F": 100}, ["X", "O"]
+    )
+
+    expanded = expanded_nodes(root, top_k=2)
+
+    assert id(root) in expanded
+    heaviest = max(
+        (child for child in root.children if child.children),
+        key=lambda child: child.count,
+    )
+    assert id(heaviest) in expanded
+    assert expanded_nodes(root, max_depth=0, top_k=2) == set()
+    assert expanded_nodes(root) is None
+
+
+def test_visualize_huffman_tree_rich():
+    root = chain_tree(5000)
+    # The lighter subtree comes first
+    inner = root.children[0]
+
+    tree = visualize_huffman_tree_rich(root, max_depth=2)
+
+    assert tree.label == str(root.count)
+    assert tree.children[1].label == f"2. {2**5000} t5000"
+    assert tree.children[0].children[1].label == f"2. {2**4999} t4999"
+    assert tree.children[0].children[0].children[0].label == "…"
+
+    subtree = visualize_huffman_tree_rich(root, max_depth=1, path=[0, 0])
+    assert subtree.label == str(inner.children[0].count)
+    assert subtree.children[1].label == f"2. {2**4998} t4998"
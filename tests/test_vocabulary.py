@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from huffman_arpeggio.canonical import canonical_encoding_map
+from huffman_arpeggio.compact import build_compact_tree
+from huffman_arpeggio.core import (
+    build_huffman_tree,
+    generate_encoding_map_with_count,
+)
+from huffman_arpeggio.utils import load_count_dict
+from huffman_arpeggio.vocabulary import (
+    Vocabulary,
+    load_vocabulary,
+    save_vocabulary,
+)
+
+INPUT_CSV = "tests/data/playstation-qwerty-wikipedia-example-input.csv"
+SYMBOLS = ["△", "○", "□", "✕"]
+COUNT_DICT = {"git status": 12, "ls": 30, "cd ..": 4, "vim ✓": 12, "make": 1}
+
+
+def test_mapping():
+    vocabulary = Vocabulary.from_items(COUNT_DICT.items())
+
+    assert len(vocabulary) == 5
+    assert list(vocabulary) == list(COUNT_DICT)
+    assert list(vocabulary.values()) == list(COUNT_DICT.values())
+    assert list(vocabulary.items()) == list(COUNT_DICT.items())
+    assert dict(vocabulary) == COUNT_DICT
+    assert vocabulary == COUNT_DICT
+    assert vocabulary["vim ✓"] == 12
+    assert vocabulary.position("cd ..") == 2
+    assert vocabulary.targets[3] == "vim ✓"
+    assert "ls" in vocabulary
+    assert "rm" not in vocabulary
+    assert 3 not in vocabulary
+    with pytest.raises(KeyError):
+        vocabulary["rm"]
+
+
+def test_empty():
+    vocabulary = Vocabulary.from_items([])
+
+    assert len(vocabulary) == 0
+    assert dict(vocabulary) == {}
+    assert "ls" not in vocabulary
+
+
+def test_invalid_columns():
+    with pytest.raises(ValueError):
+        Vocabulary(b"ab", np.array([0, 1, 2]), np.array([1]))
+    with pytest.raises(ValueError):
+        Vocabulary(b"ab", np.array([0, 1]), np.array([1]))
+
+
+def test_filter_and_sort():
+    vocabulary = Vocabulary.from_items(COUNT_DICT.items())
+
+    assert dict(vocabulary.min_count(12)) == {
+        "git status": 12,
+        "ls": 30,
+        "vim ✓": 12,
+    }
+    assert dict(vocabulary.filter(vocabulary.counts == 1)) == {"make": 1}
+    assert list(vocabulary.sort().items()) == [
+        ("ls", 30),
+        ("git status", 12),
+        ("vim ✓", 12),
+        ("cd ..", 4),
+        ("make", 1),
+    ]
+    assert list(vocabulary.take([4, 0]).items()) == [
+        ("make", 1),
+        ("git status", 12),
+    ]
+
+
+def test_top_k():
+    vocabulary = Vocabulary.from_items(COUNT_DICT.items())
+
+    assert list(vocabulary.top_k(2).items()) == [
+        ("ls", 30),
+        ("git status", 12),
+    ]
+    assert list(vocabulary.top_k(3)) == ["ls", "git status", "vim ✓"]
+    assert list(vocabulary.top_k(10)) == list(vocabulary.sort())
+    assert len(vocabulary.top_k(0)) == 0
+
+
+def test_top_k_matches_sort():
+    rng = np.random.default_rng(0)
+    vocabulary = Vocabulary.from_items(
+        (f"t{i}", int(count))
+        for i, count in enumerate(rng.integers(1, 50, 1000))
+    )
+
+    for k in [1, 10, 100, 999]:
+        assert (
+            list(vocabulary.top_k(k).items())
+            == list(vocabulary.sort().items())[:k]
+        )
+
+
+def test_csv_round_trip(tmp_path):
+    vocabulary = load_vocabulary(INPUT_CSV, "keyswitch", "count")
+    assert vocabulary == load_count_dict(INPUT_CSV, "keyswitch", "count")
+
+    path = str(tmp_path / "counts.csv")
+    save_vocabulary(vocabulary, path)
+
+    assert load_vocabulary(path, "target", "count") == vocabulary
+
+
+def test_builders_accept_vocabulary():
+    count_dict = load_count_dict(INPUT_CSV, "keyswitch", "count")
+    vocabulary = Vocabulary.from_items(count_dict.items())
+
+    for build in (build_huffman_tree, build_compact_tree):
+        expected = generate_encoding_map_with_count(
+            build(count_dict, SYMBOLS), SYMBOLS, count_dict
+        )
+        assert (
+            generate_encoding_map_with_count(
+                build(vocabulary, SYMBOLS), SYMBOLS, vocabulary
+            )
+            == expected
+        )
+    assert canonical_encoding_map(
+        vocabulary, SYMBOLS
+    ) == canonical_encoding_map(count_dict, SYMBOLS)